@@ -25,9 +25,10 @@
 A canvas holds a collection of all elements and corresponding attributes to be
 displayed. """
 
-import io, logging, os, sys, string, tempfile
-from . import attr, baseclasses, config, document, style, trafo, svgwriter, unit
+import hashlib, io, logging, os, sys, string, tempfile, weakref
+from . import attr, baseclasses, config, document, pdfwriter, style, timing, trafo, svgwriter, unit
 from . import bbox as bboxmodule
+from . import writer as writermodule
 
 logger = logging.getLogger("pyx")
 
@@ -50,6 +51,48 @@ def _wrappedindocument(method):
         return method(d, file, **write_kwargs)
     return wrappedindocument
 
+#
+# form xobject for shared canvases
+#
+
+#: extent (in pts) of the BBox of the form xobjects in each direction
+formbboxlimit_pt = 32767
+
+class PDFcanvasform(pdfwriter.PDFobject):
+
+    def __init__(self, name, bbox, content, registry, formregistry):
+        pdfwriter.PDFobject.__init__(self, "canvasform", name)
+        registry.addresource("XObject", name, self)
+        self.bbox = bbox
+        self.content = content
+        self.formregistry = formregistry
+
+    def write(self, file, writer, registry):
+        file.write("<<\n"
+                   "/Type /XObject\n"
+                   "/Subtype /Form\n")
+        # PDF viewers clip the form to its BBox, but the PyX bbox is only an
+        # approximation (glyph overhangs, miter joins etc.). Hence the BBox
+        # written is large enough to not cut any content, while the bbox is
+        # used for the bounding box of the page only.
+        llx_pt, lly_pt, urx_pt, ury_pt = self.bbox.lowrestuple_pt()
+        file.write("/BBox [%d %d %d %d]\n" % (min(llx_pt, -formbboxlimit_pt), min(lly_pt, -formbboxlimit_pt),
+                                              max(urx_pt, formbboxlimit_pt), max(ury_pt, formbboxlimit_pt)))
+        file.write("/Resources ")
+        self.formregistry.writeresources(file)
+        if writer.compress:
+            import zlib
+            content = zlib.compress(self.content)
+        else:
+            content = self.content
+        file.write("/Length %i\n" % len(content))
+        if writer.compress:
+            file.write("/Filter /FlateDecode\n")
+        file.write(">>\n"
+                   "stream\n")
+        file.write_bytes(content)
+        file.write("endstream\n")
+
 #
 # clipping class
 #
@@ -100,6 +143,13 @@ class canvas(baseclasses.canvasitem):
 
     """a canvas holds a collection of canvasitems"""
 
+    # A canvas inserted several times is shared. Its PDF output is written
+    # once per output file as a form xobject, which is referenced by each
+    # occurrence of the canvas.
+    shared = False
+    _inserted = False
+    _formwriter = None
+
     def __init__(self, attrs=None, textengine=None, ipython_bboxenlarge=1*unit.t_pt):
 
         """construct a canvas
@@ -199,7 +249,10 @@ class canvas(baseclasses.canvasitem):
                     self.trafo.processPS(file, writer, context, registry)
             nbbox = bboxmodule.empty()
             for item in self.items:
-                item.processPS(file, writer, context, registry, nbbox)
+                if timing.active is None:
+                    item.processPS(file, writer, context, registry, nbbox)
+                else:
+                    timing.process(item.processPS, file, writer, context, registry, nbbox)
             # update bounding bbox
             nbbox.transform(self.trafo)
             if self.clip is not None:
@@ -209,6 +262,51 @@ class canvas(baseclasses.canvasitem):
                 file.write("grestore\n")
 
     def processPDF(self, file, writer, context, registry, bbox):
+        if self.shared:
+            form = self._sharedPDFform(writer, context)
+            if form is not None:
+                name, formbbox, content, formregistry = form
+                registry.mergeregistry(formregistry)
+                registry.add(PDFcanvasform(name, formbbox, content, registry, formregistry))
+                file.write("/%s Do\n" % name)
+                bbox += formbbox
+                return
+        self._processPDF(file, writer, context, registry, bbox)
+
+    def _sharedPDFform(self, writer, context):
+        # The form is rendered once per writer, i.e. per output file, and
+        # for the context attributes altering the output.
+        if self._formwriter is None or self._formwriter() is not writer:
+            self._forms = {}
+            self._formwriter = weakref.ref(writer)
+        key = context.linewidth_pt, context.strokeattr, context.fillattr, context.fillrule
+        try:
+            return self._forms[key]
+        except KeyError:
+            form = self._forms[key] = self._renderPDFform(writer, context)
+            return form
+
+    def _renderPDFform(self, writer, context):
+        formregistry = pdfwriter.PDFregistry()
+        formfile = writermodule.writer(io.BytesIO())
+        formbbox = bboxmodule.empty()
+        formcontext = pdfwriter.context()
+        formcontext.linewidth_pt = context.linewidth_pt
+        formcontext.strokeattr = context.strokeattr
+        formcontext.fillattr = context.fillattr
+        formcontext.fillrule = context.fillrule
+        self._processPDF(formfile, writer, formcontext, formregistry, formbbox)
+        if not formbbox or any(type.startswith("formfield_") for type in formregistry.types):
+            # form fields are positioned on the page and thus can not be shared
+            return None
+        content = formfile.file.getvalue()
+
+        # the name is given by the content, i.e. equal canvases share a single form
+        header = "%d %d %d %d\n" % formbbox.lowrestuple_pt()
+        name = "form%s" % hashlib.md5(header.encode("ascii") + content).hexdigest()
+        return name, formbbox, content, formregistry
+
+    def _processPDF(self, file, writer, context, registry, bbox):
         context = context()
         textregion = False
         context.trafo = context.trafo * self.trafo
@@ -235,7 +333,10 @@ class canvas(baseclasses.canvasitem):
                             file.write("ET\n")
                             textregion = False
                             context.selectedfont = None
-                item.processPDF(file, writer, context, registry, nbbox)
+                if timing.active is None:
+                    item.processPDF(file, writer, context, registry, nbbox)
+                else:
+                    timing.process(item.processPDF, file, writer, context, registry, nbbox)
             if textregion:
                 file.write("ET\n")
                 textregion = False
@@ -330,6 +431,9 @@ class canvas(baseclasses.canvasitem):
         attrs. If replace is not None, the new item is
         positioned accordingly in the canvas.
 
+        A canvas inserted several times is marked as shared. The PDF output
+        then contains the shared canvas only once.
+
         returns the item, possibly wrapped in a canvas
 
         """
@@ -341,6 +445,10 @@ class canvas(baseclasses.canvasitem):
             sc = canvas(attrs)
             sc.insert(item)
             item = sc
+        elif isinstance(item, canvas):
+            if item._inserted:
+                item.shared = True
+            item._inserted = True
 
         self.items.append(item)
         return item
@@ -372,6 +372,36 @@ class gradient(attr.changeattr):
         """return color corresponding to param"""
         pass
 
+    def getlut(self, size=256):
+        """return a lookup table of size colors sampled equidistantly from the gradient
+
+        The colors are stored as packed 8 bit bytes (see to8bitbytes).
+        Lookup tables are cached within the gradient instance."""
+        try:
+            return self._luts[size]
+        except AttributeError:
+            self._luts = {}
+        except KeyError:
+            pass
+        if size < 2:
+            raise ValueError("lookup table size must be at least 2")
+        lut = self._luts[size] = [self.getcolor(i/(size-1)).to8bitbytes() for i in range(size)]
+        return lut
+
+    def getcolorbytes(self, params, lutsize=None):
+        """return packed 8 bit colors for a list of params
+
+        When lutsize is None, the colors are evaluated exactly by getcolor.
+        Otherwise the color for each param is taken from a lookup table of
+        lutsize entries (see getlut), where params are clipped to the range
+        [0, 1]. The result is a bytes instance containing the colors of all
+        params in sequence."""
+        if lutsize is None:
+            return b"".join([self.getcolor(param).to8bitbytes() for param in params])
+        lut = self.getlut(lutsize)
+        scale = lutsize - 1
+        return b"".join([lut[int(min(max(param, 0), 1)*scale + 0.5)] for param in params])
+
     def select(self, index, n_indices):
         """return a color corresponding to an index out of n_indices"""
         if n_indices == 1:
@@ -26,7 +26,7 @@
 #   should we at least factor it out?
 
 import sys, math
-from . import attr, baseclasses, canvas, color, path, normpath, style, trafo, unit, deformer
+from . import attr, baseclasses, canvas, color, mathutils, path, normpath, style, trafo, unit, deformer
 
 _marker = object()
 
@@ -64,6 +64,15 @@ class decoratedpath(baseclasses.canvasitem):
 
         self.nostrokeranges = None
 
+        # decorations to be completed before the output, e.g. when
+        # waiting for the output of the TeX engine
+        self.deferred = []
+
+    def dodeferred(self):
+        """complete the deferred decorations"""
+        while self.deferred:
+            self.deferred.pop(0)()
+
     def ensurenormpath(self):
         """convert self.path into a normpath"""
         assert self.nostrokeranges is None or isinstance(self.path, path.normpath), "you don't understand what you are doing"
@@ -98,6 +107,7 @@ class decoratedpath(baseclasses.canvasitem):
             self.nostrokeranges[ibegin:iend+1] = [(begin, end)]
 
     def bbox(self):
+        self.dodeferred()
         pathbbox = self.path.bbox()
         ornamentsbbox = self.ornaments.bbox()
         if ornamentsbbox is not None:
@@ -130,6 +140,8 @@ class decoratedpath(baseclasses.canvasitem):
             for style in styles:
                 style.processPS(file, writer, context, registry)
 
+        self.dodeferred()
+
         strokepath = self.strokepath()
         fillpath = self.path
 
@@ -225,6 +237,8 @@ class decoratedpath(baseclasses.canvasitem):
                 style.processPDF(file, writer, context, registry)
             context.strokeattr = 1
 
+        self.dodeferred()
+
         strokepath = self.strokepath()
         fillpath = self.path
 
@@ -307,6 +321,8 @@ class decoratedpath(baseclasses.canvasitem):
                 style.processSVGattrs(attrs, writer, context, registry)
             context.strokeattr = True
 
+        self.dodeferred()
+
         strokepath = self.strokepath()
         fillpath = self.path
 
@@ -662,29 +678,40 @@ class curvedtext(deco, attr.attr):
 
         dp.ensurenormpath()
         if self.arclenfrombegin is not None:
-            textpos = dp.path.begin() + self.arclenfrombegin
+            textpos_pt = unit.topt(self.arclenfrombegin)
         elif self.arclenfromend is not None:
-            textpos = dp.path.end() - self.arclenfromend
+            textpos_pt = dp.path.arclen_pt() - unit.topt(self.arclenfromend)
         else:
             # relarcpos is used if neither arcfrombegin nor arcfromend is given
-            textpos = self.relarclenpos * dp.path.arclen()
+            textpos_pt = self.relarclenpos * dp.path.arclen_pt()
 
         textattrs = self.defaulttextattrs + self.textattrs
         t = texrunner.text(0, 0, self.text, textattrs, singlecharmode=1)
-        t.do_finish()
 
+        if t.dviready:
+            dp.ornaments.insert(self.glyphs(dp, t, textpos_pt))
+        else:
+            # accessing the dvicanvas would finish the TeX engine, thus we
+            # place the glyphs when the decorated path is output
+            c = canvas.canvas()
+            dp.ornaments.insert(c)
+            dp.deferred.append(lambda: c.insert(self.glyphs(dp, t, textpos_pt)))
+
+    def glyphs(self, dp, t, textpos_pt):
+        """return a canvas containing the glyphs of the textbox t placed along dp.path"""
         # we copy the style from the original textbox and modify the position for each dvicanvas item
         c = canvas.canvas(t.dvicanvas.styles)
-        for item in t.dvicanvas.items:
-            bbox = item.bbox()
-            bbox = bbox.transformed(t.texttrafo)
-            x = bbox.center()[0]
-            atrafo = dp.path.trafo(textpos+x)
-            c.insert(item, [t.texttrafo] + [trafo.translate(-x, 0)] + [atrafo])
+        bboxes = [item.bbox().transformed(t.texttrafo) for item in t.dvicanvas.items]
+        xs_pt = [bbox.center_pt()[0] for bbox in bboxes]
+        positions_pt, tangents, curvatures_pt = dp.path.sample_pt([textpos_pt+x_pt for x_pt in xs_pt])
+        for item, bbox, x_pt, position_pt, (tx, ty) in zip(t.dvicanvas.items, bboxes, xs_pt, positions_pt, tangents):
+            atrafo = trafo.trafo_pt(((tx, -ty), (ty, tx)), position_pt)
+            c.insert(item, [t.texttrafo, trafo.translate_pt(-x_pt, 0), atrafo])
             if self.exclude is not None:
-                dp.excluderange(textpos+bbox.left()-self.exclude, textpos+bbox.right()+self.exclude)
-
-        dp.ornaments.insert(c)
+                exclude_pt = unit.topt(self.exclude)
+                dp.excluderange((textpos_pt+bbox.left_pt()-exclude_pt)*unit.t_pt,
+                                (textpos_pt+bbox.right_pt()+exclude_pt)*unit.t_pt)
+        return c
 
 
 class shownormpath(deco, attr.attr):
@@ -739,6 +766,87 @@ class shownormpath(deco, attr.attr):
                     dp.ornaments.fill(path.circle_pt(x_pt, y_pt, self.endpoint_size_pt), self.endpoint_attrs)
 
 
+def _monotonicpieces_pt(anormpath):
+    """return the pieces of anormpath being monotonic in x
+
+    The pieces are returned as tuples (normsubpathitem, t0, t1, x0_pt, x1_pt)
+    with x0_pt != x1_pt, i.e. vertical pieces are skipped. Open normsubpaths
+    are closed by a line like when filling or clipping.
+    """
+    result = []
+    for normsubpath in anormpath.normsubpaths:
+        items = normsubpath.normsubpathitems[:]
+        if not items:
+            continue
+        if not normsubpath.closed:
+            items.append(normpath.normline_pt(*(normsubpath.atend_pt() + normsubpath.atbegin_pt())))
+        for item in items:
+            if isinstance(item, normpath.normline_pt):
+                if item.x0_pt != item.x1_pt:
+                    result.append((item, 0, 1, item.x0_pt, item.x1_pt))
+            else:
+                # split the curve at the roots of the x derivative
+                ts = [t for t in mathutils.realpolyroots(3*item.x3_pt-9*item.x2_pt+9*item.x1_pt-3*item.x0_pt,
+                                                         6*item.x0_pt-12*item.x1_pt+6*item.x2_pt,
+                                                         3*item.x1_pt-3*item.x0_pt) if 0 < t < 1]
+                ts = [0] + sorted(ts) + [1]
+                for t0, t1 in zip(ts[:-1], ts[1:]):
+                    x0_pt = item.x_pt(t0)
+                    x1_pt = item.x_pt(t1)
+                    if x0_pt != x1_pt:
+                        result.append((item, t0, t1, x0_pt, x1_pt))
+    return result
+
+
+def _hatchsegments_pt(anormpath, x0_pt, dist_pt, n):
+    """return the parts of the vertical lines x = x0_pt + i*dist_pt (for i in range(n)) within anormpath
+
+    A list of n lists of tuples (y0_pt, y1_pt) is returned. The inside of
+    anormpath is defined by the nonzero winding rule. The intersections are
+    calculated piecewise for the monotonic pieces of the path, where each
+    piece covers a half-open range in x to count crossings at the joints of
+    the pieces only once.
+    """
+    crossings = [[] for i in range(n)]
+    for item, t0, t1, xa_pt, xb_pt in _monotonicpieces_pt(anormpath):
+        direction = 1 if xb_pt > xa_pt else -1
+        imin = max(math.ceil((min(xa_pt, xb_pt) - x0_pt) / dist_pt), 0)
+        imax = min(math.ceil((max(xa_pt, xb_pt) - x0_pt) / dist_pt), n)
+        for i in range(imin, imax):
+            x_pt = x0_pt + i*dist_pt
+            if not min(xa_pt, xb_pt) <= x_pt < max(xa_pt, xb_pt):
+                continue
+            if isinstance(item, normpath.normline_pt):
+                y_pt = item.y0_pt + (item.y1_pt-item.y0_pt) * (x_pt-item.x0_pt) / (item.x1_pt-item.x0_pt)
+            else:
+                # bisection within the monotonic piece
+                ta, tb = t0, t1
+                for j in range(60):
+                    t = 0.5*(ta+tb)
+                    if (item.x_pt(t) < x_pt) == (direction > 0):
+                        ta = t
+                    else:
+                        tb = t
+                    if tb - ta < 1e-12:
+                        break
+                y_pt = item.y_pt(0.5*(ta+tb))
+            crossings[i].append((y_pt, direction))
+
+    result = []
+    for icrossings in crossings:
+        icrossings.sort()
+        segments = []
+        winding = 0
+        for y_pt, direction in icrossings:
+            if not winding:
+                ybegin_pt = y_pt
+            winding += direction
+            if not winding:
+                segments.append((ybegin_pt, y_pt))
+        result.append(segments)
+    return result
+
+
 class linehatched(deco, attr.exclusiveattr, attr.clearclass):
     """draws a pattern with explicit lines
 
@@ -774,10 +882,20 @@ class linehatched(deco, attr.exclusiveattr, attr.clearclass):
         center_pt = 0.5*(llx_pt+urx_pt), 0.5*(lly_pt+ury_pt)
         radius_pt = 0.5*math.hypot(urx_pt-llx_pt, ury_pt-lly_pt) + dist_pt
         n = int(2*radius_pt / dist_pt) + 1
-        for i in range(n):
-            x_pt = center_pt[0] - radius_pt + i*dist_pt
-            c.stroke(path.line_pt(x_pt, center_pt[1]-radius_pt, x_pt, center_pt[1]+radius_pt),
-                     [trafo.rotate_pt(angle, center_pt[0], center_pt[1])] + self.strokestyles)
+        # the lines are vertical in a coordinate system rotated by angle around the center;
+        # we intersect them with the path and stroke the parts inside as a single path
+        rotate = trafo.rotate_pt(angle, center_pt[0], center_pt[1])
+        x0_pt = center_pt[0] - radius_pt
+        pathitems = []
+        for i, segments in enumerate(_hatchsegments_pt(dp.path.transformed(rotate.inverse()), x0_pt, dist_pt, n)):
+            x_pt = x0_pt + i*dist_pt
+            for y0_pt, y1_pt in segments:
+                if y1_pt > y0_pt:
+                    pathitems.append(path.moveto_pt(x_pt, y0_pt))
+                    pathitems.append(path.lineto_pt(x_pt, y1_pt))
+        if pathitems:
+            # the clipping is kept to cut the line ends along the path
+            c.stroke(path.path(*pathitems), [rotate] + self.strokestyles)
         return c
 
     def decorate(self, dp, texrunner):
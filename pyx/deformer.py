@@ -808,6 +808,56 @@ def _length_pt(path, param1, param2): # <<<
     point1, point2 = path.at_pt([param1, param2])
     return math.hypot(point1[0] - point2[0], point1[1] - point2[1])
 # >>>
+def _cbox_pt(nspitem, epsilon): # <<<
+    """Returns the control box of nspitem enlarged by epsilon as a tuple (llx_pt, lly_pt, urx_pt, ury_pt)"""
+    cbox = nspitem.cbox()
+    return cbox.llx_pt - epsilon, cbox.lly_pt - epsilon, cbox.urx_pt + epsilon, cbox.ury_pt + epsilon
+# >>>
+class _boxindex: # <<<
+
+    """A spatial index of boxes on a uniform grid
+
+    The boxes are tuples (llx_pt, lly_pt, urx_pt, ury_pt). The grid size is
+    the average extent of the boxes. Boxes covering too many grid cells are
+    not sorted into the grid, but tested for all queries."""
+
+    maxcells = 64
+
+    def __init__(self, boxes):
+        self.boxes = boxes
+        self.size = sum(urx_pt - llx_pt + ury_pt - lly_pt for llx_pt, lly_pt, urx_pt, ury_pt in boxes) / (2*len(boxes) or 1) or 1
+        self.cells = {}
+        self.large = []
+        for i, box in enumerate(boxes):
+            cells = self._cells(box)
+            if cells is None:
+                self.large.append(i)
+            else:
+                for cell in cells:
+                    self.cells.setdefault(cell, []).append(i)
+
+    def _cells(self, box):
+        llx_pt, lly_pt, urx_pt, ury_pt = box
+        x0, y0 = math.floor(llx_pt/self.size), math.floor(lly_pt/self.size)
+        x1, y1 = math.floor(urx_pt/self.size), math.floor(ury_pt/self.size)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > self.maxcells:
+            return None
+        return [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+    def overlapping(self, box):
+        """Returns the sorted indices of the boxes overlapping box"""
+        llx_pt, lly_pt, urx_pt, ury_pt = box
+        cells = self._cells(box)
+        if cells is None:
+            candidates = range(len(self.boxes))
+        else:
+            candidates = set(self.large)
+            for cell in cells:
+                candidates.update(self.cells.get(cell, ()))
+        return sorted(i for i in candidates
+                      if self.boxes[i][0] <= urx_pt and llx_pt <= self.boxes[i][2] and
+                         self.boxes[i][1] <= ury_pt and lly_pt <= self.boxes[i][3])
+# >>>
 class parallel(baseclasses.deformer): # <<<
 
     """creates a parallel normpath with constant distance to the original normpath
@@ -1335,11 +1385,14 @@ class parallel(baseclasses.deformer): # <<<
         # omit those which start/end on the original path
         beginparams = []
         endparams = []
-        testparams = origintparams + list(forwardpairs.keys()) + list(forwardpairs.values())
+        # params on different subnormpaths are never equivalent
+        testparams = {}
+        for param in origintparams + list(forwardpairs.keys()) + list(forwardpairs.values()):
+            testparams.setdefault(param.normsubpathindex, []).append(param)
         for i, nsp in enumerate(par_np):
             beginparam = mynormpathparam(par_np, i, 0, 0)
             is_new = True
-            for param in testparams:
+            for param in testparams.get(i, []):
                 if beginparam.is_equiv(param):
                     is_new = False
                     break
@@ -1348,7 +1401,7 @@ class parallel(baseclasses.deformer): # <<<
 
             endparam = mynormpathparam(par_np, i, len(nsp)-1, 1)
             is_new = True
-            for param in testparams:
+            for param in testparams.get(i, []):
                 if endparam.is_equiv(param):
                     is_new = False
                     break
@@ -1381,13 +1434,14 @@ class parallel(baseclasses.deformer): # <<<
         # remain a little piece of the path (triangle) that lies between a lot
         # of intersection points. Simple intersection rules such as thoe in
         # trial_parampairs cannot exclude this piece.
+        par2orig_zones = self._between_paths_zones(par2orig)
         for param in forwardpairs:
             if done[param] or done[forwardpairs[param]]:
                 done[param] = done[forwardpairs[param]] = True
-            elif self._between_paths(par_np.at_pt(param), par2orig, 4*epsilon):
+            elif self._between_paths(par_np.at_pt(param), par2orig_zones, 4*epsilon):
                 done[param] = done[forwardpairs[param]] = True
         for param in beginparams + endparams:
-            if self._between_paths(par_np.at_pt(param), par2orig, 4*epsilon):
+            if self._between_paths(par_np.at_pt(param), par2orig_zones, 4*epsilon):
                 done[param] = True
 
         # visualize the intersection points: # <<<
@@ -1417,11 +1471,15 @@ class parallel(baseclasses.deformer): # <<<
             if param in beginparams: return "begin"
             if param in endparams: return "end"
         # >>>
+        # membership tests by value for the lists of params
+        def paramkey(param):
+            return param.normsubpathindex, param.normsubpathitemindex, param.normsubpathitemparam
+        origintkeys = set(map(paramkey, origintparams))
+        endkeys = set(map(paramkey, endparams))
+
         def trial_parampairs(startp): # <<<
             """Starting at startp, try to find a valid series of intersection parameters"""
-            tried = {} # a local copy of done
-            for param in allparams:
-                tried[param] = done[param]
+            tried = {} # local modifications of done
 
             previousp = startp
             currentp = nextp[previousp]
@@ -1429,11 +1487,11 @@ class parallel(baseclasses.deformer): # <<<
 
             while True:
                 # successful and unsuccessful termination conditions:
-                if tried[currentp]:
+                if tried.get(currentp, done[currentp]):
                     # we reached a branch that has already been treated
                     # ==> this is not a valid parallel path
                     return []
-                if currentp in origintparams:
+                if paramkey(currentp) in origintkeys:
                     # we cross the original path
                     # ==> this is not a valid parallel path
                     return []
@@ -1452,7 +1510,7 @@ class parallel(baseclasses.deformer): # <<<
                         # we have found the same point as the startp (its pair partner)
                         return result
                     previousp = forwardpairs[currentp]
-                if currentp in endparams:
+                if paramkey(currentp) in endkeys:
                     result.append((previousp, currentp))
                     if nextp[currentp] is None: # open subpath
                         # we have found the end of a non-closed subpath
@@ -1517,44 +1575,49 @@ class parallel(baseclasses.deformer): # <<<
 
         dist = self.dist_pt
 
-        n = len(np)
+        # find the pairs of nsp-items with overlapping control boxes by a spatial
+        # index and process them in the order of (nsp_i, nsp_j, nspitem_i, nspitem_j)
+        items = [(nsp_i, nspitem_i) for nsp_i in range(len(np)) for nspitem_i in range(len(np[nsp_i]))]
+        index = _boxindex([_cbox_pt(np[nsp_i][nspitem_i], epsilon) for nsp_i, nspitem_i in items])
+        itempairs = []
+        for i, (nsp_i, nspitem_i) in enumerate(items):
+            for j in index.overlapping(index.boxes[i]):
+                if j > i:
+                    nsp_j, nspitem_j = items[j]
+                    itempairs.append((nsp_i, nsp_j, nspitem_i, nspitem_j))
+        itempairs.sort()
+
         forwardpairs = {}
-        for nsp_i in range(n):
-            for nsp_j in range(nsp_i, n):
-                for nspitem_i in range(len(np[nsp_i])):
-                    if nsp_j == nsp_i:
-                        nspitem_j_range = list(range(nspitem_i+1, len(np[nsp_j])))
-                    else:
-                        nspitem_j_range = list(range(len(np[nsp_j])))
-                    for nspitem_j in nspitem_j_range:
-                        intsparams = np[nsp_i][nspitem_i].intersect(np[nsp_j][nspitem_j], epsilon)
-                        if intsparams:
-                            for intsparam_i, intsparam_j in intsparams:
-                                npp_i = mynormpathparam(np, nsp_i, nspitem_i, intsparam_i)
-                                npp_j = mynormpathparam(np, nsp_j, nspitem_j, intsparam_j)
-
-                                # skip successive nsp-items
-                                if nsp_i == nsp_j:
-                                    if nspitem_j == nspitem_i+1 and (npp_i.is_end_of_nspitem(epsilon) or npp_j.is_beg_of_nspitem(epsilon)):
-                                        continue
-                                    if np[nsp_i].closed and ((npp_i.is_beg_of_nsp(epsilon) and npp_j.is_end_of_nsp(epsilon)) or
-                                                             (npp_j.is_beg_of_nsp(epsilon) and npp_i.is_end_of_nsp(epsilon))):
-                                        continue
-
-                                # correct the order of the pair, such that we can use it to continue on the path
-                                if not self._can_continue(npp_i, npp_j, epsilon):
-                                    assert self._can_continue(npp_j, npp_i, epsilon)
-                                    npp_i, npp_j = npp_j, npp_i
-
-                                # if the intersection is between two nsp-items, take the smallest -> largest
-                                npp_i = npp_i.smaller_equiv(5*epsilon)
-                                npp_j = npp_j.larger_equiv(5*epsilon)
-
-                                # because of the above change of npp_ij, and because there may be intersections between nsp-items,
-                                # it may happen that we try to insert two times the same pair
-                                if self._skip_intersection_doublet(npp_i, npp_j, forwardpairs, eps_comparepairs):
-                                    continue
-                                forwardpairs[npp_i] = npp_j
+        forwardcells = {}
+        for nsp_i, nsp_j, nspitem_i, nspitem_j in itempairs:
+            intsparams = np[nsp_i][nspitem_i].intersect(np[nsp_j][nspitem_j], epsilon)
+            if intsparams:
+                for intsparam_i, intsparam_j in intsparams:
+                    npp_i = mynormpathparam(np, nsp_i, nspitem_i, intsparam_i)
+                    npp_j = mynormpathparam(np, nsp_j, nspitem_j, intsparam_j)
+
+                    # skip successive nsp-items
+                    if nsp_i == nsp_j:
+                        if nspitem_j == nspitem_i+1 and (npp_i.is_end_of_nspitem(epsilon) or npp_j.is_beg_of_nspitem(epsilon)):
+                            continue
+                        if np[nsp_i].closed and ((npp_i.is_beg_of_nsp(epsilon) and npp_j.is_end_of_nsp(epsilon)) or
+                                                 (npp_j.is_beg_of_nsp(epsilon) and npp_i.is_end_of_nsp(epsilon))):
+                            continue
+
+                    # correct the order of the pair, such that we can use it to continue on the path
+                    if not self._can_continue(npp_i, npp_j, epsilon):
+                        assert self._can_continue(npp_j, npp_i, epsilon)
+                        npp_i, npp_j = npp_j, npp_i
+
+                    # if the intersection is between two nsp-items, take the smallest -> largest
+                    npp_i = npp_i.smaller_equiv(5*epsilon)
+                    npp_j = npp_j.larger_equiv(5*epsilon)
+
+                    # because of the above change of npp_ij, and because there may be intersections between nsp-items,
+                    # it may happen that we try to insert two times the same pair
+                    if self._skip_intersection_doublet(npp_i, npp_j, forwardpairs, eps_comparepairs, forwardcells):
+                        continue
+                    forwardpairs[npp_i] = npp_j
 
         # this is partially done in _skip_intersection_doublet
         #forwardpairs = self._elim_intersection_doublets(forwardpairs, eps_comparepairs)
@@ -1571,18 +1634,26 @@ class parallel(baseclasses.deformer): # <<<
         # this code became necessary with introduction of mynormpathparam
         params = []
         oparams = []
+        # find the pairs of nsp-items with overlapping control boxes by a spatial
+        # index and process them in the order of (nsp_i, nsp_j, nspitem_i, nspitem_j)
+        items = [(nsp_j, nspitem_j) for nsp_j in range(len(par_np)) for nspitem_j in range(len(par_np[nsp_j]))]
+        index = _boxindex([_cbox_pt(par_np[nsp_j][nspitem_j], epsilon) for nsp_j, nspitem_j in items])
+        itempairs = []
         for nsp_i in range(len(orig_np)):
-            for nsp_j in range(len(par_np)):
-                for nspitem_i in range(len(orig_np[nsp_i])):
-                    for nspitem_j in range(len(par_np[nsp_j])):
-                        intsparams = orig_np[nsp_i][nspitem_i].intersect(par_np[nsp_j][nspitem_j], epsilon)
-                        if intsparams:
-                            for intsparam_i, intsparam_j in intsparams:
-                                npp_i = mynormpathparam(orig_np, nsp_i, nspitem_i, intsparam_i)
-                                npp_j = mynormpathparam(par_np, nsp_j, nspitem_j, intsparam_j)
-
-                                oparams.append(npp_i)
-                                params.append(npp_j)
+            for nspitem_i in range(len(orig_np[nsp_i])):
+                for j in index.overlapping(_cbox_pt(orig_np[nsp_i][nspitem_i], epsilon)):
+                    nsp_j, nspitem_j = items[j]
+                    itempairs.append((nsp_i, nsp_j, nspitem_i, nspitem_j))
+        itempairs.sort()
+        for nsp_i, nsp_j, nspitem_i, nspitem_j in itempairs:
+            intsparams = orig_np[nsp_i][nspitem_i].intersect(par_np[nsp_j][nspitem_j], epsilon)
+            if intsparams:
+                for intsparam_i, intsparam_j in intsparams:
+                    npp_i = mynormpathparam(orig_np, nsp_i, nspitem_i, intsparam_i)
+                    npp_j = mynormpathparam(par_np, nsp_j, nspitem_j, intsparam_j)
+
+                    oparams.append(npp_i)
+                    params.append(npp_j)
         return params, oparams
     # >>>
     def _can_continue(self, param1, param2, epsilon=None): # <<<
@@ -1635,27 +1706,38 @@ class parallel(baseclasses.deformer): # <<<
         else:
             return (curv2 < curv1)
     # >>>
-    def _skip_intersection_doublet(self, npp_i, npp_j, parampairs, epsilon): # <<<
+    def _skip_intersection_doublet(self, npp_i, npp_j, parampairs, epsilon, cells): # <<<
         # An intersection point that lies exactly between two nsp-items can occur twice or more
         # times if we calculate all mutual intersections. We should take only
         # one such parameter pair, namely the one with smallest first and
         # largest last param.
+        # The keys of parampairs are kept in cells, a dict mapping grid cells
+        # of size epsilon to the keys located in them. Equivalent keys are
+        # found in the neighbouring cells only.
+        def cell(param):
+            x_pt, y_pt = param.normpath.at_pt([param])[0]
+            return math.floor(x_pt/epsilon), math.floor(y_pt/epsilon)
+
         result = False
         delete_keys = []
         delete_values = []
-        # TODO: improve complexity?
-        for pi, pj in parampairs.items():
-            if npp_i.is_equiv(pi, epsilon) and npp_j.is_equiv(pj, epsilon):
-                #print("double pair: ", npp_i, npp_j, pi, pj)
-                #print("... replacing ", pi, parampairs[pi], "by", min(npp_i, pi), max(npp_j, pj))
-                delete_keys.append(pi)
-                delete_values.append(pj)
-                result = True # we have already added this one
+        cx, cy = cell(npp_i)
+        for neighbour in [(cx+i, cy+j) for i in (-1, 0, 1) for j in (-1, 0, 1)]:
+            for pi in cells.get(neighbour, ()):
+                pj = parampairs[pi]
+                if npp_i.is_equiv(pi, epsilon) and npp_j.is_equiv(pj, epsilon):
+                    #print("double pair: ", npp_i, npp_j, pi, pj)
+                    #print("... replacing ", pi, parampairs[pi], "by", min(npp_i, pi), max(npp_j, pj))
+                    delete_keys.append(pi)
+                    delete_values.append(pj)
+                    result = True # we have already added this one
         newkey = min([npp_i] + delete_keys)
         newval = max([npp_j] + delete_values)
         for pi in delete_keys:
             del parampairs[pi]
+            cells[cell(pi)].remove(pi)
         parampairs[newkey] = newval
+        cells.setdefault(cell(newkey), []).append(newkey)
         return result
     # >>>
     def _elim_intersection_doublets(self, parampairs, epsilon): # <<<
@@ -1688,13 +1770,34 @@ class parallel(baseclasses.deformer): # <<<
                 print()
         return parampairs
     # >>>
-    def _between_paths(self, pos, par2orig, epsilon): # <<<
-        """Tests whether the given point (pos) is found in the forbidden zone between an original and a parallel nsp-item (these are in par2orig)
+    def _between_paths_zones(self, par2orig): # <<<
+        """Returns the forbidden zones between the original and parallel nsp-items in par2orig for _between_paths
+
+        The zones are a list of the (par_nspitem, origobj) pairs together with a spatial index of their boxes."""
+        dist = abs(self.dist_pt)
+        boxes = []
+        zones = []
+        for par_nspitem, origobj in par2orig.items():
+            if isinstance(origobj, normpath.normline_pt):
+                llx_pt, lly_pt, urx_pt, ury_pt = _cbox_pt(origobj, dist)
+            elif isinstance(origobj, normpath.normcurve_pt):
+                # not handled by _between_paths
+                continue
+            else:
+                cx, cy = origobj
+                llx_pt, lly_pt, urx_pt, ury_pt = cx - dist, cy - dist, cx + dist, cy + dist
+            boxes.append((llx_pt, lly_pt, urx_pt, ury_pt))
+            zones.append((par_nspitem, origobj))
+        return zones, _boxindex(boxes)
+    # >>>
+    def _between_paths(self, pos, par2orig_zones, epsilon): # <<<
+        """Tests whether the given point (pos) is found in the forbidden zone between an original and a parallel nsp-item (par2orig_zones as returned by _between_paths_zones)
 
         The test uses epsilon close to the original/parallel path, and sharp comparison at their ends."""
         dist = self.dist_pt
-        for par_nspitem in par2orig:
-            origobj = par2orig[par_nspitem]
+        zones, index = par2orig_zones
+        for i in index.overlapping((pos[0], pos[1], pos[0], pos[1])):
+            par_nspitem, origobj = zones[i]
             if isinstance(origobj, normpath.normline_pt):
                 rot = origobj.rotation([0])[0]
                 t, s = intersection(pos, origobj.atbegin_pt(), rot.apply_pt(0, mathutils.sign(dist)), rot.apply_pt(origobj.arclen_pt(epsilon), 0))
@@ -1749,48 +1852,25 @@ class linesmoothed(baseclasses.deformer): # <<<
         return linesmoothed(tension, atleast, lcurl, rcurl)
 
     def deform(self, basepath):
-        newnp = normpath.normpath()
-        for nsp in basepath.normpath().normsubpaths:
-            newnp += self.deformsubpath(nsp)
-        return newnp
+        return normpath.normpath([self.deformsubpath(nsp) for nsp in basepath.normpath().normsubpaths])
 
     def deformsubpath(self, nsp):
+        """Returns a normsubpath smoothly passing through the points of the given normsubpath"""
         from .metapost import path as mppath
-        """Returns a path/normpath from the points in the given normsubpath"""
         # TODO: epsilon ?
-        knots = []
-
-        # first point
-        x_pt, y_pt = nsp.atbegin_pt()
-        if nsp.closed:
-            knots.append(mppath.smoothknot_pt(x_pt, y_pt))
-        elif self.lcurl is None:
-            rot = nsp.rotation([0])[0]
-            dx, dy = rot.apply_pt(1, 0)
-            angle = math.atan2(dy, dx)
-            knots.append(mppath.beginknot_pt(x_pt, y_pt, angle=angle))
-        else:
-            knots.append(mppath.beginknot_pt(x_pt, y_pt, curl=self.lcurl))
-
-        # intermediate points:
-        for npelem in nsp[:-1]:
-            knots.append(mppath.tensioncurve(self.tension))
-            knots.append(mppath.smoothknot_pt(*npelem.atend_pt()))
-
-        # last point
-        knots.append(mppath.tensioncurve(self.tension))
-        x_pt, y_pt = nsp.atend_pt()
-        if nsp.closed:
-            pass
-        elif self.rcurl is None:
-            rot = nsp.rotation([len(nsp)])[0]
-            dx, dy = rot.apply_pt(1, 0)
-            angle = math.atan2(dy, dx)
-            knots.append(mppath.endknot_pt(x_pt, y_pt, angle=angle))
-        else:
-            knots.append(mppath.endknot_pt(x_pt, y_pt, curl=self.rcurl))
-
-        return mppath.path(knots)
+        x_pt, y_pt = zip(nsp.atbegin_pt(), *[npelem.atend_pt() for npelem in nsp[:-1]])
+        langle = rangle = None
+        if not nsp.closed:
+            x_pt += nsp.atend_pt()[0],
+            y_pt += nsp.atend_pt()[1],
+            if self.lcurl is None:
+                dx, dy = nsp.rotation([0])[0].apply_pt(1, 0)
+                langle = math.atan2(dy, dx)
+            if self.rcurl is None:
+                dx, dy = nsp.rotation([len(nsp)])[0].apply_pt(1, 0)
+                rangle = math.atan2(dy, dx)
+        return mppath.smoothnormsubpath_pt(x_pt, y_pt, nsp.closed, self.tension,
+                                           lcurl=self.lcurl, rcurl=self.rcurl, langle=langle, rangle=rangle)
 # >>>
 
 linesmoothed.clear = attr.clearclass(linesmoothed)
@@ -20,7 +20,7 @@
 # along with PyX; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
 
-import logging, sys
+import contextlib, logging, sys
 from . import bbox, pswriter, pdfwriter, svgwriter, trafo, style, unit
 
 logger = logging.getLogger("pyx")
@@ -167,6 +167,13 @@ def _outputstream(file, suffix):
         return _noclose(file)
 
 
+def _timing(report):
+    # the timing report to be activated while writing (if any)
+    if report is None:
+        return contextlib.nullcontext()
+    return report
+
+
 class document:
 
     """holds a collection of page instances which are output as pages of a document"""
@@ -180,29 +187,29 @@ class document:
     def append(self, page):
         self.pages.append(page)
 
-    def writeEPSfile(self, file=None, **kwargs):
-        with _outputstream(file, "eps") as f:
+    def writeEPSfile(self, file=None, timing=None, **kwargs):
+        with _outputstream(file, "eps") as f, _timing(timing):
             pswriter.EPSwriter(self, f, **kwargs)
 
-    def writePSfile(self, file=None, **kwargs):
-        with _outputstream(file, "ps") as f:
+    def writePSfile(self, file=None, timing=None, **kwargs):
+        with _outputstream(file, "ps") as f, _timing(timing):
             pswriter.PSwriter(self, f, **kwargs)
 
-    def writePDFfile(self, file=None, **kwargs):
-        with _outputstream(file, "pdf") as f:
+    def writePDFfile(self, file=None, timing=None, **kwargs):
+        with _outputstream(file, "pdf") as f, _timing(timing):
             pdfwriter.PDFwriter(self, f, **kwargs)
 
-    def writeSVGfile(self, file=None, **kwargs):
-        with _outputstream(file, "svg") as f:
+    def writeSVGfile(self, file=None, timing=None, **kwargs):
+        with _outputstream(file, "svg") as f, _timing(timing):
             svgwriter.SVGwriter(self, f, **kwargs)
 
-    def writetofile(self, filename, **kwargs):
+    def writetofile(self, filename, timing=None, **kwargs):
         for suffix, method in [("eps", pswriter.EPSwriter),
                                ("ps", pswriter.PSwriter),
                                ("pdf", pdfwriter.PDFwriter),
                                ("svg", svgwriter.SVGwriter)]:
             if filename.endswith(".{}".format(suffix)):
-                with open(filename, "wb") as f:
+                with open(filename, "wb") as f, _timing(timing):
                     method(self, f, **kwargs)
                 return
         raise ValueError("unknown file extension")
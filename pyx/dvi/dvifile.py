@@ -22,7 +22,7 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
 
 import io, logging, math, re, string, struct, sys
-from pyx import  bbox, canvas, color, epsfile, config, path, reader, trafo, unit
+from pyx import  bbox, canvas, color, epsfile, config, path, timing, trafo, unit
 from . import texfont, tfmfile
 
 logger = logging.getLogger("pyx")
@@ -68,6 +68,13 @@ _POS_X           = 3
 _POS_Y           = 4
 _POS_Z           = 5
 
+# precompiled structs for reading opcode parameters
+_rule_struct = struct.Struct(">ll")
+_bop_struct = struct.Struct(">10Ll")
+_pre_struct = struct.Struct(">BLLLB")
+_fntdef_struct = struct.Struct(">lllBB")
+_post_struct = struct.Struct(">lLLLLLHH")
+
 # reader states
 _READ_PRE       = 1
 _READ_NOPAGE    = 2
@@ -82,8 +89,13 @@ class DVIError(Exception): pass
 
 class DVIfile:
 
-    def __init__(self, filename, debug=0, debugfile=sys.stdout):
-        """ opens the dvi file and reads the preamble """
+    def __init__(self, filename, debug=0, debugfile=sys.stdout, growing=False):
+        """ opens the dvi file and reads the preamble
+
+        The dvi file is read at once and closed. When growing is set (as
+        needed in texipc mode, where TeX is still writing pages to the
+        file), the file is kept open to fetch the data appended later on.
+        It is closed, when the end of the file is reached or by close."""
         self.filename = filename
         self.debug = debug
         self.debugfile = debugfile
@@ -102,12 +114,40 @@ class DVIfile:
         # stack for self.file, self.fonts and self.stack, needed for VF inclusion
         self.statestack = []
 
-        self.file = reader.reader(self.filename)
+        # the dvi file is read at once (further data is read when
+        # available, if the file is growing); self.data contains the dvi
+        # data currently interpreted (the dvi file or a dvi chunk of a
+        # virtual font), self.datapos is the position of the next byte to
+        # be read and self.dataoffset is the file position of self.data
+        self.file = open(self.filename, "rb")
+        try:
+            self.data = self.file.read()
+        except:
+            self.close()
+            raise
+        if not growing:
+            self.close()
+        self.datapos = 0
+        self.dataoffset = 0
 
         # currently read byte in file (for debugging output)
         self.filepos = None
 
-        self._read_pre()
+        # mapping of page ids (tuple of the ten counts) to the file
+        # positions of the pages, when read by readpageindex
+        self.pageindex = None
+
+        try:
+            self._read_pre()
+        except:
+            self.close()
+            raise
+
+    def close(self):
+        """ closes the dvi file, when it is still kept open for further data """
+        if self.file is not None:
+            self.file.close()
+            self.file = None
 
     # helper routines
 
@@ -331,14 +371,16 @@ class DVIfile:
         self.debugstack.append(self.debug)
         self.debug = 0
 
-        self.statestack.append((self.file, self.fonts, self.activefont, afterpos, self.stack, self.scale))
+        self.statestack.append((self.data, self.datapos, self.dataoffset, self.fonts, self.activefont, afterpos, self.stack, self.scale))
 
         # units in vf files are relative to the size of the font and given as fix_words
         # which can be converted to floats by diving by 2**20.
         # This yields the following scale factor for the height and width of rects:
         self.scale = fontsize/2**20/self.pyxconv
 
-        self.file = reader.bytesreader(dvi)
+        self.data = dvi
+        self.datapos = 0
+        self.dataoffset = 0
         self.fonts = fonts
         self.stack = []
         self.filepos = 0
@@ -351,23 +393,52 @@ class DVIfile:
         #    self.debugfile.write("finished executing dvi chunk\n")
         self.debug = self.debugstack.pop()
 
-        self.file.close()
-        self.file, self.fonts, self.activefont, self.pos, self.stack, self.scale = self.statestack.pop()
+        self.data, self.datapos, self.dataoffset, self.fonts, self.activefont, self.pos, self.stack, self.scale = self.statestack.pop()
+
+    # routines to read opcode parameters
+
+    def _need(self, bytes):
+        """ensure that bytes are available in self.data at self.datapos
+
+        For the dvi file itself, data written to the file after it has
+        been read is fetched when needed."""
+        if self.datapos + bytes > len(self.data):
+            if not self.statestack and self.file is not None:
+                self.dataoffset += self.datapos
+                self.data = self.data[self.datapos:] + self.file.read()
+                self.datapos = 0
+            if self.datapos + bytes > len(self.data):
+                raise DVIError("unexpected end of dvi data")
+
+    def _readint(self, bytes, signed=0):
+        self._need(bytes)
+        pos = self.datapos
+        self.datapos = pos + bytes
+        return int.from_bytes(self.data[pos:self.datapos], "big", signed=signed)
+
+    def _readstruct(self, s):
+        self._need(s.size)
+        pos = self.datapos
+        self.datapos = pos + s.size
+        return s.unpack_from(self.data, pos)
+
+    def _readbytes(self, bytes):
+        self._need(bytes)
+        pos = self.datapos
+        self.datapos = pos + bytes
+        return self.data[pos:self.datapos]
 
     # routines corresponding to the different reader states of the dvi maschine
 
     def _read_pre(self):
-        afile = self.file
         while True:
-            self.filepos = afile.tell()
-            cmd = afile.readuchar()
+            self.filepos = self.dataoffset + self.datapos
+            cmd = self._readint(1)
             if cmd == _DVI_NOP:
                 pass
             elif cmd == _DVI_PRE:
-                if afile.readuchar() != _DVI_VERSION: raise DVIError
-                num = afile.readuint32()
-                den = afile.readuint32()
-                self.mag = afile.readuint32()
+                version, num, den, self.mag, commentlength = self._readstruct(_pre_struct)
+                if version != _DVI_VERSION: raise DVIError
 
                 # For the interpretation of the lengths in dvi and tfm files, 
                 # three conversion factors are relevant:
@@ -392,11 +463,66 @@ class DVIfile:
                 # scaling used for rules when VF chunks are interpreted
                 self.scale = 1
 
-                comment = afile.read(afile.readuchar())
+                comment = self._readbytes(commentlength)
                 return
             else:
                 raise DVIError
 
+    @timing.timed("dvi")
+    def readpageindex(self):
+        """ reads the page index and the font definitions from the postamble
+
+        The dvi file must be complete. The file positions of all pages
+        are collected by following the back-pointers of the bop opcodes
+        and stored in self.pageindex. Afterwards, pages can be read in
+        arbitrary order by seekpage and readpage."""
+        if self.file is not None:
+            try:
+                self.data += self.file.read()
+            finally:
+                self.close()
+        data = self.data
+        end = len(data)
+        while end and data[end-1] == 223:
+            end -= 1
+        if end < 5 or data[end-1] != _DVI_VERSION:
+            raise DVIError("invalid postamble")
+        post = int.from_bytes(data[end-5:end-1], "big", signed=True) - self.dataoffset
+        if post < 0 or data[post] != _DVI_POST:
+            raise DVIError("invalid postamble")
+        currentpos = self.datapos
+        self.datapos = post + 1
+        bop = self._readstruct(_post_struct)[0]
+        while True:
+            self.filepos = self.dataoffset + self.datapos
+            cmd = self._readint(1)
+            if _DVI_FNTDEF1234 <= cmd < _DVI_FNTDEF1234 + 4:
+                self._do_fntdef(cmd, None)
+            elif cmd == _DVI_POSTPOST:
+                break
+            elif cmd != _DVI_NOP:
+                raise DVIError("invalid postamble")
+        self.pageindex = {}
+        while bop != -1:
+            self.datapos = bop - self.dataoffset
+            if self.datapos < 0 or self._readint(1) != _DVI_BOP:
+                raise DVIError("invalid page back-pointer")
+            counts = self._readstruct(_bop_struct)
+            self.pageindex[counts[:10]] = bop
+            bop = counts[10]
+        self.datapos = currentpos
+
+    def seekpage(self, pageid):
+        """ positions the reader at the beginning of the page pageid
+
+        The page index needs to be read by readpageindex before."""
+        try:
+            filepos = self.pageindex[tuple(pageid)]
+        except KeyError:
+            raise DVIError("page %s not found" % list(pageid))
+        self.datapos = filepos - self.dataoffset
+
+    @timing.timed("dvi")
     def readpage(self, pageid=None, fontmap=None, singlecharmode=False, attrs=[]):
         """ reads a page from the dvi file
 
@@ -407,20 +533,19 @@ class DVIfile:
         self.singlecharmode = singlecharmode
 
         while True:
-            self.filepos = self.file.tell()
-            cmd = self.file.readuchar()
+            self.filepos = self.dataoffset + self.datapos
+            cmd = self._readint(1)
             if cmd == _DVI_NOP:
                 pass
             elif cmd == _DVI_BOP:
-                ispageid = [self.file.readuint32() for i in range(10)]
+                ispageid = list(self._readstruct(_bop_struct)[:10])
                 if pageid is not None and ispageid != pageid:
                     raise DVIError("invalid pageid")
                 if self.debug:
                     self.debugfile.write("%d: beginning of page %i\n" % (self.filepos, ispageid[0]))
-                self.file.readuint32()
                 break
             elif cmd == _DVI_POST:
-                self.file.close()
+                self.close()
                 return None # nothing left
             else:
                 raise DVIError
@@ -432,182 +557,199 @@ class DVIfile:
         # tuple (hpos, vpos, codepoints) to be output, or None if no output is pending
         self.activetext = None
 
+        dispatch = self._dispatch
         while True:
-            afile = self.file
-            self.filepos = afile.tell()
-            try:
-                cmd = afile.readuchar()
-            except struct.error:
-                # we most probably (if the dvi file is not corrupt) hit the end of a dvi chunk,
-                # so we have to continue with the rest of the dvi file
-                self._pop_dvistring(fontmap)
-                continue
-            if cmd == _DVI_NOP:
-                pass
-            if cmd >= _DVI_CHARMIN and cmd <= _DVI_CHARMAX:
-                self.putchar(cmd, True, 0, fontmap)
-            elif cmd >= _DVI_SET1234 and cmd < _DVI_SET1234 + 4:
-                self.putchar(afile.readint(cmd - _DVI_SET1234 + 1), True, cmd-_DVI_SET1234+1, fontmap)
-            elif cmd == _DVI_SETRULE:
-                self.putrule(afile.readint32()*self.scale, afile.readint32()*self.scale, True, fontmap)
-            elif cmd >= _DVI_PUT1234 and cmd < _DVI_PUT1234 + 4:
-                self.putchar(afile.readint(cmd - _DVI_PUT1234 + 1), False, cmd-_DVI_SET1234+1, fontmap)
-            elif cmd == _DVI_PUTRULE:
-                self.putrule(afile.readint32()*self.scale, afile.readint32()*self.scale, False, fontmap)
-            elif cmd == _DVI_EOP:
-                self.flushtext(fontmap)
-                if self.debug:
-                    self.debugfile.write("%d: eop\n \n" % self.filepos)
+            pos = self.datapos
+            if pos >= len(self.data):
+                if self.statestack:
+                    # we most probably (if the dvi file is not corrupt) hit the end of a dvi chunk,
+                    # so we have to continue with the rest of the dvi file
+                    self._pop_dvistring(fontmap)
+                    continue
+                self._need(1)
+                pos = self.datapos
+            self.filepos = self.dataoffset + pos
+            cmd = self.data[pos]
+            self.datapos = pos + 1
+            if dispatch[cmd](self, cmd, fontmap):
                 return self.actpage
-            elif cmd == _DVI_PUSH:
-                self.stack.append(list(self.pos))
-                if self.debug:
-                    self.debugfile.write("%s: push\n"
-                                         "level %d:(h=%d,v=%d,w=%d,x=%d,y=%d,z=%d,hh=???,vv=???)\n" %
-                                         ((self.filepos, len(self.stack)-1) + tuple(self.pos)))
-            elif cmd == _DVI_POP:
-                self.flushtext(fontmap)
-                self.pos = self.stack.pop()
-                if self.debug:
-                    self.debugfile.write("%s: pop\n"
-                                         "level %d:(h=%d,v=%d,w=%d,x=%d,y=%d,z=%d,hh=???,vv=???)\n" %
-                                         ((self.filepos, len(self.stack)) + tuple(self.pos)))
-            elif cmd >= _DVI_RIGHT1234 and cmd < _DVI_RIGHT1234 + 4:
-                self.flushtext(fontmap)
-                dh = afile.readint(cmd - _DVI_RIGHT1234 + 1, 1) * self.scale
-                if self.debug:
-                    self.debugfile.write("%d: right%d %d h:=%d%+d=%d, hh:=???\n" %
-                                         (self.filepos,
-                                          cmd - _DVI_RIGHT1234 + 1,
-                                          dh,
-                                          self.pos[_POS_H],
-                                          dh,
-                                          self.pos[_POS_H]+dh))
-                self.pos[_POS_H] += dh
-            elif cmd == _DVI_W0:
-                self.flushtext(fontmap)
-                if self.debug:
-                    self.debugfile.write("%d: w0 %d h:=%d%+d=%d, hh:=???\n" %
-                                         (self.filepos,
-                                          self.pos[_POS_W],
-                                          self.pos[_POS_H],
-                                          self.pos[_POS_W],
-                                          self.pos[_POS_H]+self.pos[_POS_W]))
-                self.pos[_POS_H] += self.pos[_POS_W]
-            elif cmd >= _DVI_W1234 and cmd < _DVI_W1234 + 4:
-                self.flushtext(fontmap)
-                self.pos[_POS_W] = afile.readint(cmd - _DVI_W1234 + 1, 1) * self.scale
-                if self.debug:
-                    self.debugfile.write("%d: w%d %d h:=%d%+d=%d, hh:=???\n" %
-                                         (self.filepos,
-                                          cmd - _DVI_W1234 + 1,
-                                          self.pos[_POS_W],
-                                          self.pos[_POS_H],
-                                          self.pos[_POS_W],
-                                          self.pos[_POS_H]+self.pos[_POS_W]))
-                self.pos[_POS_H] += self.pos[_POS_W]
-            elif cmd == _DVI_X0:
-                self.flushtext(fontmap)
-                if self.debug:
-                    self.debugfile.write("%d: x0 %d h:=%d%+d=%d, hh:=???\n" %
-                                         (self.filepos,
-                                          self.pos[_POS_X],
-                                          self.pos[_POS_H],
-                                          self.pos[_POS_X],
-                                          self.pos[_POS_H]+self.pos[_POS_X]))
-                self.pos[_POS_H] += self.pos[_POS_X]
-            elif cmd >= _DVI_X1234 and cmd < _DVI_X1234 + 4:
-                self.flushtext(fontmap)
-                self.pos[_POS_X] = afile.readint(cmd - _DVI_X1234 + 1, 1) * self.scale
-                if self.debug:
-                    self.debugfile.write("%d: x%d %d h:=%d%+d=%d, hh:=???\n" %
-                                         (self.filepos,
-                                          cmd - _DVI_X1234 + 1,
-                                          self.pos[_POS_X],
-                                          self.pos[_POS_H],
-                                          self.pos[_POS_X],
-                                          self.pos[_POS_H]+self.pos[_POS_X]))
-                self.pos[_POS_H] += self.pos[_POS_X]
-            elif cmd >= _DVI_DOWN1234 and cmd < _DVI_DOWN1234 + 4:
-                self.flushtext(fontmap)
-                dv = afile.readint(cmd - _DVI_DOWN1234 + 1, 1) * self.scale
-                if self.debug:
-                    self.debugfile.write("%d: down%d %d v:=%d%+d=%d, vv:=???\n" %
-                                         (self.filepos,
-                                          cmd - _DVI_DOWN1234 + 1,
-                                          dv,
-                                          self.pos[_POS_V],
-                                          dv,
-                                          self.pos[_POS_V]+dv))
-                self.pos[_POS_V] += dv
-            elif cmd == _DVI_Y0:
-                self.flushtext(fontmap)
-                if self.debug:
-                    self.debugfile.write("%d: y0 %d v:=%d%+d=%d, vv:=???\n" %
-                                         (self.filepos,
-                                          self.pos[_POS_Y],
-                                          self.pos[_POS_V],
-                                          self.pos[_POS_Y],
-                                          self.pos[_POS_V]+self.pos[_POS_Y]))
-                self.pos[_POS_V] += self.pos[_POS_Y]
-            elif cmd >= _DVI_Y1234 and cmd < _DVI_Y1234 + 4:
-                self.flushtext(fontmap)
-                self.pos[_POS_Y] = afile.readint(cmd - _DVI_Y1234 + 1, 1) * self.scale
-                if self.debug:
-                    self.debugfile.write("%d: y%d %d v:=%d%+d=%d, vv:=???\n" %
-                                         (self.filepos,
-                                          cmd - _DVI_Y1234 + 1,
-                                          self.pos[_POS_Y],
-                                          self.pos[_POS_V],
-                                          self.pos[_POS_Y],
-                                          self.pos[_POS_V]+self.pos[_POS_Y]))
-                self.pos[_POS_V] += self.pos[_POS_Y]
-            elif cmd == _DVI_Z0:
-                self.flushtext(fontmap)
-                if self.debug:
-                    self.debugfile.write("%d: z0 %d v:=%d%+d=%d, vv:=???\n" %
-                                         (self.filepos,
-                                          self.pos[_POS_Z],
-                                          self.pos[_POS_V],
-                                          self.pos[_POS_Z],
-                                          self.pos[_POS_V]+self.pos[_POS_Z]))
-                self.pos[_POS_V] += self.pos[_POS_Z]
-            elif cmd >= _DVI_Z1234 and cmd < _DVI_Z1234 + 4:
-                self.flushtext(fontmap)
-                self.pos[_POS_Z] = afile.readint(cmd - _DVI_Z1234 + 1, 1) * self.scale
-                if self.debug:
-                    self.debugfile.write("%d: z%d %d v:=%d%+d=%d, vv:=???\n" %
-                                         (self.filepos,
-                                          cmd - _DVI_Z1234 + 1,
-                                          self.pos[_POS_Z],
-                                          self.pos[_POS_V],
-                                          self.pos[_POS_Z],
-                                          self.pos[_POS_V]+self.pos[_POS_Z]))
-                self.pos[_POS_V] += self.pos[_POS_Z]
-            elif cmd >= _DVI_FNTNUMMIN and cmd <= _DVI_FNTNUMMAX:
-                self.usefont(cmd - _DVI_FNTNUMMIN, 0, fontmap)
-            elif cmd >= _DVI_FNT1234 and cmd < _DVI_FNT1234 + 4:
-                # note that according to the DVI docs, for four byte font numbers,
-                # the font number is signed. Don't ask why!
-                fntnum = afile.readint(cmd - _DVI_FNT1234 + 1, cmd == _DVI_FNT1234 + 3)
-                self.usefont(fntnum, cmd-_DVI_FNT1234+1, fontmap)
-            elif cmd >= _DVI_SPECIAL1234 and cmd < _DVI_SPECIAL1234 + 4:
-                self.special(afile.read(afile.readint(cmd - _DVI_SPECIAL1234 + 1)).decode("ascii"), fontmap)
-            elif cmd >= _DVI_FNTDEF1234 and cmd < _DVI_FNTDEF1234 + 4:
-                if cmd == _DVI_FNTDEF1234:
-                    num = afile.readuchar()
-                elif cmd == _DVI_FNTDEF1234+1:
-                    num = afile.readuint16()
-                elif cmd == _DVI_FNTDEF1234+2:
-                    num = afile.readuint24()
-                elif cmd == _DVI_FNTDEF1234+3:
-                    # Cool, here we have according to docu a signed int. Why?
-                    num = afile.readint32()
-                self.definefont(cmd-_DVI_FNTDEF1234+1,
-                                num,
-                                afile.readint32(),
-                                afile.readint32(),
-                                afile.readint32(),
-                                afile.read(afile.readuchar()+afile.readuchar()).decode("ascii"))
-            else:
-                raise DVIError
+
+    # opcode handlers called by readpage via the dispatch table
+    # (a true return value marks the end of the page)
+
+    def _do_setchar(self, cmd, fontmap):
+        font = self.activefont
+        if self.debug or self.singlecharmode or isinstance(font, texfont.virtualfont):
+            self.putchar(cmd, True, 0, fontmap)
+            return
+        # merge a run of set_char opcodes into the active text
+        data = self.data
+        start = self.datapos - 1
+        end = start + 1
+        length = len(data)
+        while end < length and data[end] <= _DVI_CHARMAX:
+            end += 1
+        self.datapos = end
+        charcodes = data[start:end]
+        if self.activetext is None:
+            self.activetext = (self.pos[_POS_H], self.pos[_POS_V], [])
+        self.activetext[2].extend(charcodes)
+        getwidth_dvi = font.getwidth_dvi
+        for charcode in charcodes:
+            self.pos[_POS_H] += getwidth_dvi(charcode)
+
+    def _do_set(self, cmd, fontmap):
+        self.putchar(self._readint(cmd - _DVI_SET1234 + 1), True, cmd-_DVI_SET1234+1, fontmap)
+
+    def _do_setrule(self, cmd, fontmap):
+        height, width = self._readstruct(_rule_struct)
+        self.putrule(height*self.scale, width*self.scale, True, fontmap)
+
+    def _do_put(self, cmd, fontmap):
+        self.putchar(self._readint(cmd - _DVI_PUT1234 + 1), False, cmd-_DVI_SET1234+1, fontmap)
+
+    def _do_putrule(self, cmd, fontmap):
+        height, width = self._readstruct(_rule_struct)
+        self.putrule(height*self.scale, width*self.scale, False, fontmap)
+
+    def _do_nop(self, cmd, fontmap):
+        pass
+
+    def _do_eop(self, cmd, fontmap):
+        self.flushtext(fontmap)
+        if self.debug:
+            self.debugfile.write("%d: eop\n \n" % self.filepos)
+        return True
+
+    def _do_push(self, cmd, fontmap):
+        self.stack.append(list(self.pos))
+        if self.debug:
+            self.debugfile.write("%s: push\n"
+                                 "level %d:(h=%d,v=%d,w=%d,x=%d,y=%d,z=%d,hh=???,vv=???)\n" %
+                                 ((self.filepos, len(self.stack)-1) + tuple(self.pos)))
+
+    def _do_pop(self, cmd, fontmap):
+        self.flushtext(fontmap)
+        self.pos = self.stack.pop()
+        if self.debug:
+            self.debugfile.write("%s: pop\n"
+                                 "level %d:(h=%d,v=%d,w=%d,x=%d,y=%d,z=%d,hh=???,vv=???)\n" %
+                                 ((self.filepos, len(self.stack)) + tuple(self.pos)))
+
+    def _do_right(self, cmd, fontmap):
+        self.flushtext(fontmap)
+        dh = self._readint(cmd - _DVI_RIGHT1234 + 1, 1) * self.scale
+        if self.debug:
+            self.debugfile.write("%d: right%d %d h:=%d%+d=%d, hh:=???\n" %
+                                 (self.filepos, cmd - _DVI_RIGHT1234 + 1, dh,
+                                  self.pos[_POS_H], dh, self.pos[_POS_H]+dh))
+        self.pos[_POS_H] += dh
+
+    def _do_down(self, cmd, fontmap):
+        self.flushtext(fontmap)
+        dv = self._readint(cmd - _DVI_DOWN1234 + 1, 1) * self.scale
+        if self.debug:
+            self.debugfile.write("%d: down%d %d v:=%d%+d=%d, vv:=???\n" %
+                                 (self.filepos, cmd - _DVI_DOWN1234 + 1, dv,
+                                  self.pos[_POS_V], dv, self.pos[_POS_V]+dv))
+        self.pos[_POS_V] += dv
+
+    def _movereg(self, name, reg, posindex, fontmap):
+        # helper routine for w0, x0, y0, z0 and (after setting the register) w, x, y, z
+        self.flushtext(fontmap)
+        if self.debug:
+            self.debugfile.write("%d: %s %d %s:=%d%+d=%d, %s:=???\n" %
+                                 (self.filepos, name, self.pos[reg],
+                                  "hv"[posindex], self.pos[posindex], self.pos[reg],
+                                  self.pos[posindex]+self.pos[reg], ["hh", "vv"][posindex]))
+        self.pos[posindex] += self.pos[reg]
+
+    def _do_w0(self, cmd, fontmap):
+        self._movereg("w0", _POS_W, _POS_H, fontmap)
+
+    def _do_w(self, cmd, fontmap):
+        self.flushtext(fontmap)
+        self.pos[_POS_W] = self._readint(cmd - _DVI_W1234 + 1, 1) * self.scale
+        self._movereg("w%d" % (cmd - _DVI_W1234 + 1), _POS_W, _POS_H, fontmap)
+
+    def _do_x0(self, cmd, fontmap):
+        self._movereg("x0", _POS_X, _POS_H, fontmap)
+
+    def _do_x(self, cmd, fontmap):
+        self.flushtext(fontmap)
+        self.pos[_POS_X] = self._readint(cmd - _DVI_X1234 + 1, 1) * self.scale
+        self._movereg("x%d" % (cmd - _DVI_X1234 + 1), _POS_X, _POS_H, fontmap)
+
+    def _do_y0(self, cmd, fontmap):
+        self._movereg("y0", _POS_Y, _POS_V, fontmap)
+
+    def _do_y(self, cmd, fontmap):
+        self.flushtext(fontmap)
+        self.pos[_POS_Y] = self._readint(cmd - _DVI_Y1234 + 1, 1) * self.scale
+        self._movereg("y%d" % (cmd - _DVI_Y1234 + 1), _POS_Y, _POS_V, fontmap)
+
+    def _do_z0(self, cmd, fontmap):
+        self._movereg("z0", _POS_Z, _POS_V, fontmap)
+
+    def _do_z(self, cmd, fontmap):
+        self.flushtext(fontmap)
+        self.pos[_POS_Z] = self._readint(cmd - _DVI_Z1234 + 1, 1) * self.scale
+        self._movereg("z%d" % (cmd - _DVI_Z1234 + 1), _POS_Z, _POS_V, fontmap)
+
+    def _do_fntnum(self, cmd, fontmap):
+        self.usefont(cmd - _DVI_FNTNUMMIN, 0, fontmap)
+
+    def _do_fnt(self, cmd, fontmap):
+        # note that according to the DVI docs, for four byte font numbers,
+        # the font number is signed. Don't ask why!
+        fntnum = self._readint(cmd - _DVI_FNT1234 + 1, cmd == _DVI_FNT1234 + 3)
+        self.usefont(fntnum, cmd-_DVI_FNT1234+1, fontmap)
+
+    def _do_special(self, cmd, fontmap):
+        self.special(self._readbytes(self._readint(cmd - _DVI_SPECIAL1234 + 1)).decode("ascii"), fontmap)
+
+    def _do_fntdef(self, cmd, fontmap):
+        # Cool, here we have according to docu a signed int for four bytes. Why?
+        num = self._readint(cmd - _DVI_FNTDEF1234 + 1, cmd == _DVI_FNTDEF1234 + 3)
+        c, q, d, arealength, namelength = self._readstruct(_fntdef_struct)
+        fontname = self._readbytes(arealength+namelength).decode("ascii")
+        if num in self.fonts and self.fonts[num].name == fontname:
+            # the font was already defined by the postamble (see readpageindex)
+            if self.debug:
+                self.debugfile.write("%d: fntdef%d %i: %s\n" % (self.filepos, cmd-_DVI_FNTDEF1234+1, num, fontname))
+        else:
+            self.definefont(cmd-_DVI_FNTDEF1234+1, num, c, q, d, fontname)
+
+    def _do_invalid(self, cmd, fontmap):
+        raise DVIError
+
+
+DVIfile._dispatch = [DVIfile._do_invalid] * 256
+for _cmd in range(_DVI_CHARMIN, _DVI_CHARMAX + 1):
+    DVIfile._dispatch[_cmd] = DVIfile._do_setchar
+for _cmd, _do in [(_DVI_SETRULE, DVIfile._do_setrule),
+                  (_DVI_PUTRULE, DVIfile._do_putrule),
+                  (_DVI_NOP, DVIfile._do_nop),
+                  (_DVI_EOP, DVIfile._do_eop),
+                  (_DVI_PUSH, DVIfile._do_push),
+                  (_DVI_POP, DVIfile._do_pop),
+                  (_DVI_W0, DVIfile._do_w0),
+                  (_DVI_X0, DVIfile._do_x0),
+                  (_DVI_Y0, DVIfile._do_y0),
+                  (_DVI_Z0, DVIfile._do_z0)]:
+    DVIfile._dispatch[_cmd] = _do
+for _cmd in range(4):
+    DVIfile._dispatch[_DVI_SET1234 + _cmd] = DVIfile._do_set
+    DVIfile._dispatch[_DVI_PUT1234 + _cmd] = DVIfile._do_put
+    DVIfile._dispatch[_DVI_RIGHT1234 + _cmd] = DVIfile._do_right
+    DVIfile._dispatch[_DVI_W1234 + _cmd] = DVIfile._do_w
+    DVIfile._dispatch[_DVI_X1234 + _cmd] = DVIfile._do_x
+    DVIfile._dispatch[_DVI_DOWN1234 + _cmd] = DVIfile._do_down
+    DVIfile._dispatch[_DVI_Y1234 + _cmd] = DVIfile._do_y
+    DVIfile._dispatch[_DVI_Z1234 + _cmd] = DVIfile._do_z
+    DVIfile._dispatch[_DVI_FNT1234 + _cmd] = DVIfile._do_fnt
+    DVIfile._dispatch[_DVI_SPECIAL1234 + _cmd] = DVIfile._do_special
+    DVIfile._dispatch[_DVI_FNTDEF1234 + _cmd] = DVIfile._do_fntdef
+for _cmd in range(_DVI_FNTNUMMIN, _DVI_FNTNUMMAX + 1):
+    DVIfile._dispatch[_cmd] = DVIfile._do_fntnum
+del _cmd, _do
@@ -20,7 +20,7 @@
 # along with PyX; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
 
-import logging, os, string, tempfile
+import collections, hashlib, io, logging, os, string, tempfile
 from . import baseclasses, bbox, config, unit, trafo, pswriter
 
 logger = logging.getLogger("pyx")
@@ -221,10 +221,91 @@ def _readbbox(file):
     return usebbox
 
 
+class _epsfiledata:
+
+    """contents of an EPS file with its bounding box and hash"""
+
+    def __init__(self, contents):
+        self.contents = contents
+        self._bbox_pt = None
+        self._hash = None
+
+    def bbox(self):
+        if self._bbox_pt is None:
+            abbox = _readbbox(io.BytesIO(self.contents))
+            self._bbox_pt = abbox.llx_pt, abbox.lly_pt, abbox.urx_pt, abbox.ury_pt
+        return bbox.bbox_pt(*self._bbox_pt)
+
+    def hash(self):
+        if self._hash is None:
+            self._hash = hashlib.sha1(self.contents).hexdigest()
+        return self._hash
+
+
+# EPS files are cached by their path and modification time; the bitmaps
+# created for the PDF output are cached by the file hash, the bounding box,
+# the clipping, the transformation and the resolution. The bitmaps are kept
+# as PNG data, which is decoded for each use. Both caches are bounded by the
+# total number of bytes kept and can be emptied by clearcaches.
+
+class _cache:
+
+    """least recently used cache bounded by the total size of its values"""
+
+    def __init__(self):
+        self.items = collections.OrderedDict()
+        self.bytes = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def get(self, key):
+        """returns the value at key (raises KeyError when not in the cache)"""
+        bytes, value = self.items[key]
+        self.items.move_to_end(key)
+        return value
+
+    def put(self, key, value, bytes, maxbytes):
+        """stores value at key, where bytes is the size of value
+
+        Least recently used values are removed to keep the total size below
+        maxbytes. A value larger than maxbytes is not stored at all."""
+        if key in self.items:
+            self.bytes -= self.items.pop(key)[0]
+        if bytes > maxbytes:
+            return
+        self.items[key] = bytes, value
+        self.bytes += bytes
+        while self.bytes > maxbytes:
+            oldbytes, oldvalue = self.items.popitem(last=False)[1]
+            self.bytes -= oldbytes
+
+    def clear(self):
+        self.items.clear()
+        self.bytes = 0
+
+#: maximal total size in bytes of the EPS files kept in memory
+epsfilecachebytes = 64*1024*1024
+_epsfilecache = _cache()
+
+#: maximal total size in bytes of the PNG data of the bitmaps of EPS files
+#: kept in memory (0 disables the cache)
+bitmapcachebytes = 64*1024*1024
+_bitmapcache = _cache()
+
+def clearcaches():
+    """empties the caches of the contents of EPS files and their bitmaps"""
+    _epsfilecache.clear()
+    _bitmapcache.clear()
+
+
 class epsfile(baseclasses.canvasitem):
 
     """class for epsfiles"""
 
+    #: resolution of the bitmap used to include the EPS file in PDF output
+    pdfresolution = 600
+
     def __init__(self,
                  x, y, filename,
                  width=None, height=None, scale=None, align="bl",
@@ -248,8 +329,7 @@ class epsfile(baseclasses.canvasitem):
         if bbox:
             self.mybbox = bbox
         else:
-            with self.open() as epsfile:
-                self.mybbox = _readbbox(epsfile)
+            self.mybbox = self.data().bbox()
 
         # determine scaling in x and y direction
         self.scalex = self.scaley = scale
@@ -314,6 +394,28 @@ class epsfile(baseclasses.canvasitem):
         else:
             return open(self.filename, "rb")
 
+    def data(self):
+        """returns the contents of the EPS file
+
+        The file is read once and kept in a cache until it is modified.
+        Files located by kpsearch are not checked for modifications."""
+        if self.kpsearch:
+            key, stamp = (self.filename, self.kpsearch), None
+        else:
+            stat = os.stat(self.filename)
+            key, stamp = os.path.abspath(self.filename), (stat.st_mtime_ns, stat.st_size)
+        try:
+            cachedstamp, data = _epsfilecache.get(key)
+        except KeyError:
+            pass
+        else:
+            if cachedstamp == stamp:
+                return data
+        with self.open() as epsfile:
+            data = _epsfiledata(epsfile.read())
+        _epsfilecache.put(key, (stamp, data), len(data.contents), epsfilecachebytes)
+        return data
+
     def bbox(self):
         return self.mybbox.transformed(self.trafo)
 
@@ -332,8 +434,7 @@ class epsfile(baseclasses.canvasitem):
 
         file.write("%%%%BeginDocument: %s\n" % self.filename)
 
-        with self.open() as epsfile:
-            file.write_bytes(epsfile.read())
+        file.write_bytes(self.data().contents)
 
         file.write("%%EndDocument\n")
         file.write("EndEPSF\n")
@@ -342,9 +443,16 @@ class epsfile(baseclasses.canvasitem):
         logger.warning("EPS file is included as a bitmap created using pipeGS")
         from pyx import bitmap, canvas
         from PIL import Image
-        c = canvas.canvas()
-        c.insert(self)
-        i = Image.open(c.pipeGS(device="pngalpha", resolution=600))
+        key = (self.data().hash(), self.mybbox.highrestuple_pt(), self.clip,
+               self.trafo.matrix, self.trafo.vector, self.pdfresolution)
+        try:
+            png = _bitmapcache.get(key)
+        except KeyError:
+            c = canvas.canvas()
+            c.insert(self)
+            png = c.pipeGS(device="pngalpha", resolution=self.pdfresolution).getvalue()
+            _bitmapcache.put(key, png, len(png), bitmapcachebytes)
+        i = Image.open(io.BytesIO(png))
         i.load()
         b = bitmap.bitmap_pt(self.bbox().llx_pt, self.bbox().lly_pt, i)
         # we slightly shift the bitmap to re-center it, as the bitmap might contain some additional border
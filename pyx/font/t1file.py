@@ -20,7 +20,7 @@
 # along with PyX; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
 
-import array, binascii, io, logging, math, re
+import array, binascii, collections, hashlib, io, logging, math, os, re, tempfile
 try:
     import zlib
     haszlib = True
@@ -29,7 +29,7 @@ except ImportError:
 
 logger = logging.getLogger("pyx")
 
-from pyx import trafo, reader, writer
+from pyx import config, timing, trafo, reader, writer
 from pyx.path import path, moveto_pt, lineto_pt, curveto_pt, closepath
 
 try:
@@ -634,6 +634,63 @@ T1setcurrentpoint = _T1setcurrentpoint()
 class FontFormatError(Exception):
     pass
 
+# Stripped fonts are cached by the content of the font and the requested
+# glyphs and charcodes. In addition to the bounded cache in memory, the
+# stripped fonts are stored as files in the directory strippedfontcachedir
+# (taken from the stripcachedir option in the font section of the pyxrc),
+# where the least recently used files beyond strippedfontcachedirsize are
+# removed. The disk cache is disabled when strippedfontcachedir is None.
+
+strippedfontcachesize = 64
+_strippedfontcache = collections.OrderedDict()
+
+strippedfontcachedir = config.get("font", "stripcachedir", "") or None
+strippedfontcachedirsize = config.getint("font", "stripcachedirsize", 1000)
+
+def _cacheput(cache, size, key, value):
+    cache[key] = value
+    while len(cache) > size:
+        cache.popitem(last=False)
+
+def _readstrippedfont(key):
+    """return the glyphs and the parts of a stripped font from the disk cache or None"""
+    filename = os.path.join(strippedfontcachedir, key + ".font")
+    try:
+        with open(filename, "rb") as file:
+            header, data = file.read().split(b"\n", 1)
+        os.utime(filename)
+        length1, length2, length3, *glyphs = header.decode("ascii").split()
+        length1, length2, length3 = int(length1), int(length2), int(length3)
+    except (OSError, ValueError):
+        return None
+    if len(data) != length1 + length2 + length3:
+        return None
+    return (frozenset(glyphs),
+            data[:length1].decode("ascii", errors="surrogateescape"),
+            data[length1:length1+length2],
+            data[length1+length2:].decode("ascii", errors="surrogateescape"))
+
+def _writestrippedfont(key, glyphs, data1, data2eexec, data3):
+    """store a stripped font in the disk cache"""
+    data1 = data1.encode("ascii", errors="surrogateescape")
+    data3 = data3.encode("ascii", errors="surrogateescape")
+    header = " ".join(["%d %d %d" % (len(data1), len(data2eexec), len(data3))] + sorted(glyphs))
+    try:
+        os.makedirs(strippedfontcachedir, exist_ok=True)
+        # write to a temporary file first for concurrent processes sharing the cache
+        with tempfile.NamedTemporaryFile(dir=strippedfontcachedir, suffix=".tmp", delete=False) as file:
+            file.write(header.encode("ascii") + b"\n" + data1 + data2eexec + data3)
+        os.replace(file.name, os.path.join(strippedfontcachedir, key + ".font"))
+        filenames = [os.path.join(strippedfontcachedir, filename)
+                     for filename in os.listdir(strippedfontcachedir) if filename.endswith(".font")]
+        if len(filenames) > strippedfontcachedirsize:
+            filenames.sort(key=os.path.getmtime)
+            for filename in filenames[:len(filenames)-strippedfontcachedirsize]:
+                os.remove(filename)
+    except OSError as e:
+        logger.warning("Storing stripped font in '%s' failed: %s" % (strippedfontcachedir, e))
+
+
 class T1File:
 
     eexecr = 55665
@@ -651,6 +708,9 @@ class T1File:
         self._data2eexec = data2eexec
         self.data3 = data3
 
+        # hash of the font content (for the stripped font cache)
+        self._contenthash = None
+
         # marker and value for decoded data
         self._data2 = None
         # note that data2eexec is set to none by setsubrcmds and setglyphcmds
@@ -1002,11 +1062,43 @@ class T1File:
     uniqueidbytespattern = re.compile(b"%?/UniqueID\s+\d+\s+def\s+")
         # when UniqueID is commented out (as in modern latin), prepare to remove the comment character as well
 
+    @timing.timed("stripfont")
     def getstrippedfont(self, glyphs, charcodes):
         """create a T1File instance containing only certain glyphs
 
         glyphs is a set of the glyph names. It might be modified *in place*!
+
+        The stripped fonts are cached by the content of the font and the
+        requested glyphs and charcodes (see strippedfontcachesize and
+        strippedfontcachedir).
         """
+        if not self._data2eexec:
+            # the font was modified by setsubrcmds or setglyphcmds
+            return self._getstrippedfont(glyphs, charcodes)
+        if self._contenthash is None:
+            self._contenthash = hashlib.sha1(self.data1.encode("ascii", errors="surrogateescape") +
+                                             self._data2eexec +
+                                             self.data3.encode("ascii", errors="surrogateescape")).hexdigest()
+        key = hashlib.sha1(("%s\0%s\0%s" % (self._contenthash,
+                                              " ".join(sorted(glyphs)),
+                                              " ".join(map(str, sorted(charcodes))))).encode("ascii", errors="surrogateescape")).hexdigest()
+        try:
+            stripped = _strippedfontcache[key]
+        except KeyError:
+            stripped = strippedfontcachedir and _readstrippedfont(key)
+            if not stripped:
+                t1file = self._getstrippedfont(glyphs, charcodes)
+                stripped = frozenset(glyphs), t1file.data1, t1file._data2eexec, t1file.data3
+                if strippedfontcachedir:
+                    _writestrippedfont(key, *stripped)
+            _cacheput(_strippedfontcache, strippedfontcachesize, key, stripped)
+        else:
+            _strippedfontcache.move_to_end(key)
+        strippedglyphs, data1, data2eexec, data3 = stripped
+        glyphs.update(strippedglyphs)
+        return T1File(data1, data2eexec, data3)
+
+    def _getstrippedfont(self, glyphs, charcodes):
         if not self.encoding:
             self._encoding()
         for charcode in charcodes:
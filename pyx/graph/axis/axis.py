@@ -41,9 +41,40 @@ class axisdata:
             setattr(self, key, value)
 
 
+def _convertlist(convert, values):
+    """applies convert to all values
+
+    Values which can't be converted result in None in the returned
+    list, like it is done for a single point in the pos style."""
+    try:
+        return [convert(value) for value in values]
+    except (ArithmeticError, ValueError, TypeError):
+        result = []
+        for value in values:
+            try:
+                result.append(convert(value))
+            except (ArithmeticError, ValueError, TypeError):
+                result.append(None)
+        return result
+
+
+def vrangemask(vs, epsilon=1e-10):
+    """returns a list of flags whether the graph coordinates vs are valid
+
+    A graph coordinate is valid when it is not None and within the
+    range [0, 1] of the axis (with a tolerance of epsilon)."""
+    vmin = -epsilon
+    vmax = 1 + epsilon
+    return [v is not None and vmin <= v <= vmax for v in vs]
+
+
 class _axis:
     """axis"""
 
+    def convertlist(self, data, values):
+        """axis coordinates -> graph coordinates for a list of values"""
+        return _convertlist(lambda value: self.convert(data, value), values)
+
     def createlinked(self, data, positioner, graphtextengine, errorname, linkpainter):
         canvas = painter.axiscanvas(self.painter, graphtextengine)
         if linkpainter is not None:
@@ -56,6 +87,17 @@ class NoValidPartitionError(RuntimeError):
     pass
 
 
+class _PartitionChanged(Exception):
+    # raised when replaying a partitioning needs a layout not done before
+
+    pass
+
+
+def _tickskey(ticks):
+    # an immutable snapshot of the ticks positions and levels
+    return tuple([(str(t), t.ticklevel, t.labellevel) for t in ticks])
+
+
 class _regularaxis(_axis):
     """base implementation a regular axis
 
@@ -110,8 +152,18 @@ class _regularaxis(_axis):
             last = item
         return sorted
 
-    def _create(self, data, positioner, graphtextengine, parter, rater, errorname):
+    def _create(self, data, positioner, graphtextengine, parter, rater, errorname, replay=None):
+        """creates the axis for data using parter and rater
+
+        The layouts done to rate the partitions are recorded in
+        data.layoutsteps. When replay is set to an iterator over such a
+        record, the partitioning is repeated without typesetting any labels
+        by taking the layout rates from the record instead. _PartitionChanged
+        is raised when a layout is needed, which is not in the record. No
+        canvas is returned in this case."""
         errorname = " for axis %s" % errorname
+        if replay is None and not hasattr(data, "layoutsteps"):
+            data.layoutsteps = []
         if data.min is None or data.max is None:
             raise RuntimeError("incomplete axis range%s" % errorname)
         if data.max == data.min:
@@ -132,6 +184,11 @@ class _regularaxis(_axis):
         def layout(data):
             if data.ticks:
                 self.adjustaxis(data, [convert_tick(data.ticks[0]), convert_tick(data.ticks[-1])], graphtextengine, errorname)
+            if replay is not None:
+                if self.divisor:
+                    for t in data.ticks:
+                        t *= rational_divisor
+                return None
             self.texter.labels(data.ticks)
             if self.divisor:
                 for t in data.ticks:
@@ -212,13 +269,48 @@ class _regularaxis(_axis):
             data.ticks = variants[0].ticks
             return layout(data)
 
+        # a label metric (when provided by the painter) is calibrated by the
+        # variants typeset so far and used to reject variants with crossing
+        # labels without typesetting them
+        getlabelmetric = getattr(self.painter, "getlabelmetric", None)
+        labelmetric = getlabelmetric() if getlabelmetric is not None and replay is None else None
+        calibrationticks = []
+        calibration = {}
+
+        def crosses(data):
+            if data.ticks:
+                self.adjustaxis(data, [convert_tick(data.ticks[0]), convert_tick(data.ticks[-1])], graphtextengine, errorname)
+            self.texter.labels(data.ticks)
+            labeledticks = [t for t in data.ticks if t.labellevel is not None]
+            return labelmetric.crosses(calibration, labeledticks, positioner,
+                                       [self.convert(data, convert_tick(t)) for t in labeledticks])
+
         # build the layout for best variants
         for variant in variants:
             variant.storedcanvas = None
         variants.sort()
         while not variants[0].storedcanvas:
-            variants[0].storedcanvas = layout(variants[0])
-            ratelayout = rater.ratelayout(variants[0].storedcanvas, self.density)
+            # the layout depends on the ticks and the axis range only
+            self.adjustaxis(variants[0], [convert_tick(variants[0].ticks[0]), convert_tick(variants[0].ticks[-1])], graphtextengine, errorname)
+            layoutkey = _tickskey(variants[0].ticks), variants[0].min, variants[0].max
+            if replay is not None:
+                step = next(replay, None)
+                if step is None or step[0] != layoutkey:
+                    raise _PartitionChanged
+                ratelayout = step[1]
+                if ratelayout is not None:
+                    layout(variants[0])
+                    variants[0].storedcanvas = True
+            else:
+                if calibration and crosses(variants[0]):
+                    ratelayout = None
+                else:
+                    variants[0].storedcanvas = layout(variants[0])
+                    ratelayout = rater.ratelayout(variants[0].storedcanvas, self.density)
+                    if labelmetric is not None:
+                        calibrationticks.extend(variants[0].ticks)
+                        calibration = labelmetric.calibrate(calibrationticks)
+                data.layoutsteps.append((layoutkey, ratelayout))
             if ratelayout is None:
                 del variants[0]
                 if not variants:
@@ -228,8 +320,29 @@ class _regularaxis(_axis):
             variants.sort()
         self.adjustaxis(data, variants[0].ticks, graphtextengine, errorname)
         data.ticks = variants[0].ticks
+        if replay is not None:
+            return None
         return variants[0].storedcanvas
 
+    def samepartition(self, data, createddata, errorname):
+        """returns whether the axis would be created for data like for createddata
+
+        createddata is the data of the axis created before. The partitions
+        of data are rated by the rater, but the layout rates are taken from
+        the creation of createddata, so no labels are typeset. False is
+        returned, when a layout not done before would be needed."""
+        layoutsteps = getattr(createddata, "layoutsteps", None)
+        if layoutsteps is None:
+            return False
+        try:
+            self.create(data, None, None, errorname, replay=iter(layoutsteps))
+        except _PartitionChanged:
+            return False
+        if _tickskey(data.ticks) != _tickskey(createddata.ticks):
+            return False
+        return (dict([(key, value) for key, value in list(vars(data).items()) if key not in ["ticks", "layoutsteps"]]) ==
+                dict([(key, value) for key, value in list(vars(createddata).items()) if key not in ["ticks", "layoutsteps"]]))
+
 
 class linear(_regularaxis):
     """linear axis"""
@@ -246,8 +359,18 @@ class linear(_regularaxis):
         else:
             return (float(value) - data.min) / (data.max - data.min)
 
-    def create(self, data, positioner, graphtextengine, errorname):
-        return _regularaxis._create(self, data, positioner, graphtextengine, self.parter, self.rater, errorname)
+    def convertlist(self, data, values):
+        """axis coordinates -> graph coordinates for a list of values"""
+        min = data.min
+        max = data.max
+        size = max - min
+        if self.reverse:
+            return _convertlist(lambda value: (max - float(value)) / size, values)
+        else:
+            return _convertlist(lambda value: (float(value) - min) / size, values)
+
+    def create(self, data, positioner, graphtextengine, errorname, replay=None):
+        return _regularaxis._create(self, data, positioner, graphtextengine, self.parter, self.rater, errorname, replay)
 
 lin = linear
 
@@ -270,13 +393,25 @@ class logarithmic(_regularaxis):
         else:
             return (math.log(float(value)) - math.log(data.min)) / (math.log(data.max) - math.log(data.min))
 
-    def create(self, data, positioner, graphtextengine, errorname):
+    def convertlist(self, data, values):
+        """axis coordinates -> graph coordinates for a list of values"""
+        log = math.log
+        logmin = log(data.min)
+        logmax = log(data.max)
+        logsize = logmax - logmin
+        if self.reverse:
+            return _convertlist(lambda value: (logmax - log(float(value))) / logsize, values)
+        else:
+            return _convertlist(lambda value: (log(float(value)) - logmin) / logsize, values)
+
+    def create(self, data, positioner, graphtextengine, errorname, replay=None):
         try:
-            return _regularaxis._create(self, data, positioner, graphtextengine, self.parter, self.rater, errorname)
+            return _regularaxis._create(self, data, positioner, graphtextengine, self.parter, self.rater, errorname, replay)
         except NoValidPartitionError:
             if self.linearparter:
-                logger.warning("no valid logarithmic partitioning found for axis %s, switch to linear partitioning" % errorname)
-                return _regularaxis._create(self, data, positioner, graphtextengine, self.linearparter, self.rater, errorname)
+                if replay is None:
+                    logger.warning("no valid logarithmic partitioning found for axis %s, switch to linear partitioning" % errorname)
+                return _regularaxis._create(self, data, positioner, graphtextengine, self.linearparter, self.rater, errorname, replay)
             raise
 
 log = logarithmic
@@ -493,10 +628,10 @@ class autosizedlinear(linear):
         except:
             data.size = 0
 
-    def create(self, data, positioner, graphtextengine, errorname):
+    def create(self, data, positioner, graphtextengine, errorname, replay=None):
         min = data.min
         max = data.max
-        canvas = linear.create(self, data, positioner, graphtextengine, errorname)
+        canvas = linear.create(self, data, positioner, graphtextengine, errorname, replay)
         if min != data.min or max != data.max:
             raise RuntimeError("range change during axis creation of autosized linear axis")
         return canvas
@@ -533,6 +668,10 @@ class anchoredaxis:
         self.docreate()
         return self.axis.convert(self.data, x)
 
+    def convertlist(self, xs):
+        self.docreate()
+        return self.axis.convertlist(self.data, xs)
+
     def adjustaxis(self, columndata):
         if self.canvas is None:
             self.axis.adjustaxis(self.data, columndata, self.graphtextengine, self.errorname)
@@ -23,8 +23,10 @@
 
 
 import math
-from pyx import canvas, color, attr, text, style, unit, box, path
+from pyx import canvas, color, attr, text, style, unit, box, path, config
 from pyx import trafo as trafomodule
+from pyx.dvi import tfmfile
+from pyx.font import afmfile
 from pyx.graph.axis import tick
 
 
@@ -140,6 +142,161 @@ ticklength.LONg = ticklength(_base*math.sqrt(16), 1/goldenmean)
 ticklength.LONG = ticklength(_base*math.sqrt(32), 1/goldenmean)
 
 
+class labelmetric:
+    """estimate the extents of number labels by font metrics
+
+    Number labels consist of digits and a decimal separator and might have
+    a sign. Their widths are estimated by the character widths of a font
+    metric. The scale of the metric and the position of the labels relative
+    to their ticks are calibrated by labels typeset by the regular painter
+    (per labellevel). The estimated extents are lower bounds (reduced by the
+    tolerance), thus when the estimated extents of subsequent labels overlap,
+    the typeset labels will cross as well."""
+
+    digitnames = ["zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine"]
+
+    def __init__(self, widths, tolerance=0.1):
+        """initializes the instance
+        - widths is a dictionary mapping the characters of number labels
+          (except for the sign) to their widths in arbitrary units
+        - tolerance is the relative amount the estimated label extents are
+          reduced by to account for deviations of the metric"""
+        self.widths = widths
+        self.tolerance = tolerance
+
+    @classmethod
+    def fromTFM(cls, tfm, **kwargs):
+        "creates a labelmetric from a TFMfile instance"
+        widths = {}
+        for c in "0123456789.":
+            char_info = tfm.char_info[ord(c)] if ord(c) < len(tfm.char_info) else None
+            if char_info is not None:
+                widths[c] = tfm.width[char_info.width_index]
+        return cls(widths, **kwargs)
+
+    @classmethod
+    def fromAFM(cls, afm, **kwargs):
+        "creates a labelmetric from an AFMfile instance"
+        widths = {}
+        for c, glyphname in list(zip("0123456789", cls.digitnames)) + [(".", "period")]:
+            if glyphname in afm.charmetricsdict:
+                widths[c] = afm.width_ds(glyphname)
+        return cls(widths, **kwargs)
+
+    @classmethod
+    def TeXfont(cls, fontname="cmr10", **kwargs):
+        "creates a labelmetric from the TFM file of a TeX font"
+        with config.open(fontname, [config.format.tfm]) as f:
+            return cls.fromTFM(tfmfile.TFMfile(f), **kwargs)
+
+    @classmethod
+    def AFMfont(cls, fontname, **kwargs):
+        "creates a labelmetric from the AFM file of a font"
+        with config.open(fontname, [config.format.afm], ascii=True) as f:
+            return cls.fromAFM(afmfile.AFMfile(f), **kwargs)
+
+    def units(self, label):
+        """returns the width of a number label in the units of the metric
+        and whether the label is unsigned, or None for other labels"""
+        if not isinstance(label, str):
+            return None
+        if len(label) > 1 and label[0] == label[-1] == "$":
+            label = label[1:-1]
+        unsigned = label[:1] not in ["-", "+"]
+        if not unsigned:
+            label = label[1:]
+        if not any(c.isdigit() for c in label):
+            return None
+        try:
+            return sum(self.widths[c] for c in label), unsigned
+        except KeyError:
+            return None
+
+    def transformed(self, t):
+        "returns whether the label of tick t is transformed (e.g. rotated) by its label attributes"
+        return t.labelattrs is not None and any(isinstance(a, trafomodule.trafo_pt) for a in t.labelattrs)
+
+    def calibrate(self, ticks):
+        """returns calibration data taken from ticks painted by the regular painter
+        - the calibration data maps labellevels to tuples (scale, halign,
+          bottom_pt, top_pt) containing the label width per metric unit, the
+          relative horizontal position of the tick within the label and the
+          vertical extent of the label relative to the tick
+        - only unsigned number labels are taken into account, which are not
+          transformed by their own label attributes"""
+        calibration = {}
+        for t in ticks:
+            if t.labellevel is None or getattr(t, "temp_labelbox", None) is None or self.transformed(t):
+                continue
+            units = self.units(t.label)
+            if units is None or not units[0] or not units[1]:
+                continue
+            bbox = t.temp_labelbox.bbox()
+            width_pt = bbox.width_pt()
+            if width_pt <= 0:
+                continue
+            scale = width_pt/units[0]
+            halign = (t.temp_x_pt - bbox.llx_pt)/width_pt
+            bottom_pt = bbox.lly_pt - t.temp_y_pt
+            top_pt = bbox.ury_pt - t.temp_y_pt
+            if t.labellevel in calibration:
+                oldscale, oldhalign, oldbottom_pt, oldtop_pt = calibration[t.labellevel]
+                if oldhalign is None or abs(halign - oldhalign) > 1e-5:
+                    halign = None
+                calibration[t.labellevel] = (min(scale, oldscale), halign,
+                                             max(bottom_pt, oldbottom_pt), min(top_pt, oldtop_pt))
+            else:
+                calibration[t.labellevel] = scale, halign, bottom_pt, top_pt
+        return calibration
+
+    def crosses(self, calibration, ticks, axispos, vs, epsilon=1e-6):
+        """checks whether the labels of ticks will cross for sure
+        - ticks is the list of the labeled ticks and vs are their positions
+          in graph coordinates
+        - only axes parallel to the x- and y-axis with labels being aligned
+          along a line parallel to the axis can be estimated
+        - the estimate is valid for unrotated labels only (see
+          regular.getlabelmetric)"""
+        if len(ticks) < 2:
+            return False
+        points = [axispos.vtickpoint_pt(v) for v in vs]
+        directions = [axispos.vtickdirection(v) for v in vs]
+        dx, dy = directions[0]
+        if any(direction != directions[0] for direction in directions):
+            return False
+        if not dx and dy:
+            horizontal = True
+            if any(abs(y_pt - points[0][1]) > epsilon for x_pt, y_pt in points):
+                return False
+        elif dx and not dy:
+            horizontal = False
+            if any(abs(x_pt - points[0][0]) > epsilon for x_pt, y_pt in points):
+                return False
+        else:
+            return False
+        ranges = []
+        for t, (x_pt, y_pt) in zip(ticks, points):
+            units = self.units(t.label)
+            if units is None or t.labellevel not in calibration or self.transformed(t):
+                ranges.append(None)
+                continue
+            scale, halign, bottom_pt, top_pt = calibration[t.labellevel]
+            if horizontal:
+                if halign is None:
+                    ranges.append(None)
+                    continue
+                width_pt = (1 - self.tolerance) * scale * units[0]
+                ranges.append((x_pt - halign*width_pt, x_pt + (1-halign)*width_pt))
+            else:
+                reduce_pt = 0.5 * self.tolerance * (top_pt - bottom_pt)
+                ranges.append((y_pt + bottom_pt + reduce_pt, y_pt + top_pt - reduce_pt))
+        for range1, range2 in zip(ranges[:-1], ranges[1:]):
+            if (range1 is not None and range2 is not None and range1[0] < range1[1] and range2[0] < range2[1] and
+                range1[0] < range2[1] and range2[0] < range1[1]):
+                return True
+        return False
+
+
 class regular(_title):
     """class for painting the ticks and labels of an axis"""
 
@@ -158,6 +315,7 @@ class regular(_title):
                        labeldirection=None,
                        labelhequalize=0,
                        labelvequalize=1,
+                       labelmetric=None,
                        **kwargs):
         self.innerticklength = innerticklength
         self.outerticklength = outerticklength
@@ -169,8 +327,20 @@ class regular(_title):
         self.labeldirection = labeldirection
         self.labelhequalize = labelhequalize
         self.labelvequalize = labelvequalize
+        self.labelmetric = labelmetric
         _title.__init__(self, **kwargs)
 
+    def getlabelmetric(self):
+        """returns the labelmetric to estimate the label extents or None
+
+        The labelmetric is not used when the labels are not painted or when
+        they are transformed (e.g. rotated by labeldirection), since the
+        metric estimates the extents of unrotated labels only."""
+        if (self.labelmetric is None or self.labelattrs is None or self.labeldirection is not None or
+            any(isinstance(a, trafomodule.trafo_pt) for a in self.labelattrs)):
+            return None
+        return self.labelmetric
+
     def paint(self, canvas, data, axis, axispos):
         for t in data.ticks:
             t.temp_v = axis.convert(data, t)
@@ -189,7 +359,7 @@ class regular(_title):
                         labelattrs.append(self.labeldirection.trafo(t.temp_dx, t.temp_dy))
                     if t.labelattrs is not None:
                         labelattrs.extend(t.labelattrs)
-                    t.temp_labelbox = canvas.textengine.text_pt(t.temp_x_pt, t.temp_y_pt, t.label, labelattrs)
+                    t.temp_labelbox = text.cachedtext_pt(canvas.textengine, t.temp_x_pt, t.temp_y_pt, t.label, labelattrs)
         if len(data.ticks) > 1:
             equaldirection = 1
             for t in data.ticks[1:]:
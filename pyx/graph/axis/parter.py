@@ -21,12 +21,16 @@
 # along with PyX; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
 
-import math
+import collections, math
 from pyx.graph.axis import tick
 
 
 # Note: A partition is a list of ticks.
 
+#: maximal number of partitions kept in the partition cache
+partitioncachesize = 1000
+_partitioncache = collections.OrderedDict()
+
 class _partdata:
     """state storage class for a partfunction
 
@@ -100,9 +104,27 @@ class linear(_parter):
             ticks.append(tick.tick((i*dist.num, dist.denom), ticklevel=ticklevel, labellevel=labellevel))
         return ticks
 
+    def distkey(self, dist):
+        "returns a hashable key for an entry of ticklist and labellist"
+        return dist.num, dist.denom
+
     def partfunction(self, data):
         if data.first:
             data.first = 0
+            # partitions are cached by the range and the parter configuration
+            # as tuples (num, denom, ticklevel, labellevel) of the ticks
+            key = (self.__class__, data.min, data.max, data.extendmin, data.extendmax,
+                   tuple(map(self.distkey, self.ticklist)), tuple(map(self.distkey, self.labellist)),
+                   self.extendtick, self.extendlabel, self.epsilon)
+            try:
+                partition = _partitioncache[key]
+            except KeyError:
+                pass
+            else:
+                _partitioncache.move_to_end(key)
+                return [tick.tick((num, denom), ticklevel=ticklevel, labellevel=labellevel)
+                        for num, denom, ticklevel, labellevel in partition]
+
             min = data.min
             max = data.max
             if self.extendtick is not None and len(self.ticklist) > self.extendtick:
@@ -116,6 +138,9 @@ class linear(_parter):
             for i in range(len(self.labellist)):
                 ticks = tick.mergeticklists(ticks, self.getticks(min, max, self.labellist[i], labellevel=i))
 
+            _partitioncache[key] = [(t.num, t.denom, t.ticklevel, t.labellevel) for t in ticks]
+            while len(_partitioncache) > partitioncachesize:
+                _partitioncache.popitem(last=False)
             return ticks
 
         return None
@@ -216,6 +241,9 @@ class logarithmic(linear):
         self.extendlabel = extendlabel
         self.epsilon = epsilon
 
+    def distkey(self, preexp):
+        return tuple((pre.num, pre.denom) for pre in preexp.pres), preexp.exp
+
     def extendminmax(self, min, max, preexp, extendmin, extendmax):
         minpower = None
         maxpower = None
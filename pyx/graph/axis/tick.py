@@ -116,31 +116,35 @@ class rational:
             self.num = 1
             self.denom = 1
             return
-        try:
-            # does x behave like a number
-            x + 0
-        except:
+        if isinstance(x, tuple):
+            # fast path for the most common case within the arithmetics
+            self.num, self.denom = x
+        else:
             try:
-                # does x behave like a string
-                x + ""
+                # does x behave like a number
+                x + 0
             except:
                 try:
-                    # x might be a tuple
-                    self.num, self.denom = x
+                    # does x behave like a string
+                    x + ""
                 except:
-                    # otherwise it should have a num and denom
-                    self.num, self.denom = x.num, x.denom
+                    try:
+                        # x might be a tuple
+                        self.num, self.denom = x
+                    except:
+                        # otherwise it should have a num and denom
+                        self.num, self.denom = x.num, x.denom
+                else:
+                    # x is a string
+                    fraction = x.split("/")
+                    if len(fraction) > 2:
+                        raise ValueError("multiple '/' found in '%s'" % x)
+                    self.initfromstring(fraction[0])
+                    if len(fraction) == 2:
+                        self /= rational(fraction[1])
             else:
-                # x is a string
-                fraction = x.split("/")
-                if len(fraction) > 2:
-                    raise ValueError("multiple '/' found in '%s'" % x)
-                self.initfromstring(fraction[0])
-                if len(fraction) == 2:
-                    self /= rational(fraction[1])
-        else:
-            # x is a number
-            self.initfromfloat(x, floatprecision)
+                # x is a number
+                self.initfromfloat(x, floatprecision)
         if not self.denom: raise ZeroDivisionError("zero denominator")
         if power == -1:
             self.num, self.denom = self.denom, self.num
@@ -242,27 +246,20 @@ def mergeticklists(list1, list2, mergeequal=1):
     - return a merged list of ticks out of list1 and list2
     - CAUTION: original lists have to be ordered
       (the returned list is also ordered)"""
-    # TODO: improve along the lines of http://aspn.activestate.com/ASPN/Cookbook/Python/Recipe/305269
-
-    # do not destroy original lists
-    list1 = list1[:]
-    i = 0
+    result = []
     j = 0
-    try:
-        while True: # we keep on going until we reach an index error
-            while list2[j] < list1[i]: # insert tick
-               list1.insert(i, list2[j])
-               i += 1
-               j += 1
-            if list2[j] == list1[i]: # merge tick
-               if mergeequal:
-                   list1[i].merge(list2[j])
-               j += 1
-            i += 1
-    except IndexError:
-        if j < len(list2):
-            list1 += list2[j:]
-    return list1
+    len2 = len(list2)
+    for tick1 in list1:
+        while j < len2 and list2[j] < tick1: # insert tick
+            result.append(list2[j])
+            j += 1
+        if j < len2 and list2[j] == tick1: # merge tick
+            if mergeequal:
+                tick1.merge(list2[j])
+            j += 1
+        result.append(tick1)
+    result.extend(list2[j:])
+    return result
 
 
 def maxlevels(ticks):
@@ -49,6 +49,14 @@ class timeaxis(axis.linear):
         # I prefer a different solution (not based on huge integers) for the
         # future
 
+    def convertlist(self, data, xs):
+        def mstimedelta(td):
+            "return the timedelta in microseconds"
+            return td.microseconds + 1000000*(td.seconds + 3600*24*td.days)
+        min = data.min
+        size = float(mstimedelta(data.max - data.min))
+        return axis._convertlist(lambda x: mstimedelta(x - min) / size, xs)
+
     zero = datetime.timedelta(0)
 
 
@@ -21,7 +21,7 @@
 # along with PyX; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
 
-import math, re, configparser, struct
+import ast, collections, io, itertools, math, mmap, os, re, configparser, struct, sys, zipfile
 from pyx import text
 from . import style
 builtinlist = list
@@ -147,6 +147,85 @@ class points(_data):
         self.title = title
 
 
+class _ringcolumn:
+    "a column keeping the last size values only"
+
+    def __init__(self, size):
+        self.size = size
+        self.values = []
+        self.start = 0
+
+    def append(self, value):
+        if len(self.values) < self.size:
+            self.values.append(value)
+        else:
+            self.values[self.start] = value
+            self.start = (self.start + 1) % self.size
+
+    def extend(self, values):
+        for value in values:
+            self.append(value)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        return itertools.chain(self.values[self.start:], self.values[:self.start])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self.values)))]
+        if index < 0:
+            index += len(self.values)
+        if not 0 <= index < len(self.values):
+            raise IndexError("column index out of range")
+        return self.values[(self.start + index) % len(self.values)]
+
+
+class stream(_data):
+    """Graph data from values appended over time
+
+    The columns are initialized like for values. Further points are added by
+    append and extend. When maxlength is set, only the last maxlength points
+    are kept. The total number of points added is available as count. Use
+    the updatedata method of the graph to redraw the data in an already
+    finished graph."""
+
+    defaultstyles = defaultlines
+
+    def __init__(self, title="user provided stream", maxlength=None, **columns):
+        self.maxlength = maxlength
+        self.count = 0
+        if maxlength is None:
+            self.columns = dict([(key, []) for key in columns])
+        else:
+            self.columns = dict([(key, _ringcolumn(maxlength)) for key in columns])
+        self.columnnames = list(self.columns.keys())
+        self.title = title
+        self.extend(**columns)
+
+    def append(self, **point):
+        "appends a point given by a value for each column"
+        if set(point) != set(self.columns):
+            raise ValueError("values for all columns needed")
+        for key, value in list(point.items()):
+            self.columns[key].append(value)
+        self.count += 1
+
+    def extend(self, **columns):
+        "appends points given by a list of values for each column"
+        if set(columns) != set(self.columns):
+            raise ValueError("values for all columns needed")
+        l = None
+        for values in list(columns.values()):
+            if l is not None and len(values) != l:
+                raise ValueError("different number of values")
+            l = len(values)
+        for key, values in list(columns.items()):
+            self.columns[key].extend(values)
+        self.count += l or 0
+
+
 class _notitle:
     pass
 
@@ -226,7 +305,27 @@ class data(_data):
             return self.orgdata.columns[value][self.columncallbackcount]
 
 
-filecache = {}
+class _filedata(_data):
+    "Graph data from a list of columns as read by file and binaryfile"
+
+    defaultstyles = defaultsymbols
+
+    def __init__(self, columndata, title, **columns):
+        if len(columndata[0]):
+            self.columndata = columndata
+            self.columns = dict([(key, columndata[i]) for key, i in list(columns.items())])
+        else:
+            self.columns = dict([(key, []) for key in columns])
+        self.columnnames = list(self.columns.keys())
+        self.title = title
+
+
+# files are cached by their path and modification time together with the
+# arguments used to read them
+
+#: maximal number of files kept in filecache
+filecachesize = 32
+filecache = collections.OrderedDict()
 
 class file(data):
 
@@ -234,6 +333,9 @@ class file(data):
     defaultstringpattern = re.compile(r"\"(.*?)\"(\s+|$)")
     defaultcolumnpattern = re.compile(r"(.*?)(\s+|$)")
 
+    #: size hint (in characters) for the chunks of lines read at once
+    chunksize = 1 << 16
+
     def splitline(self, line, stringpattern, columnpattern, tofloat=1):
         """returns a tuple created out of the string line
         - matches stringpattern and columnpattern, adds the first group of that
@@ -287,45 +389,82 @@ class file(data):
                        **kwargs):
 
         def readfile(file, title, self=self, commentpattern=commentpattern, stringpattern=stringpattern, columnpattern=columnpattern, skiphead=skiphead, skiptail=skiptail, every=every):
+            # The file is read in chunks of lines. Only the selected lines
+            # (by skiphead and every) are converted. The rows of a chunk are
+            # transposed and appended to the columns at once.
             columns = []
+            linenumbers = []
             columndata = []
+            rows = 0
             linenumber = 0
-            maxcolumns = 0
-            for line in file.readlines():
-                line = line.strip()
-                match = commentpattern.match(line)
-                if match:
-                    if not len(columndata):
-                        columns = self.splitline(line[match.end():], stringpattern, columnpattern, tofloat=0)
-                else:
-                    linedata = []
-                    for value in self.splitline(line, stringpattern, columnpattern, tofloat=1):
-                        linedata.append(value)
-                    if len(linedata):
+            fastsplit = stringpattern is self.defaultstringpattern and columnpattern is self.defaultcolumnpattern
+            fastcomment = commentpattern is self.defaultcommentpattern
+            while True:
+                lines = file.readlines(self.chunksize)
+                if not lines:
+                    break
+                chunkrows = []
+                for line in lines:
+                    line = line.strip()
+                    if fastcomment and (not line or line[0] not in "#!%"):
+                        match = None
+                    else:
+                        match = commentpattern.match(line)
+                    if match:
+                        if not rows:
+                            columns = self.splitline(line[match.end():], stringpattern, columnpattern, tofloat=0)
+                    elif line:
                         if linenumber >= skiphead and not ((linenumber - skiphead) % every):
-                            linedata = [linenumber + 1] + linedata
-                            if len(linedata) > maxcolumns:
-                                maxcolumns = len(linedata)
-                            columndata.append(linedata)
+                            if fastsplit and '"' not in line:
+                                try:
+                                    linedata = list(map(float, line.split()))
+                                except ValueError:
+                                    linedata = self.splitline(line, stringpattern, columnpattern, tofloat=1)
+                            else:
+                                linedata = self.splitline(line, stringpattern, columnpattern, tofloat=1)
+                            linenumbers.append(linenumber + 1)
+                            chunkrows.append(linedata)
+                            rows += 1
                         linenumber += 1
+                if chunkrows:
+                    maxcolumns = max(map(len, chunkrows))
+                    if maxcolumns > len(columndata):
+                        for i in range(len(columndata), maxcolumns):
+                            columndata.append([None]*(rows-len(chunkrows)))
+                    maxcolumns = len(columndata)
+                    for linedata in chunkrows:
+                        if len(linedata) != maxcolumns:
+                            linedata.extend([None]*(maxcolumns-len(linedata)))
+                    for column, chunkcolumn in zip(columndata, zip(*chunkrows)):
+                        column.extend(chunkcolumn)
+            columndata.insert(0, linenumbers)
             if skiptail >= every:
                 skip, x = divmod(skiptail, every)
-                del columndata[-skip:]
-            for i in range(len(columndata)):
-                if len(columndata[i]) != maxcolumns:
-                    columndata[i].extend([None]*(maxcolumns-len(columndata[i])))
-            return points(columndata, title=title, addlinenumbers=0,
-                          **dict([(column, i+1) for i, column in enumerate(columns[:maxcolumns-1])]))
+                for column in columndata:
+                    del column[-skip:]
+            return _filedata(columndata, title=title,
+                             **dict([(column, i+1) for i, column in enumerate(columns[:len(columndata)-1])]))
 
         try:
             filename.readlines
         except:
             # not a file-like object -> open it
-            cachekey = self.getcachekey(filename, commentpattern, stringpattern, columnpattern, skiphead, skiptail, every)
-            if cachekey not in filecache:
+            cachekey = self.getcachekey(os.path.abspath(filename), commentpattern, stringpattern, columnpattern, skiphead, skiptail, every)
+            stat = os.stat(filename)
+            stamp = stat.st_mtime_ns, stat.st_size
+            try:
+                cachedstamp, filedata = filecache[cachekey]
+            except KeyError:
+                cachedstamp = None
+            if cachedstamp == stamp:
+                filecache.move_to_end(cachekey)
+            else:
                 with open(filename) as f:
-                    filecache[cachekey] = readfile(f, filename)
-            data.__init__(self, filecache[cachekey], **kwargs)
+                    filedata = readfile(f, filename)
+                filecache[cachekey] = stamp, filedata
+                while len(filecache) > filecachesize:
+                    filecache.popitem(last=False)
+            data.__init__(self, filedata, **kwargs)
         else:
             data.__init__(self, readfile(filename, "user provided file-like object"), **kwargs)
 
@@ -380,9 +519,9 @@ class conffile(data):
             filename.readlines
         except:
             # not a file-like object -> open it
-            if filename not in filecache:
-                filecache[filename] = readfile(open(filename), filename)
-            data.__init__(self, filecache[filename], **kwargs)
+            if filename not in conffilecache:
+                conffilecache[filename] = readfile(open(filename), filename)
+            data.__init__(self, conffilecache[filename], **kwargs)
         else:
             data.__init__(self, readfile(filename, "user provided file-like object"), **kwargs)
 
@@ -494,6 +633,185 @@ class cbdfile(data):
             data.__init__(self, readfile(filename, "user provided file-like object"), **kwargs)
 
 
+# struct formats of the numpy data types supported by binaryfile
+_binaryformats = {"f2": "e", "f4": "f", "f8": "d",
+                  "i1": "b", "i2": "h", "i4": "i", "i8": "q",
+                  "u1": "B", "u2": "H", "u4": "I", "u8": "Q",
+                  "b1": "?"}
+# half precision floats can not be viewed by a memoryview
+_binaryunviewableformats = {"e"}
+
+def _binaryformat(descr):
+    """returns the memoryview format, its size and a flag for a swapped byte
+    order for the numpy type description descr (like "<f8")"""
+    if len(descr) < 3 or descr[0] not in "<>|=":
+        raise ValueError("invalid data type '%s'" % descr)
+    try:
+        format = _binaryformats[descr[1:]]
+    except KeyError:
+        raise ValueError("unsupported data type '%s'" % descr)
+    if descr[0] == "<":
+        swapped = sys.byteorder != "little"
+    elif descr[0] == ">":
+        swapped = sys.byteorder != "big"
+    else:
+        swapped = False
+    return format, struct.calcsize(format), swapped
+
+
+def _binarycolumn(buffer, descr, offset, stride, count):
+    """returns count values of type descr at offset with a distance stride (in
+    bytes) in buffer
+
+    The result is a memoryview into buffer (i.e. the data is not copied)
+    unless the values are stored in a non-native byte order, are not
+    aligned to their size within buffer or are half precision floats."""
+    format, size, swapped = _binaryformat(descr)
+    if count <= 0:
+        return []
+    if not swapped and not stride % size and format not in _binaryunviewableformats:
+        view = memoryview(buffer)[offset:offset+(count-1)*stride+size].cast(format)
+        if stride != size:
+            view = view[::stride//size]
+        return view
+    unpack_from = struct.Struct(descr[0].replace("|", "=") + format).unpack_from
+    return [unpack_from(buffer, offset+i*stride)[0] for i in range(count)]
+
+
+class binaryfile(data):
+    """Graph data from binary arrays
+
+    Reads numpy arrays from .npy and .npz files or raw arrays from any other
+    file. The data is memory mapped and the columns are views into the mapped
+    file (unless the data needs to be converted).
+
+    - For a one-dimensional array the values are taken as a column. For a
+      structured array, the fields become named columns. For a two-dimensional
+      array, the second index enumerates the columns.
+    - In a .npz file, all arrays must be one-dimensional. Their names (or the
+      names of their fields) are the column names.
+    - A raw file contains rows of values of type dtype (a numpy type
+      description) after offset bytes. The number of columns is given by
+      ncolumns or the number of columnnames.
+
+    The columns can be addressed by their number (starting at 1, the row
+    numbers are available as column 0) and by the names in columnnames.
+    skiphead, skiptail and every select the rows like for file."""
+
+    def __init__(self, filename, columnnames=None, dtype="<f8", ncolumns=None, offset=0,
+                       skiphead=0, skiptail=0, every=1, **kwargs):
+
+        def npyarray(buffer, offset):
+            if bytes(buffer[offset:offset+6]) != b"\x93NUMPY":
+                raise ValueError("not a numpy array file")
+            if buffer[offset+6] == 1:
+                headerlength, = struct.unpack_from("<H", buffer, offset+8)
+                offset += 10
+            else:
+                headerlength, = struct.unpack_from("<I", buffer, offset+8)
+                offset += 12
+            header = ast.literal_eval(bytes(buffer[offset:offset+headerlength]).decode("latin-1"))
+            return header["descr"], header["fortran_order"], header["shape"], offset+headerlength
+
+        def arraycolumns(buffer, descr, fortranorder, shape, offset):
+            # returns a list of (name, descr, offset, stride, rows) for the columns of an array
+            if isinstance(descr, builtinlist):
+                if len(shape) != 1:
+                    raise ValueError("structured arrays must be one-dimensional")
+                fields = []
+                itemsize = 0
+                for field in descr:
+                    if len(field) != 2:
+                        raise ValueError("subarrays in structured arrays are not supported")
+                    name, fielddescr = field
+                    if fielddescr[1:2] == "V":
+                        itemsize += int(fielddescr[2:])
+                    else:
+                        fields.append((name, fielddescr, itemsize))
+                        itemsize += _binaryformat(fielddescr)[1]
+                return [(name, fielddescr, offset+fieldoffset, itemsize, shape[0])
+                        for name, fielddescr, fieldoffset in fields]
+            size = _binaryformat(descr)[1]
+            if len(shape) == 1:
+                return [(None, descr, offset, size, shape[0])]
+            if len(shape) != 2:
+                raise ValueError("arrays must be one- or two-dimensional")
+            rows, columns = shape
+            if fortranorder:
+                return [(None, descr, offset+i*rows*size, size, rows) for i in range(columns)]
+            return [(None, descr, offset+i*size, columns*size, rows) for i in range(columns)]
+
+        def readfile(file, title):
+            try:
+                buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+                # not a mappable file (or an empty file)
+                buffer = file.read()
+            if title.lower().endswith(".npz"):
+                arrays = []
+                with zipfile.ZipFile(file) as zf:
+                    for info in zf.infolist():
+                        name = info.filename
+                        if name.endswith(".npy"):
+                            name = name[:-4]
+                        if info.compress_type == zipfile.ZIP_STORED:
+                            # the data follows the local file header
+                            namelength, extralength = struct.unpack_from("<2H", buffer, info.header_offset+26)
+                            arraybuffer, arrayoffset = buffer, info.header_offset + 30 + namelength + extralength
+                        else:
+                            arraybuffer, arrayoffset = zf.read(info), 0
+                        descr, fortranorder, shape, arrayoffset = npyarray(arraybuffer, arrayoffset)
+                        if len(shape) != 1:
+                            raise ValueError("arrays in npz files must be one-dimensional")
+                        arrays.append((arraybuffer, [(fieldname or name, fielddescr, fieldoffset, stride, rows)
+                                                     for fieldname, fielddescr, fieldoffset, stride, rows
+                                                     in arraycolumns(arraybuffer, descr, fortranorder, shape, arrayoffset)]))
+            elif title.lower().endswith(".npy"):
+                descr, fortranorder, shape, arrayoffset = npyarray(buffer, 0)
+                arrays = [(buffer, arraycolumns(buffer, descr, fortranorder, shape, arrayoffset))]
+            else:
+                size = _binaryformat(dtype)[1]
+                columns = ncolumns or len(columnnames or [])
+                if not columns:
+                    raise ValueError("number of columns of the raw data is not known")
+                rows = (len(buffer) - offset) // (columns*size)
+                arrays = [(buffer, arraycolumns(buffer, dtype, False, (rows, columns), offset))]
+
+            rows = set(columnrows for arraybuffer, arraycolumnlist in arrays
+                                  for name, descr, columnoffset, stride, columnrows in arraycolumnlist)
+            if len(rows) > 1:
+                raise ValueError("different number of values")
+            selected = range(skiphead, rows.pop() if rows else 0, every)
+            if skiptail >= every:
+                selected = selected[:max(len(selected)-skiptail//every, 0)]
+            columndata = [range(selected.start+1, selected.stop+1, every)]
+            columns = {}
+            for arraybuffer, arraycolumnlist in arrays:
+                for name, descr, columnoffset, stride, columnrows in arraycolumnlist:
+                    if name is not None:
+                        columns[name] = len(columndata)
+                    if len(selected):
+                        columndata.append(_binarycolumn(arraybuffer, descr, columnoffset+selected.start*stride, stride*every, len(selected)))
+                    else:
+                        columndata.append([])
+            if columnnames is not None:
+                for i, name in enumerate(columnnames):
+                    if i+1 >= len(columndata):
+                        raise ValueError("more column names than columns")
+                    columns[name] = i+1
+            return _filedata(columndata, title=title, **columns)
+
+        try:
+            filename.fileno
+        except:
+            # not a file-like object -> open it
+            with open(filename, "rb") as f:
+                filedata = readfile(f, filename)
+            data.__init__(self, filedata, **kwargs)
+        else:
+            data.__init__(self, readfile(filename, getattr(filename, "name", "user provided file-like object")), **kwargs)
+
+
 class function(_data):
 
     defaultstyles = defaultlines
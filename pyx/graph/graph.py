@@ -23,7 +23,7 @@
 
 
 import logging, math, re, string
-from pyx import canvas, path, trafo, unit
+from pyx import canvas, path, timing, trafo, unit
 from pyx.graph.axis import axis, positioner
 
 logger = logging.getLogger("pyx")
@@ -62,6 +62,23 @@ class styledata:
     pass
 
 
+def _copystyledata(data):
+    """returns a copy of the style data storage data
+
+    Dictionaries and lists are copied (recursively), since the styles
+    alter them in place."""
+    def copycontainers(value):
+        if isinstance(value, dict):
+            return dict([(key, copycontainers(item)) for key, item in list(value.items())])
+        if isinstance(value, list):
+            return [copycontainers(item) for item in value]
+        return value
+    result = styledata()
+    for key, value in list(vars(data).items()):
+        setattr(result, key, copycontainers(value))
+    return result
+
+
 class plotitem:
 
     def __init__(self, graph, data, styles):
@@ -86,6 +103,8 @@ class plotitem:
         self.sharedata = styledata()
         self.dataaxisnames = {}
         self.privatedatalist = [styledata() for s in self.styles]
+        self.layeritems = []
+        self.drawncount = self.drawnlength = None
 
         # perform setcolumns to all styles
         self.usedcolumnnames = set()
@@ -115,12 +134,7 @@ class plotitem:
 
         point = dict([(columnname, None) for columnname in self.usedcolumnnames])
         # fill point with (static) column data first
-        columns = list(self.data.columns.keys())
-        for values in zip(*list(self.data.columns.values())):
-            for column, value in zip(columns, values):
-                point[column] = value
-            for privatedata, style in zip(self.privatedatalist, self.styles):
-                style.drawpoint(privatedata, self.sharedata, graph, point)
+        self.drawpoints(graph, point, self.data.columns)
 
         point = dict([(columnname, None) for columnname in self.usedcolumnnames])
         # insert an empty point
@@ -128,14 +142,49 @@ class plotitem:
             for privatedata, style in zip(self.privatedatalist, self.styles):
                 style.drawpoint(privatedata, self.sharedata, graph, point)
         # fill point with dynamic column data
-        columns = list(self.dynamiccolumns.keys())
-        for values in zip(*list(self.dynamiccolumns.values())):
-            for key, value in zip(columns, values):
+        self.drawpoints(graph, point, self.dynamiccolumns)
+        for privatedata, style in zip(self.privatedatalist, self.styles):
+            style.donedrawpoints(privatedata, self.sharedata, graph)
+
+    def datalength(self):
+        "returns the number of points of the static data"
+        for data in list(self.data.columns.values()):
+            return len(data)
+        return 0
+
+    def cancontinuedraw(self, graph, dropped):
+        """returns whether the drawing can be continued by drawcontinued
+
+        dropped is the number of points drawn already, which have been
+        removed from the beginning of the data."""
+        if self.dynamiccolumns:
+            return False
+        for privatedata, style in zip(self.privatedatalist, self.styles):
+            if not style.cancontinuedrawpoints(privatedata, self.sharedata, graph, dropped):
+                return False
+        return True
+
+    def drawcontinued(self, graph, start, dropped):
+        """draws the static data starting at index start, when all data
+        up to this point has been drawn already
+
+        The first dropped points drawn, which have been removed from the
+        data, are removed from the drawing. The styles need to support this,
+        which is checked by cancontinuedraw."""
+        for privatedata, style in zip(self.privatedatalist, self.styles):
+            style.continuedrawpoints(privatedata, self.sharedata, graph, dropped)
+        point = dict([(columnname, None) for columnname in self.usedcolumnnames])
+        self.drawpoints(graph, point, dict([(columnname, data[start:]) for columnname, data in list(self.data.columns.items())]))
+        for privatedata, style in zip(self.privatedatalist, self.styles):
+            style.donedrawpoints(privatedata, self.sharedata, graph)
+
+    def drawpoints(self, graph, point, columns):
+        keys = list(columns.keys())
+        for values in zip(*list(columns.values())):
+            for key, value in zip(keys, values):
                 point[key] = value
             for privatedata, style in zip(self.privatedatalist, self.styles):
                 style.drawpoint(privatedata, self.sharedata, graph, point)
-        for privatedata, style in zip(self.privatedatalist, self.styles):
-            style.donedrawpoints(privatedata, self.sharedata, graph)
 
     def key_pt(self, graph, x_pt, y_pt, width_pt, height_pt):
         for privatedata, style in zip(self.privatedatalist, self.styles):
@@ -222,6 +271,7 @@ class graph(canvas.canvas):
         else:
             return plotitems
 
+    @timing.timed("doranges")
     def doranges(self):
         if self.did(self.doranges):
             return
@@ -232,6 +282,167 @@ class graph(canvas.canvas):
         for plotitem in self.plotitems:
             plotitem.adjustaxesdynamic(self)
         self.didranges = 1
+        self._ranges = self._axesranges()
+
+    def _axesranges(self):
+        # the data of the (not linked) axes after the range analysis
+        return dict([(axisname, dict(vars(anaxis.data)))
+                     for axisname, anaxis in list(self.axes.items())
+                     if not isinstance(anaxis, axis.linkedaxis)])
+
+    def _proberanges(self, plotitem, data):
+        """returns the dynamic data and the style data of plotitem for data
+        and the resulting axes ranges
+
+        The range analysis is repeated for data being used by plotitem. When
+        the axes ranges differ from those found for the current data, the
+        partitioning of the changed axes is repeated without typesetting any
+        labels (see the samepartition method of the axes). None is returned
+        when the partitions differ too. The graph is not altered."""
+        axesstates = [(axisname, anaxis, anaxis.data, anaxis.canvas) for axisname, anaxis in list(self.axes.items())]
+        plotitemstates = [(aplotitem, aplotitem.data, aplotitem.sharedata, aplotitem.privatedatalist, aplotitem.dynamiccolumns)
+                          for aplotitem in self.plotitems]
+        try:
+            for anaxis in list(self.axes.values()):
+                if not isinstance(anaxis, axis.linkedaxis):
+                    anaxis.data = anaxis.axis.createdata(anaxis.errorname)
+            for anaxis in list(self.axes.values()):
+                if isinstance(anaxis, axis.linkedaxis):
+                    anaxis.data = anaxis.linkedto.data
+                anaxis.canvas = None
+            plotitem.data = data
+            for aplotitem in self.plotitems:
+                aplotitem.sharedata = _copystyledata(aplotitem.sharedata)
+                aplotitem.privatedatalist = [_copystyledata(privatedata) for privatedata in aplotitem.privatedatalist]
+            for aplotitem in self.plotitems:
+                aplotitem.adjustaxesstatic(self)
+            for aplotitem in self.plotitems:
+                aplotitem.makedynamicdata(self)
+            for aplotitem in self.plotitems:
+                aplotitem.adjustaxesdynamic(self)
+            ranges = self._axesranges()
+            for axisname, anaxis, adata, acanvas in axesstates:
+                if axisname in ranges and ranges[axisname] != self._ranges.get(axisname):
+                    samepartition = getattr(anaxis.axis, "samepartition", None)
+                    if acanvas is None or samepartition is None or not samepartition(anaxis.data, adata, anaxis.errorname):
+                        return None
+            return plotitem.dynamiccolumns, plotitem.sharedata, plotitem.privatedatalist, ranges
+        finally:
+            for axisname, anaxis, adata, acanvas in axesstates:
+                anaxis.data = adata
+                anaxis.canvas = acanvas
+            for aplotitem, adata, sharedata, privatedatalist, dynamiccolumns in plotitemstates:
+                aplotitem.data = adata
+                aplotitem.sharedata = sharedata
+                aplotitem.privatedatalist = privatedatalist
+                aplotitem.dynamiccolumns = dynamiccolumns
+
+    def replacedata(self, plotitem, data):
+        """replaces the data of plotitem
+
+        After the range analysis the data can only be replaced when the axes
+        ranges do not change. The axes, the background and the key are kept
+        then, and plotitem is drawn again when it was drawn already. It
+        returns whether the data has been replaced. When it returns False,
+        the graph is left unaltered and needs to be created again for the
+        new data."""
+        if plotitem not in self.plotitems:
+            raise ValueError("plotitem does not belong to this graph")
+        if set(data.columnnames) != set(plotitem.data.columnnames):
+            raise ValueError("column names of the data differ")
+        if not self.didranges:
+            plotitem.data = data
+            return True
+        probe = self._proberanges(plotitem, data)
+        if probe is None:
+            return False
+        plotitem.data = data
+        plotitem.dynamiccolumns, plotitem.sharedata, plotitem.privatedatalist, self._ranges = probe
+        if ((plotitem,), {}) in self._calls.get(self.doplotitem, []):
+            self._redrawplotitem(plotitem)
+        return True
+
+    def updatedata(self, plotitem):
+        """updates plotitem after its data has been altered in place
+
+        The update is performed like for replacedata and fails when the axes
+        would change. When points were appended to the data only (like
+        for a graph.data.stream), which might drop points from the beginning
+        of the data, the axes ranges are checked for the new points only
+        and only the new points are drawn, provided the styles support it."""
+        if plotitem not in self.plotitems:
+            raise ValueError("plotitem does not belong to this graph")
+        if not self.didranges:
+            return True
+        drawn = ((plotitem,), {}) in self._calls.get(self.doplotitem, [])
+        if drawn and self._drawappended(plotitem):
+            return True
+        probe = self._proberanges(plotitem, plotitem.data)
+        if probe is None:
+            return False
+        plotitem.dynamiccolumns, plotitem.sharedata, plotitem.privatedatalist, self._ranges = probe
+        if drawn:
+            self._redrawplotitem(plotitem)
+        return True
+
+    def _drawappended(self, plotitem):
+        # draws the points appended to the data of plotitem since it was drawn
+        # and removes the points dropped from the beginning of the data; the
+        # data needs to count its points like graph.data.stream does
+        # returns False (leaving the graph unaltered), when the styles do not
+        # support this or the axes ranges might change
+        count = getattr(plotitem.data, "count", None)
+        if count is None or plotitem.drawncount is None:
+            return False
+        length = plotitem.datalength()
+        appended = count - plotitem.drawncount
+        dropped = plotitem.drawnlength + appended - length
+        if appended < 0 or dropped < 0 or (dropped and dropped >= plotitem.drawnlength):
+            return False
+        if not plotitem.cancontinuedraw(self, dropped):
+            return False
+        axesstates = []
+        for axisname in set(plotitem.dataaxisnames.values()):
+            anaxis = self.axes[axisname]
+            if isinstance(anaxis, axis.linkedaxis) or not isinstance(anaxis.axis, axis._regularaxis):
+                return False
+            if dropped and self._ranges[axisname] != dict(vars(anaxis.axis.createdata(anaxis.errorname))):
+                # the dropped points might have defined the axis range
+                return False
+            axesstates.append((axisname, anaxis, anaxis.data, anaxis.canvas))
+        start = length - appended
+        columns = dict([(columnname, data[start:]) for columnname, data in list(plotitem.data.columns.items())])
+        try:
+            for axisname, anaxis, adata, acanvas in axesstates:
+                anaxis.data = axis.axisdata(**self._ranges[axisname])
+                anaxis.canvas = None
+            for columnname, data in list(columns.items()):
+                for privatedata, style in zip(plotitem.privatedatalist, plotitem.styles):
+                    style.adjustaxis(privatedata, plotitem.sharedata, self, plotitem, columnname, data)
+            if any(dict(vars(anaxis.data)) != self._ranges[axisname] for axisname, anaxis, adata, acanvas in axesstates):
+                return False
+        finally:
+            for axisname, anaxis, adata, acanvas in axesstates:
+                anaxis.data = adata
+                anaxis.canvas = acanvas
+        self._redrawplotitem(plotitem, start, dropped)
+        return True
+
+    def _redrawplotitem(self, plotitem, start=None, dropped=0):
+        # draw plotitem again (or continue at start after removing the first
+        # dropped points) and insert the new items at the position of the
+        # items inserted before
+        positions = []
+        for layer, items in plotitem.layeritems:
+            ids = set(id(item) for item in items)
+            positions.append((layer, min(i for i, item in enumerate(layer.items) if id(item) in ids)))
+            layer.items[:] = [item for item in layer.items if id(item) not in ids]
+        self._drawplotitem(plotitem, start, dropped)
+        for layer, position in positions:
+            for newlayer, items in plotitem.layeritems:
+                if newlayer is layer:
+                    del layer.items[-len(items):]
+                    layer.items[position:position] = items
 
     def doaxiscreate(self, axisname):
         if self.did(self.doaxiscreate, axisname):
@@ -248,6 +459,7 @@ class graph(canvas.canvas):
     def doaxes(self):
         raise NotImplementedError
 
+    @timing.timed("dostyles")
     def dostyles(self):
         if self.did(self.dostyles):
             return
@@ -274,11 +486,37 @@ class graph(canvas.canvas):
 
         self.didstyles = 1
 
+    @timing.timed("doplotitem")
     def doplotitem(self, plotitem):
         if self.did(self.doplotitem, plotitem):
             return
         self.dostyles()
-        plotitem.draw(self)
+        self._drawplotitem(plotitem)
+
+    def _layers(self, layers=None):
+        # all layers of the graph including those in layer groups
+        if layers is None:
+            layers = self.layers
+        result = []
+        for layer in list(layers.values()):
+            result.append(layer)
+            result.extend(self._layers(layer.layers))
+        return result
+
+    def _drawplotitem(self, plotitem, start=None, dropped=0):
+        # draws plotitem (or continues at start after removing the first
+        # dropped points) and keeps track of the items inserted into the
+        # layers and of the data drawn
+        layers = self._layers()
+        counts = [len(layer.items) for layer in layers]
+        if start is None:
+            plotitem.draw(self)
+        else:
+            plotitem.drawcontinued(self, start, dropped)
+        plotitem.drawncount = getattr(plotitem.data, "count", None)
+        plotitem.drawnlength = plotitem.datalength()
+        plotitem.layeritems = [(layer, layer.items[count:])
+                               for layer, count in zip(layers, counts) if len(layer.items) > count]
 
     def doplot(self):
         for plotitem in self.plotitems:
@@ -299,10 +537,20 @@ class graph(canvas.canvas):
         raise NotImplementedError
 
     def finish(self):
-        self.dobackground()
-        self.doaxes()
-        self.doplot()
-        self.dokey()
+        if timing.active is None:
+            self.dobackground()
+            self.doaxes()
+            self.doplot()
+            self.dokey()
+        else:
+            with timing.measure("dobackground"):
+                self.dobackground()
+            with timing.measure("doaxes"):
+                self.doaxes()
+            with timing.measure("doplot"):
+                self.doplot()
+            with timing.measure("dokey"):
+                self.dokey()
 
 
 class graphxy(graph):
@@ -440,6 +688,30 @@ class graphxy(graph):
         return (self.xpos + vx*self.width,
                 self.ypos + vy*self.height)
 
+    def poslist_pt(self, xs, ys, xaxis=None, yaxis=None):
+        """returns a list of positions in pts for the lists of values xs and ys
+
+        Positions of values not valid for the axes are None."""
+        if xaxis is None:
+            xaxis = self.axes["x"]
+        if yaxis is None:
+            yaxis = self.axes["y"]
+        return self.vposlist_pt(xaxis.convertlist(xs), yaxis.convertlist(ys))
+
+    def vposlist_pt(self, vxs, vys):
+        """returns a list of positions in pts for the lists of graph coordinates vxs and vys
+
+        Positions for graph coordinates being None are None."""
+        if self.flipped:
+            vxs, vys = vys, vxs
+        xpos_pt = self.xpos_pt
+        ypos_pt = self.ypos_pt
+        width_pt = self.width_pt
+        height_pt = self.height_pt
+        return [(xpos_pt + vx*width_pt, ypos_pt + vy*height_pt)
+                if vx is not None and vy is not None else None
+                for vx, vy in zip(vxs, vys)]
+
     def vzindex(self, vx, vy):
         return 0
 
@@ -639,6 +911,14 @@ class graphx(graphxy):
     def vpos(self, vx):
         return graphxy.vpos(self, vx, 0.5)
 
+    def poslist_pt(self, xs, xaxis=None):
+        if xaxis is None:
+            xaxis = self.axes["x"]
+        return self.vposlist_pt(xaxis.convertlist(xs))
+
+    def vposlist_pt(self, vxs):
+        return graphxy.vposlist_pt(self, vxs, [0.5]*len(vxs))
+
     def vgeodesic(self, vx1, vx2):
         return graphxy.vgeodesic(self, vx1, 0.5, vx2, 0.5)
 
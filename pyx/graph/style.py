@@ -22,7 +22,7 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
 
 
-import io, logging, math
+import collections, io, logging, math
 from pyx import attr, deco, bitmap, style, color, unit, canvas, path, mesh, trafo
 from pyx import text as textmodule
 from .graph import registerdefaultprovider, graphx
@@ -95,6 +95,28 @@ class _style:
         This method might be used to initialize the drawing of data."""
         pass
 
+    def cancontinuedrawpoints(self, privatedata, sharedata, graph, dropped):
+        """Check for the continuation of drawing data
+
+        This method returns whether the style supports the continuation
+        by continuedrawpoints (by default it does not), when the first
+        dropped data points drawn so far have been removed from the
+        data. It must not alter the style data. For styles supporting
+        the continuation, the axes ranges are adjusted to the new data
+        points only, so adjustaxis must handle the data pointwise."""
+        return False
+
+    def continuedrawpoints(self, privatedata, sharedata, graph, dropped):
+        """Continue drawing of data
+
+        This method is called instead of initdrawpoints, when further
+        data points are drawn after donedrawpoints was called already.
+        The first dropped data points drawn so far need to be removed.
+        It is called only when cancontinuedrawpoints returned true for
+        all styles. Otherwise all data points are drawn again starting
+        with initdrawpoints."""
+        pass
+
     def drawpoint(self, privatedata, sharedata, graph, point):
         """Draw data
 
@@ -219,6 +241,12 @@ class pos(_style):
                 if pointpostmp[1] >= missing:
                     pointpostmp[1] += 1
 
+    def cancontinuedrawpoints(self, privatedata, sharedata, graph, dropped):
+        return True
+
+    def continuedrawpoints(self, privatedata, sharedata, graph, dropped):
+        self.initdrawpoints(privatedata, sharedata, graph)
+
     def drawpoint(self, privatedata, sharedata, graph, point):
         sharedata.vposavailable = 1 # valid position (but might be outside of the graph)
         sharedata.vposvalid = 1 # valid position inside the graph
@@ -492,11 +520,24 @@ class symbol(_styleneedingpointpos):
 
     def initdrawpoints(self, privatedata, sharedata, graph):
         privatedata.symbolcanvas = canvas.canvas()
+        # number of items in symbolcanvas for each data point
+        privatedata.symbolcounts = collections.deque()
+
+    def cancontinuedrawpoints(self, privatedata, sharedata, graph, dropped):
+        return True
+
+    def continuedrawpoints(self, privatedata, sharedata, graph, dropped):
+        count = 0
+        for i in builtinrange(dropped):
+            count += privatedata.symbolcounts.popleft()
+        del privatedata.symbolcanvas.items[:count]
 
     def drawpoint(self, privatedata, sharedata, graph, point):
+        count = len(privatedata.symbolcanvas.items)
         if sharedata.vposvalid and privatedata.symbolattrs is not None:
             x_pt, y_pt = graph.vpos_pt(*sharedata.vpos)
             privatedata.symbol(privatedata.symbolcanvas, x_pt, y_pt, privatedata.size_pt, privatedata.symbolattrs)
+        privatedata.symbolcounts.append(len(privatedata.symbolcanvas.items) - count)
 
     def donedrawpoints(self, privatedata, sharedata, graph):
         graph.layer("data").insert(privatedata.symbolcanvas)
@@ -624,10 +665,78 @@ class _line(_styleneedingpointpos):
         privatedata.lastvpos = None
 
     def donepointstopath(self, privatedata):
+        # keep the state to continue the line by continuepointstopath
+        privatedata.continuepath = len(privatedata.path), privatedata.linebasepoints
         if len(privatedata.linebasepoints) > 1:
             self.addpointstopath(privatedata)
         return privatedata.path
 
+    def continuepointstopath(self, privatedata):
+        # continue the line after donepointstopath as if it was not called
+        pathitemcount, privatedata.linebasepoints = privatedata.continuepath
+        privatedata.path = path.path(*privatedata.path.pathitems[:pathitemcount])
+
+    def initpointmarks(self, privatedata):
+        # pointmarks store the path state after each point added by addpoint
+        # by the numbers of pathitems and linebasepoints; they are offset by
+        # the pathitems dropped and, for the first subpath of the path only,
+        # by the linebasepoints dropped
+        privatedata.pointmarks = collections.deque()
+        privatedata.droppedpathitems = privatedata.droppedlinebasepoints = 0
+
+    def markpoint(self, privatedata):
+        pathitemcount = len(privatedata.path.pathitems)
+        linebasepointcount = len(privatedata.linebasepoints)
+        if not pathitemcount:
+            linebasepointcount += privatedata.droppedlinebasepoints
+        privatedata.pointmarks.append((pathitemcount + privatedata.droppedpathitems, linebasepointcount))
+
+    def droppointsfrompath(self, privatedata, count):
+        # remove the first count marked points from the path (before
+        # donepointstopath), as if the path was started at the next point
+        for i in builtinrange(count):
+            privatedata.pointmarks.popleft()
+        pathitemcount, linebasepointcount = privatedata.pointmarks[0]
+        pathitemcount -= privatedata.droppedpathitems
+        if pathitemcount:
+            privatedata.droppedlinebasepoints = 0
+        else:
+            linebasepointcount -= privatedata.droppedlinebasepoints
+        pathitems = privatedata.path.pathitems[pathitemcount:]
+        privatedata.droppedpathitems += pathitemcount
+        if linebasepointcount > 1:
+            # the point is inside the graph and continues a subpath, which
+            # needs to start at this point
+            dropped = linebasepointcount - 1
+            if pathitems:
+                # the subpath is completed already
+                moveto, lineto = pathitems[:2]
+                if isinstance(lineto, path.multilineto_pt):
+                    points = [(moveto.x_pt, moveto.y_pt)] + list(lineto.points_pt)
+                else:
+                    points = [(moveto.x_pt, moveto.y_pt), (lineto.x_pt, lineto.y_pt)]
+                linebasepoints = privatedata.linebasepoints
+                privatedata.path = path.path()
+                privatedata.linebasepoints = points[dropped:]
+                self.addpointstopath(privatedata)
+                newpathitems = privatedata.path.pathitems
+                pathitems[:2] = newpathitems
+                privatedata.linebasepoints = linebasepoints
+                if newpathitems:
+                    privatedata.droppedlinebasepoints += dropped
+                else:
+                    # the subpath is gone (no further marked point belongs to it)
+                    privatedata.droppedpathitems += 2
+                    privatedata.droppedlinebasepoints = 0
+            else:
+                # a single point is not kept like when starting at this point,
+                # but it is added again by the next point inside the graph
+                privatedata.linebasepoints = privatedata.linebasepoints[dropped:]
+                if len(privatedata.linebasepoints) < 2:
+                    privatedata.linebasepoints = []
+                privatedata.droppedlinebasepoints += dropped
+        privatedata.path = path.path(*pathitems)
+
 
 class line(_line):
 
@@ -652,9 +761,19 @@ class line(_line):
 
     def initdrawpoints(self, privatedata, sharedata, graph):
         self.initpointstopath(privatedata)
+        self.initpointmarks(privatedata)
+
+    def cancontinuedrawpoints(self, privatedata, sharedata, graph, dropped):
+        return True
+
+    def continuedrawpoints(self, privatedata, sharedata, graph, dropped):
+        self.continuepointstopath(privatedata)
+        if dropped:
+            self.droppointsfrompath(privatedata, dropped)
 
     def drawpoint(self, privatedata, sharedata, graph, point):
         self.addpoint(privatedata, graph.vpos_pt, sharedata.vposavailable, sharedata.vposvalid, sharedata.vpos)
+        self.markpoint(privatedata)
 
     def donedrawpoints(self, privatedata, sharedata, graph):
         path = self.donepointstopath(privatedata)
@@ -1916,16 +2035,28 @@ class density(_keygraphstyle):
 
     needsdata = ["values1", "values2", "data12", "data21"]
 
-    def __init__(self, epsilon=1e-10, **kwargs):
+    def __init__(self, epsilon=1e-10, lutsize=None, **kwargs):
         _keygraphstyle.__init__(self, **kwargs)
         self.epsilon = epsilon
+        self.lutsize = lutsize
 
     def initdrawpoints(self, privatedata, sharedata, graph):
         privatedata.colors = {}
+        # the points in the order of the data (used when they form a regular grid)
+        privatedata.gridvalues1 = []
+        privatedata.gridvalues2 = []
+        privatedata.gridcolors = []
+        privatedata.gridavailable = True
         privatedata.vfixed = [None]*len(graph.axesnames)
 
     def drawpoint(self, privatedata, sharedata, graph, point):
         privatedata.colors.setdefault(sharedata.value1, {})[sharedata.value2] = point[self.colorname]
+        if sharedata.vposavailable:
+            privatedata.gridvalues1.append(sharedata.value1)
+            privatedata.gridvalues2.append(sharedata.value2)
+            privatedata.gridcolors.append(point[self.colorname])
+        else:
+            privatedata.gridavailable = False
         if len(privatedata.vfixed) > 2 and sharedata.vposavailable:
             for i, (v1, v2) in enumerate(list(zip(privatedata.vfixed, sharedata.vpos))):
                 if i != sharedata.index1 and i != sharedata.index2:
@@ -1949,48 +2080,29 @@ class density(_keygraphstyle):
                     raise ValueError("data must be equidistant for the density style")
         equidistant(values1)
         equidistant(values2)
+        colorvalues = self.gridcolorvalues(privatedata, values1, values2)
         needalpha = False
-        for value2 in values2:
-            for value1 in values1:
-                try:
-                    available, valid, v = sharedata.data12[value1][value2]
-                except KeyError:
-                    needalpha = True
-                    break
-                if not available:
-                    needalpha = True
-                    continue
-            else:
-                continue
-            break
+        if colorvalues is None:
+            colors = privatedata.colors
+            data12 = sharedata.data12
+            colorvalues = []
+            for value2 in values2:
+                for value1 in values1:
+                    try:
+                        available, valid, v = data12[value1][value2]
+                    except KeyError:
+                        available = False
+                    if available:
+                        colorvalues.append(colors[value1][value2])
+                    else:
+                        colorvalues.append(None)
+                        needalpha = True
         mode = {"/DeviceGray": "L",
                 "/DeviceRGB": "RGB",
                 "/DeviceCMYK": "CMYK"}[self.gradient.getcolor(0).colorspacestring()]
         if needalpha:
             mode = mode + "A"
-        empty = b"\0"*len(mode)
-        data = io.BytesIO()
-        for value2 in values2:
-            for value1 in values1:
-                try:
-                    available, valid, v = sharedata.data12[value1][value2]
-                except KeyError:
-                    data.write(empty)
-                    continue
-                if not available:
-                    data.write(empty)
-                    continue
-                c = privatedata.colors[value1][value2]
-                try:
-                    c = self.color(privatedata, c)
-                except TypeError:
-                    data.write(empty)
-                    continue
-
-                data.write(c.to8bitbytes())
-                if needalpha:
-                    data.write(bytes((255,)))
-        i = bitmap.image(len(values1), len(values2), mode, data.getvalue())
+        i = bitmap.image(len(values1), len(values2), mode, self.imagedata(privatedata, colorvalues, mode))
 
         v1enlargement = (values1[-1]-values1[0])*0.5/(len(values1)-1)
         v2enlargement = (values2[-1]-values2[0])*0.5/(len(values2)-1)
@@ -2046,6 +2158,72 @@ class density(_keygraphstyle):
 
         _keygraphstyle.donedrawpoints(self, privatedata, sharedata, graph)
 
+    def gridcolorvalues(self, privatedata, values1, values2):
+        """returns the color values in row-major order, when the data forms
+        a complete regular grid, or None otherwise
+
+        The data points need to be ordered by the sorted values1 and values2,
+        where either of them varies fastest. The color values are then taken
+        from the data in a single pass without looking up the points."""
+        n1 = len(values1)
+        n2 = len(values2)
+        gridvalues1 = privatedata.gridvalues1
+        gridvalues2 = privatedata.gridvalues2
+        gridcolors = privatedata.gridcolors
+        if not privatedata.gridavailable or len(gridcolors) != n1*n2:
+            return None
+        if gridvalues1[:n1] == values1:
+            if gridvalues1 == values1*n2 and gridvalues2 == [value2 for value2 in values2 for i in builtinrange(n1)]:
+                return gridcolors
+        elif gridvalues2[:n2] == values2:
+            if gridvalues2 == values2*n1 and gridvalues1 == [value1 for value1 in values1 for i in builtinrange(n2)]:
+                return [color for i2 in builtinrange(n2) for color in gridcolors[i2::n2]]
+        return None
+
+    def imagedata(self, privatedata, colorvalues, mode):
+        """returns the raw image data for a row-major list of color values
+
+        All color values are converted by the color axis at once and
+        passed to the getcolorbytes method of the gradient, using a
+        lookup table of lutsize colors when lutsize is set. Missing
+        color values (None) and color values of an invalid type result
+        in empty (i.e. transparent, when mode contains an alpha channel)
+        pixels, while other conversion errors are raised."""
+        coloraxis = privatedata.keygraph.axes["x"]
+        vcs = coloraxis.convertlist(colorvalues)
+        if vcs.count(None) > colorvalues.count(None):
+            # only color values of an invalid type result in empty pixels
+            for colorvalue, vc in zip(colorvalues, vcs):
+                if vc is None and colorvalue is not None:
+                    try:
+                        coloraxis.convert(colorvalue)
+                    except TypeError:
+                        pass
+        validvcs = [vc for vc in vcs if vc is not None]
+        if any(vc < 0 for vc in validvcs):
+            logger.warning("gradient color range is exceeded (lower bound)")
+        if any(vc > 1 for vc in validvcs):
+            logger.warning("gradient color range is exceeded (upper bound)")
+        colorbytes = self.gradient.getcolorbytes([min(max(vc, 0), 1) for vc in validvcs], lutsize=self.lutsize)
+        if len(validvcs) == len(vcs) and not mode.endswith("A"):
+            return colorbytes
+        if mode.endswith("A"):
+            n = len(mode) - 1
+            alpha = b"\xff"
+        else:
+            n = len(mode)
+            alpha = b""
+        empty = b"\0"*len(mode)
+        result = []
+        i = 0
+        for vc in vcs:
+            if vc is None:
+                result.append(empty)
+            else:
+                result.append(colorbytes[i:i+n] + alpha)
+                i += n
+        return b"".join(result)
+
 
 
 class gradient(_style):
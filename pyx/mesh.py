@@ -64,6 +64,17 @@ def coords24bit_pt(coords_pt, min_pt, max_pt):
     return struct.pack(">I", int((coords_pt-min_pt)*16777215.0/(max_pt-min_pt)))[1:]
 
 
+def coordslist24bit_pt(coordslist_pt, min_pt, max_pt):
+    """returns a list of 24 bit encoded coordinates like coords24bit_pt
+
+    All coordinates are packed by a single struct.pack call."""
+    size_pt = max_pt - min_pt
+    if not size_pt:
+        size_pt = 1
+    packed = struct.pack(">%dI" % len(coordslist_pt), *[int((coords_pt-min_pt)*16777215.0/size_pt) for coords_pt in coordslist_pt])
+    return [packed[i+1:i+4] for i in range(0, len(packed), 4)]
+
+
 class PDFGenericResource(pdfwriter.PDFobject):
 
     def __init__(self, type, name, content):
@@ -74,83 +85,52 @@ class PDFGenericResource(pdfwriter.PDFobject):
         file.write_bytes(self.content)
 
 
-class mesh(baseclasses.canvasitem):
+class _mesh(baseclasses.canvasitem):
+    """base class for meshes written as free-form (type 4) or lattice-form
+    (type 5) shadings
 
-    def __init__(self, elements, check=1):
-        self.elements = elements
-        if check:
-            colorspacestring = ""
-            for element in elements:
-                if len(element.nodes) != 3:
-                    raise ValueError("triangular mesh expected")
-                try:
-                    for node in element.nodes:
-                        if not colorspacestring:
-                            colorspacestring = node.value.colorspacestring()
-                        elif node.value.colorspacestring() != colorspacestring:
-                            raise ValueError("color space mismatch")
-                except AttributeError:
-                    raise ValueError("gray, rgb or cmyk color values expected")
-                for node in element.nodes:
-                    if len(node.coords_pt) != 2:
-                        raise ValueError("two dimensional coordinates expected")
-
-    def bbox(self):
-        return bbox.bbox_pt(min([node.coords_pt[0] for element in self.elements for node in element.nodes]),
-                            min([node.coords_pt[1] for element in self.elements for node in element.nodes]),
-                            max([node.coords_pt[0] for element in self.elements for node in element.nodes]),
-                            max([node.coords_pt[1] for element in self.elements for node in element.nodes]))
+    Subclasses need to provide the bbox, a method data returning the
+    vertex stream for a given bbox, and a method shadinginfo returning a
+    tuple of the shading type, the colorspace string, the number of color
+    components and the shading type specific dictionary entry."""
 
-    def data(self, bbox):
-        return b"".join([b"\000" + coords24bit_pt(node.coords_pt[0], bbox.llx_pt, bbox.urx_pt) +
-                                   coords24bit_pt(node.coords_pt[1], bbox.lly_pt, bbox.ury_pt) +
-                                   node.value.to8bitbytes()
-                         for element in self.elements for node in element.nodes])
+    def bitmap(self, writer):
+        from pyx import bitmap, canvas
+        from PIL import Image
+        c = canvas.canvas()
+        c.insert(self)
+        i = Image.open(c.pipeGS("pngalpha", resolution=writer.meshasbitmapresolution))
+        i.load()
+        thisbbox = self.bbox()
+        b = bitmap.bitmap_pt(thisbbox.llx_pt, thisbbox.lly_pt, i)
+        # we slightly shift the bitmap to re-center it, as the bitmap might contain some additional border
+        # unfortunately we need to construct another bitmap instance for that ...
+        return bitmap.bitmap_pt(thisbbox.llx_pt + 0.5*(thisbbox.width_pt()-b.bbox().width_pt()),
+                                thisbbox.lly_pt + 0.5*(thisbbox.height_pt()-b.bbox().height_pt()), i)
 
     def processPS(self, file, writer, context, registry, bbox):
         if writer.meshasbitmap:
-            from pyx import bitmap, canvas
-            from PIL import Image
-            c = canvas.canvas()
-            c.insert(self)
-            i = Image.open(c.pipeGS("pngalpha", resolution=writer.meshasbitmapresolution))
-            i.load()
-            b = bitmap.bitmap_pt(self.bbox().llx_pt, self.bbox().lly_pt, i)
-            # we slightly shift the bitmap to re-center it, as the bitmap might contain some additional border
-            # unfortunately we need to construct another bitmap instance for that ...
-            b = bitmap.bitmap_pt(self.bbox().llx_pt + 0.5*(self.bbox().width_pt()-b.bbox().width_pt()),
-                                 self.bbox().lly_pt + 0.5*(self.bbox().height_pt()-b.bbox().height_pt()), i)
-            b.processPS(file, writer, context, registry, bbox)
+            self.bitmap(writer).processPS(file, writer, context, registry, bbox)
         else:
             thisbbox = self.bbox()
             bbox += thisbbox
-            file.write("""<< /ShadingType 4
+            shadingtype, colorspacestring, components, entry = self.shadinginfo()
+            file.write("""<< /ShadingType %d
 /ColorSpace %s
 /BitsPerCoordinate 24
 /BitsPerComponent 8
-/BitsPerFlag 8
+%s
 /Decode [%f %f %f %f %s]
 /DataSource currentfile /ASCIIHexDecode filter /FlateDecode filter
->> shfill\n""" % (self.elements[0].nodes[0].value.colorspacestring(),
+>> shfill\n""" % (shadingtype, colorspacestring, entry,
                   thisbbox.llx_pt, thisbbox.urx_pt, thisbbox.lly_pt, thisbbox.ury_pt,
-                  " ".join(["0 1" for value in self.elements[0].nodes[0].value.to8bitbytes()])))
+                  " ".join(["0 1"]*components)))
             file.write_bytes(binascii.b2a_hex(zlib.compress(self.data(thisbbox))))
             file.write(">\n")
 
     def processPDF(self, file, writer, context, registry, bbox):
         if writer.meshasbitmap:
-            from pyx import bitmap, canvas
-            from PIL import Image
-            c = canvas.canvas()
-            c.insert(self)
-            i = Image.open(c.pipeGS("pngalpha", resolution=writer.meshasbitmapresolution))
-            i.load()
-            b = bitmap.bitmap_pt(self.bbox().llx_pt, self.bbox().lly_pt, i)
-            # we slightly shift the bitmap to re-center it, as the bitmap might contain some additional border
-            # unfortunately we need to construct another bitmap instance for that ...
-            b = bitmap.bitmap_pt(self.bbox().llx_pt + 0.5*(self.bbox().width_pt()-b.bbox().width_pt()),
-                                 self.bbox().lly_pt + 0.5*(self.bbox().height_pt()-b.bbox().height_pt()), i)
-            b.processPDF(file, writer, context, registry, bbox)
+            self.bitmap(writer).processPDF(file, writer, context, registry, bbox)
         else:
             thisbbox = self.bbox()
             bbox += thisbbox
@@ -161,34 +141,140 @@ class mesh(baseclasses.canvasitem):
             else:
                 filter = ""
             name = "shading-%s" % id(self)
+            shadingtype, colorspacestring, components, entry = self.shadinginfo()
             shading = PDFGenericResource("shading", name, ("""<<
-/ShadingType 4
+/ShadingType %d
 /ColorSpace %s
 /BitsPerCoordinate 24
 /BitsPerComponent 8
-/BitsPerFlag 8
+%s
 /Decode [%f %f %f %f %s]
 /Length %i
 %s>>
 stream
-""" %            (self.elements[0].nodes[0].value.colorspacestring(),
+""" %            (shadingtype, colorspacestring, entry,
                   thisbbox.llx_pt, thisbbox.urx_pt, thisbbox.lly_pt, thisbbox.ury_pt,
-                  " ".join(["0 1" for value in self.elements[0].nodes[0].value.to8bitbytes()]),
+                  " ".join(["0 1"]*components),
                   len(d), filter)).encode('ascii') + d + b"\nendstream\n")
             registry.add(shading)
             registry.addresource("Shading", name, shading)
             file.write("/%s sh\n" % name)
 
     def processSVG(self, xml, writer, context, registry, bbox):
-        from pyx import bitmap, canvas
-        from PIL import Image
-        c = canvas.canvas()
-        c.insert(self)
-        i = Image.open(c.pipeGS("pngalpha", resolution=writer.meshasbitmapresolution))
-        i.load()
-        b = bitmap.bitmap_pt(self.bbox().llx_pt, self.bbox().lly_pt, i)
-        # we slightly shift the bitmap to re-center it, as the bitmap might contain some additional border
-        # unfortunately we need to construct another bitmap instance for that ...
-        b = bitmap.bitmap_pt(self.bbox().llx_pt + 0.5*(self.bbox().width_pt()-b.bbox().width_pt()),
-                             self.bbox().lly_pt + 0.5*(self.bbox().height_pt()-b.bbox().height_pt()), i)
-        b.processSVG(xml, writer, context, registry, bbox)
+        self.bitmap(writer).processSVG(xml, writer, context, registry, bbox)
+
+
+class mesh(_mesh):
+
+    def __init__(self, elements, check=1):
+        self.elements = elements
+        if check:
+            colorspacestring = ""
+            for element in elements:
+                if len(element.nodes) != 3:
+                    raise ValueError("triangular mesh expected")
+                try:
+                    for node in element.nodes:
+                        if not colorspacestring:
+                            colorspacestring = node.value.colorspacestring()
+                        elif node.value.colorspacestring() != colorspacestring:
+                            raise ValueError("color space mismatch")
+                except AttributeError:
+                    raise ValueError("gray, rgb or cmyk color values expected")
+                for node in element.nodes:
+                    if len(node.coords_pt) != 2:
+                        raise ValueError("two dimensional coordinates expected")
+
+    def bbox(self):
+        xs_pt = [node.coords_pt[0] for element in self.elements for node in element.nodes]
+        ys_pt = [node.coords_pt[1] for element in self.elements for node in element.nodes]
+        return bbox.bbox_pt(min(xs_pt), min(ys_pt), max(xs_pt), max(ys_pt))
+
+    def data(self, bbox):
+        nodes = [node for element in self.elements for node in element.nodes]
+        xs = coordslist24bit_pt([node.coords_pt[0] for node in nodes], bbox.llx_pt, bbox.urx_pt)
+        ys = coordslist24bit_pt([node.coords_pt[1] for node in nodes], bbox.lly_pt, bbox.ury_pt)
+        return b"".join([b"\000" + x + y + node.value.to8bitbytes() for node, x, y in zip(nodes, xs, ys)])
+
+    def shadinginfo(self):
+        value = self.elements[0].nodes[0].value
+        return 4, value.colorspacestring(), len(value.to8bitbytes()), "/BitsPerFlag 8"
+
+
+_colorspacestrings = {"L": "/DeviceGray", "RGB": "/DeviceRGB", "CMYK": "/DeviceCMYK"}
+
+
+class _arraymesh(_mesh):
+
+    def __init__(self, xs_pt, ys_pt, colors, mode):
+        """array-backed mesh
+
+        xs_pt and ys_pt are sequences of the node coordinates in pts,
+        colors contains the packed 8 bit colors of all nodes in sequence
+        (see color.gradient.getcolorbytes) and mode is "L", "RGB" or
+        "CMYK" like for bitmap images."""
+        if len(xs_pt) != len(ys_pt):
+            raise ValueError("coordinate sequences of equal length expected")
+        if mode not in _colorspacestrings:
+            raise ValueError("invalid mode '%s'" % mode)
+        if len(colors) != len(mode)*len(xs_pt):
+            raise ValueError("color data length mismatch")
+        self.xs_pt = xs_pt
+        self.ys_pt = ys_pt
+        self.colors = colors
+        self.mode = mode
+        self._extent_pt = None
+
+    def bbox(self):
+        if self._extent_pt is None:
+            self._extent_pt = min(self.xs_pt), min(self.ys_pt), max(self.xs_pt), max(self.ys_pt)
+        return bbox.bbox_pt(*self._extent_pt)
+
+    def nodedata(self, bbox, flag):
+        """returns a list of the encoded nodes prefixed by flag"""
+        xs = coordslist24bit_pt(self.xs_pt, bbox.llx_pt, bbox.urx_pt)
+        ys = coordslist24bit_pt(self.ys_pt, bbox.lly_pt, bbox.ury_pt)
+        colors = self.colors
+        n = len(self.mode)
+        return [flag + x + y + colors[i:i+n] for x, y, i in zip(xs, ys, range(0, len(colors), n))]
+
+
+class indexedmesh_pt(_arraymesh):
+
+    def __init__(self, xs_pt, ys_pt, colors, mode, indices):
+        """triangular mesh with nodes referenced by indices
+
+        indices is a sequence containing three node indices for each
+        triangle. The mesh is written as a free-form (type 4) shading,
+        where each node is encoded once no matter how many triangles
+        make use of it."""
+        _arraymesh.__init__(self, xs_pt, ys_pt, colors, mode)
+        if len(indices) % 3:
+            raise ValueError("triangular mesh expected")
+        self.indices = indices
+
+    def data(self, bbox):
+        nodes = self.nodedata(bbox, b"\000")
+        return b"".join([nodes[i] for i in self.indices])
+
+    def shadinginfo(self):
+        return 4, _colorspacestrings[self.mode], len(self.mode), "/BitsPerFlag 8"
+
+
+class latticemesh_pt(_arraymesh):
+
+    def __init__(self, xs_pt, ys_pt, colors, mode, verticesperrow):
+        """mesh of nodes arranged in a lattice
+
+        The nodes are ordered row by row with verticesperrow nodes per
+        row. The mesh is written as a lattice-form (type 5) shading."""
+        _arraymesh.__init__(self, xs_pt, ys_pt, colors, mode)
+        if verticesperrow < 2 or len(xs_pt) % verticesperrow or len(xs_pt) < 2*verticesperrow:
+            raise ValueError("lattice of at least two rows and columns expected")
+        self.verticesperrow = verticesperrow
+
+    def data(self, bbox):
+        return b"".join(self.nodedata(bbox, b""))
+
+    def shadinginfo(self):
+        return 5, _colorspacestrings[self.mode], len(self.mode), "/VerticesPerRow %d" % self.verticesperrow
@@ -334,6 +334,183 @@ def mp_solve_choices(p, q, n, delta_x, delta_y, delta, psi): # <<<
         if k == n:
             break
 # >>>
+def mp_smooth_controls(x_pt, y_pt, tensions, cycle, ltype, lvalue, rtype, rvalue, epsilon): # <<<
+    """Determines the control points of a path smoothly passing through the
+    knots (x_pt[k], y_pt[k]).
+
+    This is a variant of mp_make_choices and mp_solve_choices working on lists
+    of coordinates instead of linked knots. All inner knots are open (i.e.
+    smooth). The curve from knot k to knot k+1 has the tension tensions[k] at
+    both of its ends. Unless the path is a cycle, the first knot has the right
+    type ltype (mp_curl or mp_given) with the curl or angle lvalue, and the
+    last knot has the left type rtype with the value rvalue. Returns lists of
+    the control points rx_pt, ry_pt (after knot k) and lx_pt, ly_pt (before
+    knot k+1) for all curves."""
+    m = len(x_pt)
+    n = m if cycle else m-1
+    delta_x = [x_pt[(k+1)%m] - x_pt[k] for k in range(n)]
+    delta_y = [y_pt[(k+1)%m] - y_pt[k] for k in range(n)]
+    delta = [mp_pyth_add(dx, dy) for dx, dy in zip(delta_x, delta_y)]
+
+    # 334: consecutive equal knots are joined explicitly, which we use as
+    # the defaults for all curves
+    rx_pt = list(x_pt[:n])
+    ry_pt = list(y_pt[:n])
+    lx_pt = list(x_pt[:n])
+    ly_pt = list(y_pt[:n])
+
+    # split the path into runs of curves between the explicit joins, which
+    # start and end with a curl of unity
+    breaks = [k for k in range(n) if delta[k] < epsilon]
+    if not cycle:
+        start = 0
+        for k in breaks + [n]:
+            if k > start:
+                _mp_solve_run(list(range(start, k)), False,
+                              ltype if start == 0 else mp_curl, lvalue if start == 0 else unity,
+                              rtype if k == n else mp_curl, rvalue if k == n else unity,
+                              x_pt, y_pt, tensions, delta_x, delta_y, delta, rx_pt, ry_pt, lx_pt, ly_pt)
+            start = k + 1
+    elif breaks:
+        for i, k in enumerate(breaks):
+            length = (breaks[(i+1)%len(breaks)] - k - 1) % n
+            if length:
+                _mp_solve_run([(k+1+j)%n for j in range(length)], False, mp_curl, unity, mp_curl, unity,
+                              x_pt, y_pt, tensions, delta_x, delta_y, delta, rx_pt, ry_pt, lx_pt, ly_pt)
+    else:
+        _mp_solve_run(list(range(n)), True, None, None, None, None,
+                      x_pt, y_pt, tensions, delta_x, delta_y, delta, rx_pt, ry_pt, lx_pt, ly_pt)
+    return rx_pt, ry_pt, lx_pt, ly_pt
+# >>>
+def _mp_solve_run(curves, cycle, ltype, lvalue, rtype, rvalue,
+                  x_pt, y_pt, tensions, delta_x, delta_y, delta, rx_pt, ry_pt, lx_pt, ly_pt): # <<<
+    """Sets the control points of the given curves (a list of indices into
+    the lists of mp_smooth_controls) following mp_solve_choices
+
+    For speed, the fraction arithmetics (mp_make_fraction, mp_take_fraction
+    etc.) are written as plain floating point operations."""
+    m = len(x_pt)
+    n = len(curves)
+    dx = [delta_x[c] for c in curves]
+    dy = [delta_y[c] for c in curves]
+    d = [delta[c] for c in curves]
+    tens = [tensions[c] for c in curves]
+    if cycle:
+        dx.append(dx[0])
+        dy.append(dy[0])
+        d.append(d[0])
+        tens.append(tens[0])
+
+    # 346: Calculate the turning angles psi_k
+    psi = [None]
+    for k in range(1, n+1 if cycle else n):
+        sine = dy[k-1] / d[k-1]
+        cosine = dx[k-1] / d[k-1]
+        psi.append(atan2(dy[k]*cosine - dx[k]*sine, dx[k]*cosine + dy[k]*sine))
+    if cycle:
+        psi.append(psi[1])
+    else:
+        psi.append(0)
+
+    def set_controls(k, st, ct, sf, cf):
+        c = curves[k]
+        q = (c+1) % m
+        rx_pt[c], ry_pt[c], lx_pt[c], ly_pt[c] = mp_controls(x_pt[c], y_pt[c], x_pt[q], y_pt[q], dx[k], dy[k],
+                                                             st, ct, sf, cf, tens[k], tens[k])
+
+    uu = [None]*(n+1)
+    ww = [None]*(n+1)
+    vv = [None]*(n+1)
+    theta = [None]*(n+1)
+
+    # 354: Get the linear equations started
+    if cycle:
+        uu[0] = 0
+        vv[0] = 0
+        ww[0] = fraction_one
+    elif ltype == mp_given:
+        if n == 1 and rtype == mp_given:
+            # 372: Reduce to simple case of two givens
+            aa = atan2(dy[0], dx[0])
+            set_controls(0, sin(lvalue - aa), cos(lvalue - aa), -sin(rvalue - aa), cos(rvalue - aa))
+            return
+        vv[0] = reduce_angle(lvalue - atan2(dy[0], dx[0]))
+        uu[0] = 0
+        ww[0] = 0
+    else:
+        if n == 1 and rtype == mp_curl:
+            # 373: Reduce to simple case of straight line
+            c = curves[0]
+            ff = unity / (3.0*abs(tens[0]))
+            rx_pt[c] = x_pt[c] + dx[0]*ff
+            ry_pt[c] = y_pt[c] + dy[0]*ff
+            lx_pt[c] = x_pt[(c+1)%m] - dx[0]*ff
+            ly_pt[c] = y_pt[(c+1)%m] - dy[0]*ff
+            return
+        # 363:
+        uu[0] = mp_curl_ratio(lvalue, abs(tens[0]), abs(tens[0]))
+        vv[0] = -psi[1]*uu[0]
+        ww[0] = 0
+
+    for k in range(1, n+1):
+        if k == n and not cycle:
+            if rtype == mp_curl:
+                # 364:
+                ff = mp_curl_ratio(rvalue, abs(tens[n-1]), abs(tens[n-1]))
+                theta[n] = -(vv[n-1]*ff) / (fraction_one - ff*uu[n-1])
+            else:
+                # 361:
+                theta[n] = reduce_angle(rvalue - atan2(dy[n-1], dx[n-1]))
+            break
+
+        # 357, 358: Set up equation to match mock curvatures at z_k
+        lt = abs(tens[k-1])
+        rt = abs(tens[k])
+        aa = unity / (3.0*lt - unity)
+        dd = d[k] * (fraction_three - unity/lt)
+        bb = unity / (3*rt - unity)
+        ee = d[k-1] * (fraction_three - unity/rt)
+        cc = fraction_one - uu[k-1]*aa
+        dd = dd*cc
+        if lt < rt:
+            dd *= (lt/rt)**2
+        elif lt > rt:
+            ee *= (rt/lt)**2
+        ff = ee / (ee + dd)
+        uu[k] = ff*bb
+
+        # 359: Calculate the values of vk and wk
+        acc = -psi[k+1]*uu[k]
+        if k == 1 and not cycle and ltype == mp_curl:
+            ww[k] = 0
+            vv[k] = acc - psi[1]*(fraction_one - ff)
+        else:
+            ff = (fraction_one - ff) / cc
+            acc = acc - psi[k]*ff
+            ff = ff*aa
+            vv[k] = acc - vv[k-1]*ff
+            ww[k] = -ww[k-1]*ff
+
+        if k == n:
+            # 360: Adjust theta_n to equal theta_0
+            aa = 0
+            bb = fraction_one
+            for j in range(n-1, -1, -1):
+                aa = vv[j or n] - aa*uu[j or n]
+                bb = ww[j or n] - bb*uu[j or n]
+            aa = aa / (fraction_one - bb)
+            theta[n] = aa
+            vv[0] = aa
+            for j in range(1, n):
+                vv[j] = vv[j] + aa*ww[j]
+
+    # 367: Finish choosing angles and assigning control points
+    for k in range(n-1, -1, -1):
+        theta[k] = vv[k] - theta[k+1]*uu[k]
+    for k in range(n):
+        phi = -psi[k+1]-theta[k+1]
+        set_controls(k, sin(theta[k]), cos(theta[k]), sin(phi), cos(phi))
+# >>>
 def mp_n_arg(x, y): # <<<
     return atan2(y, x)
 # >>>
@@ -353,11 +530,20 @@ def mp_set_controls(p, q, delta_x, delta_y, st, ct, sf, cf): # <<<
     calculation.
 
     See mp.pdf, item 370"""
-    lt = abs(q.left_tension())
-    rt = abs(p.right_tension())
+    p.rx_pt, p.ry_pt, q.lx_pt, q.ly_pt = mp_controls(p.x_pt, p.y_pt, q.x_pt, q.y_pt, delta_x, delta_y,
+                                                     st, ct, sf, cf, p.right_tension(), q.left_tension())
+    p.rtype = mp_explicit
+    q.ltype = mp_explicit
+# >>>
+def mp_controls(px_pt, py_pt, qx_pt, qy_pt, delta_x, delta_y, st, ct, sf, cf, rtension, ltension): # <<<
+    """Returns the control points rx_pt, ry_pt, lx_pt, ly_pt of the curve
+    from p to q as calculated by mp_set_controls, where rtension is the right
+    tension of p and ltension is the left tension of q."""
+    lt = abs(ltension)
+    rt = abs(rtension)
     rr = mp_velocity(st, ct, sf, cf, rt)
     ss = mp_velocity(sf, cf, st, ct, lt)
-    if p.right_tension() < 0 or q.left_tension() < 0:
+    if rtension < 0 or ltension < 0:
         # 371: Decrease the velocities, if necessary, to stay inside the bounding triangle
         # this is the only place where the sign of the tension counts
         if (st >= 0 and sf >= 0) or (st <= 0 and sf <= 0):
@@ -365,19 +551,17 @@ def mp_set_controls(p, q, delta_x, delta_y, st, ct, sf, cf): # <<<
             if sine > 0:
                 #sine = mp_take_fraction(sine, fraction_one + unity) # safety factor
                 sine *= 1.00024414062 # safety factor
-                if p.right_tension() < 0:
+                if rtension < 0:
                     if mp_ab_vs_cd(abs(sf), fraction_one, rr, sine) < 0:
                         rr = mp_make_fraction(abs(sf), sine)
-                if q.left_tension() < 0:
+                if ltension < 0:
                     if mp_ab_vs_cd(abs(st), fraction_one, ss, sine) < 0:
                         ss = mp_make_fraction(abs(st), sine)
 
-    p.rx_pt = p.x_pt + mp_take_fraction(mp_take_fraction(delta_x, ct) - mp_take_fraction(delta_y, st), rr)
-    p.ry_pt = p.y_pt + mp_take_fraction(mp_take_fraction(delta_y, ct) + mp_take_fraction(delta_x, st), rr)
-    q.lx_pt = q.x_pt - mp_take_fraction(mp_take_fraction(delta_x, cf) + mp_take_fraction(delta_y, sf), ss)
-    q.ly_pt = q.y_pt - mp_take_fraction(mp_take_fraction(delta_y, cf) - mp_take_fraction(delta_x, sf), ss)
-    p.rtype = mp_explicit
-    q.ltype = mp_explicit
+    return (px_pt + (delta_x*ct - delta_y*st)*rr,
+            py_pt + (delta_y*ct + delta_x*st)*rr,
+            qx_pt - (delta_x*cf + delta_y*sf)*ss,
+            qy_pt - (delta_y*cf - delta_x*sf)*ss)
 # >>>
 def mp_make_fraction(p, q): # <<<
     # 17: mpmath.pdf
@@ -22,7 +22,7 @@ from math import atan2, radians
 from pyx import unit, attr, normpath
 from pyx import path as pathmodule
 
-from .mp_path import mp_endpoint, mp_explicit, mp_given, mp_curl, mp_open, mp_end_cycle, mp_make_choices
+from .mp_path import mp_endpoint, mp_explicit, mp_given, mp_curl, mp_open, mp_end_cycle, mp_make_choices, mp_smooth_controls
 
 # global epsilon (default precision length of metapost, in pt)
 _epsilon = 1e-5
@@ -354,3 +354,39 @@ class path(pathmodule.path):
                 if is_closed:
                     self.append(pathmodule.closepath())
 
+
+def smoothnormsubpath_pt(x_pt, y_pt, closed=False, tension=1, atleast=False,
+                         lcurl=1, rcurl=1, langle=None, rangle=None, epsilon=None):
+    """Returns a normsubpath smoothly passing through the points (x_pt[i], y_pt[i])
+
+    The result equals a path of smoothknots connected by tensioncurves, which
+    starts with a beginknot (curl lcurl or angle langle in radians) and ends
+    with an endknot (curl rcurl or angle rangle) unless it is closed. The
+    tension is a single value or a sequence with one value for each curve.
+    As the control points are calculated on lists of coordinates, this
+    function is much faster than the equivalent path of knots and links."""
+    if epsilon is None:
+        epsilon = _epsilon
+    n = len(x_pt) if closed else len(x_pt) - 1
+    try:
+        tensions = list(tension)
+    except TypeError:
+        tensions = [tension]*n
+    if len(tensions) != n:
+        raise ValueError("a tension for each curve is required")
+    # make sure that tension >= 0.75 (p. 9 mpman.pdf)
+    tensions = [max(0.75, abs(tension)) for tension in tensions]
+    if atleast:
+        tensions = [-tension for tension in tensions]
+    if langle is None:
+        ltype, lvalue = mp_curl, lcurl
+    else:
+        ltype, lvalue = mp_given, langle
+    if rangle is None:
+        rtype, rvalue = mp_curl, rcurl
+    else:
+        rtype, rvalue = mp_given, rangle
+    rx_pt, ry_pt, lx_pt, ly_pt = mp_smooth_controls(x_pt, y_pt, tensions, closed, ltype, lvalue, rtype, rvalue, epsilon)
+    m = len(x_pt)
+    return normpath.normsubpath([normpath.normcurve_pt(x_pt[k], y_pt[k], rx_pt[k], ry_pt[k], lx_pt[k], ly_pt[k], x_pt[(k+1)%m], y_pt[(k+1)%m])
+                                 for k in range(n)], closed=closed)
@@ -21,7 +21,7 @@
 # along with PyX; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
 
-import math, functools
+import bisect, math, functools
 from . import mathutils, trafo, unit
 from . import bbox as bboxmodule
 
@@ -71,6 +71,13 @@ class normsubpathitem:
         """return a tuple of params"""
         pass
 
+    def _arclenlines(self, epsilon):
+        """return a list of tuples (t0, t1, line) approximating the arc length
+
+        The normline_pt line replaces the normsubpathitem between the params
+        t0 and t1. The approximation is the same as in _arclentoparam_pt."""
+        pass
+
     def at_pt(self, params):
         """return coordinates at params in pts"""
         pass
@@ -179,6 +186,9 @@ class normline_pt(normsubpathitem):
         """return a tuple of params"""
         return self._arclentoparam_pt(lengths_pt, epsilon)[0]
 
+    def _arclenlines(self, epsilon):
+        return [(0, 1, self)]
+
     def arclen_pt(self,  epsilon, upper=False):
         return math.hypot(self.x0_pt-self.x1_pt, self.y0_pt-self.y1_pt)
 
@@ -501,6 +511,15 @@ class normcurve_pt(normsubpathitem):
         """return a tuple of params"""
         return self._arclentoparam_pt(lengths_pt, epsilon)[0]
 
+    def _arclenlines(self, epsilon):
+        result = []
+        for item, t0 in zip(self._split(epsilon=epsilon), [0, 0.5]):
+            if isinstance(item, normcurve_pt):
+                result.extend([(t0+0.5*t1, t0+0.5*t2, line) for t1, t2, line in item._arclenlines(0.5*epsilon)])
+            else:
+                result.append((t0, t0+0.5, item))
+        return result
+
     def arclen_pt(self, epsilon, upper=False):
         a, b = self._split(epsilon=epsilon)
         return a.arclen_pt(0.5*epsilon, upper=upper) + b.arclen_pt(0.5*epsilon, upper=upper)
@@ -803,9 +822,12 @@ class normsubpath:
     - epsilon might be none, disallowing any numerics, but allowing for
       arbitrary short paths. This is used in pdf output, where all paths need
       to be transformed to normpaths.
+    - Shared normsubpaths, like those stored in the normpath cache of the
+      path module, must not be modified inplace. They have to be copied
+      instead.
     """
 
-    __slots__ = "normsubpathitems", "closed", "epsilon", "skippedline"
+    __slots__ = "normsubpathitems", "closed", "epsilon", "skippedline", "shared"
 
     def __init__(self, normsubpathitems=[], closed=0, epsilon=_marker):
         """construct a normsubpath"""
@@ -817,6 +839,7 @@ class normsubpath:
         # we remember this fact by a line because we have to take it
         # properly into account when appending further normsubpathitems
         self.skippedline = None
+        self.shared = False
 
         self.normsubpathitems = []
         self.closed = 0
@@ -871,8 +894,10 @@ class normsubpath:
     def append(self, anormsubpathitem):
         """append normsubpathitem
 
-        Fails on closed normsubpath.
+        Fails on closed or shared normsubpath.
         """
+        if self.shared:
+            raise NormpathException("Cannot modify shared normsubpath")
         if self.epsilon is None:
             self.normsubpathitems.append(anormsubpathitem)
         else:
@@ -1041,8 +1066,10 @@ class normsubpath:
     def close(self):
         """close subnormpath
 
-        Fails on closed normsubpath.
+        Fails on closed or shared normsubpath.
         """
+        if self.shared:
+            raise NormpathException("Cannot modify shared normsubpath")
         if self.closed:
             raise NormpathException("Cannot close already closed normsubpath")
         if not self.normsubpathitems:
@@ -1094,6 +1121,8 @@ class normsubpath:
 
         remove the skippedline by modifying the end point of the existing normsubpath
         """
+        if self.skippedline and self.shared:
+            raise NormpathException("Cannot modify shared normsubpath")
         while self.skippedline:
             try:
                 lastnormsubpathitem = self.normsubpathitems.pop()
@@ -1572,6 +1601,11 @@ class normpath:
         """return normsubpath i"""
         return self.normsubpaths[i]
 
+    def _unshare(self, i):
+        """replace the normsubpath i by a copy when it is shared (copy on write)"""
+        if self.normsubpaths[i].shared:
+            self.normsubpaths[i] = self.normsubpaths[i].copy()
+
     def __len__(self):
         """return the number of normsubpaths"""
         return len(self.normsubpaths)
@@ -1625,6 +1659,7 @@ class normpath:
             # ... but we are kind and allow for regular path items as well
             # in order to make a normpath to behave more like a regular path
             if self.normsubpaths:
+                self._unshare(-1)
                 context = path.context(*(self.normsubpaths[-1].atend_pt() +
                                          self.normsubpaths[-1].atbegin_pt()))
                 item.updatenormpath(self, context)
@@ -1793,6 +1828,7 @@ class normpath:
             raise NormpathException("cannot join to empty path")
         if not other.normsubpaths:
             raise NormpathException("cannot join empty path")
+        self._unshare(-1)
         self.normsubpaths[-1].join(other.normsubpaths[0])
         self.normsubpaths.extend(other.normsubpaths[1:])
 
@@ -1870,6 +1906,70 @@ class normpath:
         """return rotation at param(s) or arc length(s)"""
         return self._rotation(self._convertparams(params, self.arclentoparam))
 
+    def sample_pt(self, lengths_pt):
+        """return positions, tangents and curvatures at the arc lengths lengths_pt
+
+        Three lists are returned: the positions (x_pt, y_pt), the tangents as
+        unit vectors (tx, ty) and the curvatures in 1/pts. The arc length table
+        of the path is calculated once and shared by all lengths_pt, which
+        is much faster than separate calls of at_pt, rotation_pt and
+        curvature_pt for many lengths. Lengths outside of the path are
+        extrapolated like in arclentoparam_pt.
+        """
+        # arc length table: the begin of the approximating lines in pts and
+        # the lines with their normsubpathitem and param range
+        begins_pt = []
+        lines = []
+        arclen_pt = 0
+        for normsubpath in self.normsubpaths:
+            for normsubpathitem in normsubpath.normsubpathitems:
+                for t0, t1, line in normsubpathitem._arclenlines(normsubpath.epsilon):
+                    linearclen_pt = math.hypot(line.x1_pt-line.x0_pt, line.y1_pt-line.y0_pt)
+                    begins_pt.append(arclen_pt)
+                    lines.append((normsubpathitem, t0, t1, line, linearclen_pt))
+                    arclen_pt += linearclen_pt
+        if not lines:
+            raise NormpathException("cannot sample an empty path")
+
+        positions_pt = []
+        tangents = []
+        curvatures_pt = []
+        for length_pt in lengths_pt:
+            i = max(bisect.bisect_right(begins_pt, length_pt) - 1, 0)
+            normsubpathitem, t0, t1, line, linearclen_pt = lines[i]
+            t = (length_pt - begins_pt[i]) / linearclen_pt if linearclen_pt else 0
+            if isinstance(normsubpathitem, normline_pt):
+                positions_pt.append(normsubpathitem.at_pt([t])[0])
+                tangents.append(((normsubpathitem.x1_pt-normsubpathitem.x0_pt)/linearclen_pt,
+                                 (normsubpathitem.y1_pt-normsubpathitem.y0_pt)/linearclen_pt))
+                curvatures_pt.append(0)
+                continue
+            if 0 <= t <= 1:
+                # non-linear transformation of the line param as in subparamtoparam
+                t = 2*_leftnormline_pt.subparamtoparam(line, t)
+            t = t0 + (t1-t0)*t
+            positions_pt.append((normsubpathitem.x_pt(t), normsubpathitem.y_pt(t)))
+            xdot = normsubpathitem.xdot_pt(t)
+            ydot = normsubpathitem.ydot_pt(t)
+            xddot = normsubpathitem.xddot_pt(t)
+            yddot = normsubpathitem.yddot_pt(t)
+            hypot = math.hypot(xdot, ydot)
+            if hypot:
+                tangents.append((xdot/hypot, ydot/hypot))
+                curvatures_pt.append((xdot*yddot - ydot*xddot) / hypot**3)
+            else:
+                # the tangent follows the higher derivatives at points of
+                # vanishing speed, where the curvature diverges
+                xdddot = normsubpathitem.xdddot_pt(t)
+                ydddot = normsubpathitem.ydddot_pt(t)
+                if not xddot and not yddot:
+                    xddot, yddot = xdddot, ydddot
+                hypot = math.hypot(xddot, yddot)
+                tangents.append((xddot/hypot, yddot/hypot))
+                cross = xddot*ydddot - yddot*xdddot
+                curvatures_pt.append(math.copysign(math.inf, cross) if cross else 0)
+        return positions_pt, tangents, curvatures_pt
+
     def _split_pt(self, params):
         """split path at params and return list of normpaths"""
         if not params:
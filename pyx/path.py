@@ -21,11 +21,12 @@
 # along with PyX; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
 
-import math
+import collections, math
 from math import cos, sin, tan, acos, pi, radians, degrees
 from . import trafo, unit
 from .normpath import NormpathException, normpath, normsubpath, normline_pt, normcurve_pt
 from . import bbox as bboxmodule
+from . import normpath as normpathmodule
 
 # set is available as an external interface to the normpath.set method
 from .normpath import set
@@ -234,6 +235,23 @@ class pathitem:
         """
         raise PathException("path must start with moveto or the like (%r)" % self)
 
+    def cachekey(self):
+        """return a hashable key of the pathitem
+
+        Pathitems with equal keys need to result in equal normpaths, as
+        the key is used to look up normpaths in the normpath cache. Returns
+        None for pathitems, which do not provide a key. Paths containing
+        such pathitems are not cached.
+        """
+        return None
+
+    def cachesize(self):
+        """return the number of path segments of the pathitem
+
+        The size is counted against the limits of the normpath cache.
+        """
+        return 1
+
     def updatebbox(self, bbox, context):
         """updates the bbox to contain the pathitem for the given
         context
@@ -296,6 +314,9 @@ class closepath(pathitem):
 
     __slots__ = ()
 
+    def cachekey(self):
+        return self.__class__,
+
     def __str__(self):
         return "closepath()"
 
@@ -331,6 +352,9 @@ class moveto_pt(pathitem):
         self.x_pt = x_pt
         self.y_pt = y_pt
 
+    def cachekey(self):
+        return self.__class__, self.x_pt, self.y_pt
+
     def __str__(self):
         return "moveto_pt(%g, %g)" % (self.x_pt, self.y_pt)
 
@@ -385,6 +409,9 @@ class lineto_pt(pathitem):
         self.x_pt = x_pt
         self.y_pt = y_pt
 
+    def cachekey(self):
+        return self.__class__, self.x_pt, self.y_pt
+
     def __str__(self):
         return "lineto_pt(%g, %g)" % (self.x_pt, self.y_pt)
 
@@ -424,6 +451,9 @@ class curveto_pt(pathitem):
         self.x3_pt = x3_pt
         self.y3_pt = y3_pt
 
+    def cachekey(self):
+        return self.__class__, self.x1_pt, self.y1_pt, self.x2_pt, self.y2_pt, self.x3_pt, self.y3_pt
+
     def __str__(self):
         return "curveto_pt(%g, %g, %g, %g, %g, %g)" % (self.x1_pt, self.y1_pt,
                                                        self.x2_pt, self.y2_pt,
@@ -468,6 +498,9 @@ class rmoveto_pt(pathitem):
          self.dx_pt = dx_pt
          self.dy_pt = dy_pt
 
+    def cachekey(self):
+        return self.__class__, self.dx_pt, self.dy_pt
+
     def __str__(self):
         return "rmoveto_pt(%g, %g)" % (self.dx_pt, self.dy_pt)
 
@@ -513,6 +546,9 @@ class rlineto_pt(pathitem):
         self.dx_pt = dx_pt
         self.dy_pt = dy_pt
 
+    def cachekey(self):
+        return self.__class__, self.dx_pt, self.dy_pt
+
     def __str__(self):
         return "rlineto_pt(%g %g)" % (self.dx_pt, self.dy_pt)
 
@@ -552,6 +588,9 @@ class rcurveto_pt(pathitem):
         self.dx3_pt = dx3_pt
         self.dy3_pt = dy3_pt
 
+    def cachekey(self):
+        return self.__class__, self.dx1_pt, self.dy1_pt, self.dx2_pt, self.dy2_pt, self.dx3_pt, self.dy3_pt
+
     def __str__(self):
         return "rcurveto_pt(%g, %g, %g, %g, %g, %g)" % (self.dx1_pt, self.dy1_pt,
                                                         self.dx2_pt, self.dy2_pt,
@@ -607,6 +646,9 @@ class arc_pt(pathitem):
         self.angle1 = angle1
         self.angle2 = angle2
 
+    def cachekey(self):
+        return self.__class__, self.x_pt, self.y_pt, self.r_pt, self.angle1, self.angle2
+
     def __str__(self):
         return "arc_pt(%g, %g, %g, %g, %g)" % (self.x_pt, self.y_pt, self.r_pt,
                                                self.angle1, self.angle2)
@@ -701,6 +743,9 @@ class arcn_pt(pathitem):
         self.angle1 = angle1
         self.angle2 = angle2
 
+    def cachekey(self):
+        return self.__class__, self.x_pt, self.y_pt, self.r_pt, self.angle1, self.angle2
+
     def __str__(self):
         return "arcn_pt(%g, %g, %g, %g, %g)" % (self.x_pt, self.y_pt, self.r_pt,
                                                 self.angle1, self.angle2)
@@ -796,6 +841,9 @@ class arct_pt(pathitem):
         self.y2_pt = y2_pt
         self.r_pt = r_pt
 
+    def cachekey(self):
+        return self.__class__, self.x1_pt, self.y1_pt, self.x2_pt, self.y2_pt, self.r_pt
+
     def __str__(self):
         return "arct_pt(%g, %g, %g, %g, %g)" % (self.x1_pt, self.y1_pt,
                                                 self.x2_pt, self.y2_pt,
@@ -992,6 +1040,12 @@ class multilineto_pt(pathitem):
     def __init__(self, points_pt):
         self.points_pt = points_pt
 
+    def cachekey(self):
+        return self.__class__, tuple(self.points_pt)
+
+    def cachesize(self):
+        return len(self.points_pt)
+
     def __str__(self):
         result = []
         for point_pt in self.points_pt:
@@ -1032,6 +1086,12 @@ class multicurveto_pt(pathitem):
     def __init__(self, points_pt):
         self.points_pt = points_pt
 
+    def cachekey(self):
+        return self.__class__, tuple(self.points_pt)
+
+    def cachesize(self):
+        return len(self.points_pt)
+
     def __str__(self):
         result = []
         for point_pt in self.points_pt:
@@ -1066,6 +1126,37 @@ class multicurveto_pt(pathitem):
         return "".join("C%g %g %g %g %g %g" % point_pt for point_pt in self.points_pt)
 
 
+################################################################################
+# normpath cache
+################################################################################
+
+# The normpaths of paths are cached by the cachekeys of the pathitems and
+# epsilon. The cache stores the normsubpaths, which become shared, i.e. they
+# are not modified inplace anymore.
+
+# The size of the cache is measured by the number of path segments as returned
+# by the cachesize method of the pathitems, i.e. a multilineto_pt counts each
+# of its points.
+
+#: maximal total number of path segments of the paths kept in the normpath cache
+normpathcachesize = 100000
+#: maximal number of path segments of a path to be cached
+normpathcachepathsize = 1000
+_normpathcache = collections.OrderedDict()
+_normpathcacheitems = 0
+
+def _cachenormpath(key, size, np):
+    """add the normsubpaths of np having size path segments to the normpath cache at key"""
+    global _normpathcacheitems
+    for anormsubpath in np.normsubpaths:
+        anormsubpath.shared = True
+    _normpathcache[key] = size, tuple(np.normsubpaths)
+    _normpathcacheitems += size
+    while _normpathcacheitems > normpathcachesize:
+        oldkey, (oldsize, oldnormsubpaths) = _normpathcache.popitem(last=False)
+        _normpathcacheitems -= oldsize
+
+
 ################################################################################
 # path: PS style path
 ################################################################################
@@ -1214,10 +1305,49 @@ class path:
     __lshift__ = joined
 
     def normpath(self, epsilon=_marker):
-        """convert the path into a normpath"""
+        """convert the path into a normpath
+
+        The conversion is looked up in the normpath cache by the content of
+        the path and epsilon. The normsubpaths of a cached normpath are
+        shared and must not be modified inplace. The normpath methods
+        copy them on write.
+        """
         # use cached value if existent and epsilon is _marker
         if self._normpath is not None and epsilon is _marker:
             return self._normpath
+        np = key = None
+        size = 0
+        for pathitem in self.pathitems:
+            size += pathitem.cachesize()
+            if size > normpathcachepathsize:
+                break
+        else:
+            pathitemkeys = [pathitem.cachekey() for pathitem in self.pathitems]
+            if None not in pathitemkeys:
+                if epsilon is _marker:
+                    key = (normpathmodule._epsilon,) + tuple(pathitemkeys)
+                else:
+                    key = (epsilon,) + tuple(pathitemkeys)
+                try:
+                    size, normsubpaths = _normpathcache[key]
+                except KeyError:
+                    pass
+                except TypeError:
+                    # unhashable pathitem content
+                    key = None
+                else:
+                    _normpathcache.move_to_end(key)
+                    np = normpath(list(normsubpaths))
+        if np is None:
+            np = self._createnormpath(epsilon)
+            if key is not None:
+                _cachenormpath(key, size, np)
+        if epsilon is _marker:
+            self._normpath = np
+        return np
+
+    def _createnormpath(self, epsilon):
+        """convert the path into a normpath bypassing the normpath cache"""
         if self.pathitems:
             if epsilon is _marker:
                 np = self.pathitems[0].createnormpath()
@@ -1228,8 +1358,6 @@ class path:
                 pathitem.updatenormpath(np, context)
         else:
             np = normpath()
-        if epsilon is _marker:
-            self._normpath = np
         return np
 
     def paramtoarclen_pt(self, params):
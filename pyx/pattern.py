@@ -20,7 +20,7 @@
 # along with PyX; if not, write to the Free Software
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
 
-import io, logging, math
+import hashlib, io, logging, math, weakref
 from . import attr, canvas, path, pdfwriter, pswriter, svgwriter, style, unit, trafo
 from . import writer as writermodule
 from . import bbox as bboxmodule
@@ -38,7 +38,7 @@ class pattern(canvas.canvas, attr.exclusiveattr, style.fillstyle):
         kwargs['attrs'] = attr.mergeattrs([style.linewidth.normal] + kwargs.get('attrs', []))
         canvas.canvas.__init__(self, **kwargs)
         attr.exclusiveattr.__init__(self, pattern)
-        self.id = "pattern%d" % id(self)
+        self._renderwriter = None
         self.patterntype = 1
         if painttype not in (1, 2):
             raise ValueError("painttype must be 1 or 2")
@@ -70,13 +70,8 @@ class pattern(canvas.canvas, attr.exclusiveattr, style.fillstyle):
             bboxenlarge = self.bboxenlarge
         return pattern(painttype, tilingtype, xstep, ystep, bbox, trafo, bboxenlarge)
 
-    def processPS(self, file, writer, context, registry):
-        # process pattern, letting it register its resources and calculate the bbox of the pattern
-        patternfile = writermodule.writer(io.BytesIO())
-        realpatternbbox = bboxmodule.empty()
-        canvas.canvas.processPS(self, patternfile, writer, pswriter.context(), registry, realpatternbbox)
-        patternproc = patternfile.file.getvalue()
-
+    def _tiling(self, realpatternbbox):
+        # returns xstep, ystep (in pts) and the bbox of the pattern
         if self.xstep is None:
             xstep = unit.topt(realpatternbbox.width())
         else:
@@ -95,7 +90,26 @@ class pattern(canvas.canvas, attr.exclusiveattr, style.fillstyle):
             patternbbox = realpatternbbox
             if self.bboxenlarge:
                 patternbbox.enlarge(self.bboxenlarge)
+        return xstep, ystep, patternbbox
+
+    def _rendered(self, writer, render):
+        # The pattern is rendered once per writer, i.e. per output file, as
+        # the pattern canvas might be modified between outputs. The writer
+        # also fixes the output format.
+        if self._renderwriter is None or self._renderwriter() is not writer:
+            self._rendering = render(writer)
+            self._renderwriter = weakref.ref(writer)
+        return self._rendering
+
+    def _renderPS(self, writer):
+        # process pattern, letting it register its resources and calculate the bbox of the pattern
+        patternregistry = pswriter.PSregistry()
+        patternfile = writermodule.writer(io.BytesIO())
+        realpatternbbox = bboxmodule.empty()
+        canvas.canvas.processPS(self, patternfile, writer, pswriter.context(), patternregistry, realpatternbbox)
+        patternproc = patternfile.file.getvalue()
 
+        xstep, ystep, patternbbox = self._tiling(realpatternbbox)
         patternprefix = "\n".join(("<<",
                                    "/PatternType %d" % self.patterntype,
                                    "/PaintType %d" % self.painttype,
@@ -106,15 +120,22 @@ class pattern(canvas.canvas, attr.exclusiveattr, style.fillstyle):
                                    "/PaintProc {\nbegin\n"))
         patterntrafostring = self.patterntrafo is None and "matrix" or str(self.patterntrafo)
         patternsuffix = "end\n} bind\n>>\n%s\nmakepattern" % patterntrafostring
+        body = patternprefix.encode("ascii") + patternproc + patternsuffix.encode("ascii")
+
+        # the id is given by the content, i.e. equal patterns share a single definition
+        return "pattern%s" % hashlib.md5(body).hexdigest(), body, patternregistry
 
-        registry.add(pswriter.PSdefinition(self.id, patternprefix.encode("ascii") + patternproc + patternsuffix.encode("ascii")))
+    def processPS(self, file, writer, context, registry):
+        id, body, patternregistry = self._rendered(writer, self._renderPS)
+        registry.mergeregistry(patternregistry)
+        registry.add(pswriter.PSdefinition(id, body))
 
         # activate pattern
-        file.write("%s setpattern\n" % self.id)
+        file.write("%s setpattern\n" % id)
 
-    def processPDF(self, file, writer, context, registry):
+    def _renderPDF(self, writer):
         # we need to keep track of the resources used by the pattern, hence
-        # we create our own registry, which we merge immediately in the main registry
+        # we create our own registry, which we merge in the main registry
         patternregistry = pdfwriter.PDFregistry()
 
         patternfile = writermodule.writer(io.BytesIO())
@@ -122,29 +143,19 @@ class pattern(canvas.canvas, attr.exclusiveattr, style.fillstyle):
         canvas.canvas.processPDF(self, patternfile, writer, pdfwriter.context(), patternregistry, realpatternbbox)
         patternproc = patternfile.file.getvalue()
 
-        registry.mergeregistry(patternregistry)
-
-        if self.xstep is None:
-           xstep = unit.topt(realpatternbbox.width())
-        else:
-           xstep = unit.topt(self.xstep)
-        if self.ystep is None:
-            ystep = unit.topt(realpatternbbox.height())
-        else:
-           ystep = unit.topt(self.ystep)
-        if not xstep:
-            raise ValueError("xstep in pattern cannot be zero")
-        if not ystep:
-            raise ValueError("ystep in pattern cannot be zero")
-        if self.patternbbox:
-            patternbbox = self.patternbbox
-        else:
-            patternbbox = realpatternbbox
-            if self.bboxenlarge:
-                patternbbox.enlarge(self.bboxenlarge)
+        xstep, ystep, patternbbox = self._tiling(realpatternbbox)
         patterntrafo = self.patterntrafo or trafo.trafo()
 
-        registry.add(PDFpattern(self.id, self.patterntype, self.painttype, self.tilingtype,
+        # the id is given by the content, i.e. equal patterns share a single object
+        header = "%d %d %d [%d %d %d %d] %f %f %s\n" % ((self.patterntype, self.painttype, self.tilingtype) +
+                                                      patternbbox.lowrestuple_pt() + (xstep, ystep, patterntrafo))
+        id = "pattern%s" % hashlib.md5(header.encode("ascii") + patternproc).hexdigest()
+        return id, patternbbox, xstep, ystep, patterntrafo, patternproc, patternregistry
+
+    def processPDF(self, file, writer, context, registry):
+        id, patternbbox, xstep, ystep, patterntrafo, patternproc, patternregistry = self._rendered(writer, self._renderPDF)
+        registry.mergeregistry(patternregistry)
+        registry.add(PDFpattern(id, self.patterntype, self.painttype, self.tilingtype,
                                 patternbbox, xstep, ystep, patterntrafo, patternproc, writer, registry, patternregistry))
 
         # activate pattern
@@ -157,7 +168,7 @@ class pattern(canvas.canvas, attr.exclusiveattr, style.fillstyle):
             # we just don't do this...
             logger.warning("ignoring stroke color for patterns in PDF")
         if context.fillattr:
-            file.write("/%s scn\n"% self.id)
+            file.write("/%s scn\n"% id)
 
     def processSVGattrs(self, attrs, writer, context, registry):
         assert self.patterntype == 1
@@ -29,7 +29,7 @@ try:
 except:
     haszlib = False
 
-from . import bbox, config, style, unit, version, trafo, writer
+from . import bbox, config, style, timing, unit, version, trafo, writer
 
 
 
@@ -268,15 +268,19 @@ class PDFcontent(PDFobject):
 
     def __init__(self, page, awriter, registry):
         PDFobject.__init__(self, registry, "content")
-        contentfile = writer.writer(io.BytesIO())
-        self.bbox = bbox.empty()
-        acontext = context()
-        page.processPDF(contentfile, awriter, acontext, registry, self.bbox)
-        self.content = contentfile.file.getvalue()
+        with timing.measure("page") as measure:
+            contentfile = writer.writer(io.BytesIO())
+            self.bbox = bbox.empty()
+            acontext = context()
+            page.processPDF(contentfile, awriter, acontext, registry, self.bbox)
+            self.content = contentfile.file.getvalue()
+            measure.bytes = len(self.content)
 
     def write(self, file, awriter, registry):
         if awriter.compress:
-            content = zlib.compress(self.content)
+            with timing.measure("compress") as measure:
+                content = zlib.compress(self.content)
+                measure.bytes = len(content)
         else:
             content = self.content
         file.write("<<\n"
@@ -336,8 +340,10 @@ class PDFwriter:
         registry.add(catalog)
 
         file = writer.writer(file)
-        file.write_bytes(b"%PDF-1.4\n%\xc3\xb6\xc3\xa9\n")
-        registry.write(file, self, catalog)
+        with timing.measure("output") as measure:
+            file.write_bytes(b"%PDF-1.4\n%\xc3\xb6\xc3\xa9\n")
+            registry.write(file, self, catalog)
+            measure.bytes = file.tell()
 
     def getfontmap(self):
         if self._fontmap is None:
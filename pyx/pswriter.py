@@ -21,7 +21,7 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
 
 import io, copy, time, math, os
-from . import bbox, config, style, version, unit, trafo, writer
+from . import bbox, config, style, timing, version, unit, trafo, writer
 
 
 class PSregistry:
@@ -43,7 +43,7 @@ class PSregistry:
            self.resourceslist.append(resource)
 
     def mergeregistry(self, registry):
-        for resource in registry.resources:
+        for resource in registry.resourceslist:
             self.add(resource)
 
     def output(self, file, writer):
@@ -156,7 +156,9 @@ class EPSwriter(_PSwriter):
         acontext = context()
         pagebbox = bbox.empty()
 
-        page.processPS(pagefile, self, acontext, registry, pagebbox)
+        with timing.measure("page") as measure:
+            page.processPS(pagefile, self, acontext, registry, pagebbox)
+            measure.bytes = pagefile.tell()
 
         file.write("%!PS-Adobe-3.0 EPSF-3.0\n")
         if pagebbox:
@@ -166,7 +168,8 @@ class EPSwriter(_PSwriter):
         file.write("%%EndComments\n")
 
         file.write("%%BeginProlog\n")
-        registry.output(file, self)
+        with timing.measure("prolog"):
+            registry.output(file, self)
         file.write("%%EndProlog\n")
 
         file.write_bytes(pagefile.file.getvalue())
@@ -196,7 +199,9 @@ class PSwriter(_PSwriter):
             pagefile = writer.writer(io.BytesIO())
             acontext = context()
             pagebbox = bbox.empty()
-            page.processPS(pagefile, self, acontext, registry, pagebbox)
+            with timing.measure("page") as measure:
+                page.processPS(pagefile, self, acontext, registry, pagebbox)
+                measure.bytes = pagefile.tell()
 
             documentbbox += pagebbox
 
@@ -252,7 +257,8 @@ class PSwriter(_PSwriter):
 
         # document prolog section
         file.write("%%BeginProlog\n")
-        registry.output(file, self)
+        with timing.measure("prolog"):
+            registry.output(file, self)
         file.write("%%EndProlog\n")
 
         # document setup section
@@ -39,16 +39,10 @@ class reader:
         return self.file.read(bytes)
 
     def readint(self, bytes=4, signed=0):
-        first = 1
-        result = 0
-        while bytes:
-            value = ord(self.file.read(1))
-            if first and signed and value > 127:
-                value -= 256
-            first = 0
-            result = 256 * result + value
-            bytes -= 1
-        return result
+        data = self.file.read(bytes)
+        if len(data) != bytes:
+            raise struct.error("unexpected end of file")
+        return int.from_bytes(data, "big", signed=signed)
 
     def readint32(self):
         return struct.unpack(">l", self.file.read(4))[0]
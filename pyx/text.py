@@ -19,10 +19,10 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
 
 
-import atexit, errno, functools, glob, inspect, io, itertools, logging, os
+import atexit, collections, copy, errno, functools, glob, inspect, io, itertools, logging, os
 import queue, re, shutil, sys, tempfile, textwrap, threading
 
-from pyx import config, unit, box, baseclasses, trafo, version, attr, style, path, canvas
+from pyx import config, unit, box, baseclasses, trafo, version, attr, style, path, canvas, timing
 from pyx import bbox as bboxmodule
 from pyx.dvi import dvifile
 
@@ -845,6 +845,9 @@ class textextbox_pt(textbox_pt):
                                    abscenter_pt = (left_pt*unit.scale["x"], depth_pt*unit.scale["x"]))
 
         self._dvicanvas = None
+        self._dvifile = None
+        self._dvipage = None
+        self._original = None
 
     def transform(self, *trafos, keep_anchor=False):
         box.rect.transform(self, *trafos, keep_anchor=keep_anchor)
@@ -858,10 +861,54 @@ class textextbox_pt(textbox_pt):
         self._dvicanvas = dvifile.readpage([ord("P"), ord("y"), ord("X"), page, 0, 0, 0, 0, 0, 0],
                                            fontmap=self.fontmap, singlecharmode=self.singlecharmode, attrs=[self.texttrafo] + self.fillstyles)
 
+    def setdvipage(self, dvifile, page):
+        """Defer :meth:`readdvipage` until the dvi canvas is accessed.
+
+        The dvifile must provide random access to its pages, i.e. its page
+        index must have been read by :meth:`dvifile.DVIfile.readpageindex`.
+        """
+        self._dvifile = dvifile
+        self._dvipage = page
+
+    def _clone(self):
+        """Return a copy of the textbox sharing its dvi output.
+
+        The dvi output of the copy is taken from this textbox when needed,
+        thus the copy can be transformed independently.
+        """
+        result = copy.copy(self)
+        if self._dvicanvas is not None:
+            result._dvicanvas = copy.copy(self._dvicanvas)
+        else:
+            result._dvifile = None
+            result._original = self
+        return result
+
+    @property
+    def dviready(self):
+        """Whether the dvi canvas can be accessed without finishing the TeX engine.
+
+        This is the case in :ref:`texipc` mode and after the engine has been
+        finished.
+        """
+        if self._original is not None:
+            return self._original.dviready
+        return self._dvicanvas is not None or self._dvifile is not None
+
     @property
     def dvicanvas(self):
+        if self._dvicanvas is None and self._original is not None:
+            # the trafo of a dvicanvas is kept equal to the texttrafo
+            self._dvicanvas = copy.copy(self._original.dvicanvas)
+            self._dvicanvas.trafo = self.texttrafo
+            self._original = None
         if self._dvicanvas is None:
-            self.do_finish()
+            if self._dvifile is None:
+                self.do_finish()
+            if self._dvifile is not None:
+                self._dvifile.seekpage([ord("P"), ord("y"), ord("X"), self._dvipage, 0, 0, 0, 0, 0, 0])
+                self.readdvipage(self._dvifile, self._dvipage)
+                self._dvifile = None
         return self._dvicanvas
 
     def marker(self, name):
@@ -1056,8 +1103,11 @@ class SingleEngine:
                             except EnvironmentError:
                                 logger.warning("Failed to remove spurious file '{}'.".format(usefile))
         finally:
+            if self.dvifile is not None:
+                self.dvifile.close()
             shutil.rmtree(self.tmpdir, ignore_errors=True)
 
+    @timing.timed("tex")
     def _execute(self, expr, texmessages, oldstate, newstate):
         """Execute TeX expression.
 
@@ -1240,12 +1290,28 @@ class SingleEngine:
         if self.needdvitextboxes:
             dvifilename = os.path.join(self.tmpdir, "texput.dvi")
             self.dvifile = dvifile.DVIfile(dvifilename, debug=self.dvitype)
-            page = 1
-            for box in self.needdvitextboxes:
-                box.readdvipage(self.dvifile, page)
-                page += 1
-        if self.dvifile is not None and self.dvifile.readpage(None) is not None:
-            raise ValueError("end of dvifile expected but further pages follow")
+            if self.dvitype:
+                # read the pages sequentially to keep the debug output in order
+                page = 1
+                for box in self.needdvitextboxes:
+                    box.readdvipage(self.dvifile, page)
+                    page += 1
+            else:
+                # the pages are read on demand, when the textboxes are output
+                self.dvifile.readpageindex()
+                if len(self.dvifile.pageindex) != len(self.needdvitextboxes):
+                    raise ValueError("dvifile contains %d pages, but %d were expected" % (len(self.dvifile.pageindex), len(self.needdvitextboxes)))
+                page = 1
+                for box in self.needdvitextboxes:
+                    box.setdvipage(self.dvifile, page)
+                    page += 1
+                self.dvifile = None
+        if self.dvifile is not None:
+            try:
+                if self.dvifile.readpage(None) is not None:
+                    raise ValueError("end of dvifile expected but further pages follow")
+            finally:
+                self.dvifile.close()
         if cleanup:
             atexit.unregister(self._cleanup)
             self._cleanup()
@@ -1303,7 +1369,7 @@ class SingleEngine:
         first = self.state < STATE_TYPESET
         left_pt, right_pt, height_pt, depth_pt = self.do_typeset(expr, self.texmessages_run_default + self.texmessages_run + texmessages)
         if self.texipc and first:
-            self.dvifile = dvifile.DVIfile(os.path.join(self.tmpdir, "texput.dvi"), debug=self.dvitype)
+            self.dvifile = dvifile.DVIfile(os.path.join(self.tmpdir, "texput.dvi"), debug=self.dvitype, growing=True)
         box = textextbox_pt(x_pt, y_pt, left_pt, right_pt, height_pt, depth_pt, self.do_finish, fontmap, singlecharmode, fillstyles)
         for t in trafos:
             box.reltransform(t) # TODO: should trafos really use reltransform???
@@ -1489,6 +1555,17 @@ class MultiEngine:
         "resembles :meth:`SingleEngine.text`"
         return self.instance.text(*args, **kwargs)
 
+    def cachekey(self):
+        """Return a key describing the output of the engine
+
+        The key consists of the engine class, its arguments and the preambles
+        executed so far. It is used by :func:`cachedtext_pt` to share typeset
+        texts between engines of the same setup, while a change of the
+        preamble invalidates the cached texts.
+
+        """
+        return self.cls, repr(self.args), repr(sorted(self.kwargs.items())), tuple(expr for expr, texmessages in self.preambles)
+
     def reset(self, reinit=False):
         """Start a new :class:`SingleEngine` instance
 
@@ -1531,6 +1608,53 @@ class LatexEngine(MultiEngine):
         super().__init__(SingleLatexEngine, *args, **kwargs)
 
 
+#: maximal number of typeset texts kept by :func:`cachedtext_pt`
+textcachesize = 1000
+_textcache = collections.OrderedDict()
+
+def cachedtext_pt(textengine, x_pt, y_pt, expr, textattrs=[]):
+    """Typeset text reusing the output of earlier calls.
+
+    :param textengine: the engine to typeset the text
+    :param float x_pt: x position in pts
+    :param float y_pt: y position in pts
+    :param expr: text to be typeset
+    :type expr: str or :class:`MultiEngineText`
+    :param textattrs: styles and attributes to be applied to the text
+    :returns: text output insertable into a canvas.
+
+    The typeset texts are kept in a cache shared by all engines providing a
+    ``cachekey`` method (see :meth:`MultiEngine.cachekey`). It is keyed by the
+    text, its text attributes and the key of the engine. A cached text is
+    returned as a copy moved to the requested position and transformed by
+    the trafos in textattrs. Texts with fill styles and texts for other
+    engines are typeset by ``textengine.text_pt`` directly.
+
+    """
+    textattrs = attr.mergeattrs(textattrs)
+    if not hasattr(textengine, "cachekey") or attr.getattrs(textattrs, [style.fillstyle]):
+        return textengine.text_pt(x_pt, y_pt, expr, textattrs)
+    trafos = attr.getattrs(textattrs, [trafo.trafo_pt])
+    textattrs = attr.getattrs(textattrs, [textattr])
+    texexpr = expr.tex if isinstance(expr, MultiEngineText) else expr
+    for ta in textattrs[::-1]:
+        texexpr = ta.apply(texexpr)
+    key = textengine.cachekey(), texexpr, unit.scale["x"]
+    try:
+        original = _textcache[key]
+    except KeyError:
+        original = _textcache[key] = textengine.text_pt(0, 0, expr, textattrs)
+        while len(_textcache) > textcachesize:
+            _textcache.popitem(last=False)
+    else:
+        _textcache.move_to_end(key)
+    result = original._clone()
+    result.transform(trafo.translate_pt(x_pt, y_pt))
+    for t in trafos:
+        result.reltransform(t)
+    return result
+
+
 from pyx import deco
 from pyx.font import T1font
 from pyx.font.t1file import T1File
@@ -0,0 +1,180 @@
+# -*- encoding: utf-8 -*-
+#
+#
+# Copyright (C) 2019 Jörg Lehmann <joerg@pyx-project.org>
+# Copyright (C) 2019 André Wobst <wobsta@pyx-project.org>
+#
+# This file is part of PyX (https://pyx-project.org/).
+#
+# PyX is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# PyX is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PyX; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA
+
+"""The timing module records where the time of the output generation is spent
+
+Timing is disabled unless a report instance is active::
+
+    r = timing.report()
+    c.writePDFfile("example", write_timing=r)
+    print(r)
+
+or::
+
+    with timing.report() as r:
+        c.writePDFfile("example")
+
+While the report is active, the time, the number of calls and the number of
+bytes written are recorded in a tree of nested phases (TeX runs, DVI parsing,
+graph finishing, processing of canvasitems by their class, font stripping,
+compression etc.). When no report is active, the instrumented code only
+checks the module variable active.
+"""
+
+import functools, time
+
+
+#: innermost phase being timed or None when timing is disabled
+active = None
+
+
+class phase:
+
+    """time, number of calls and number of bytes of a phase and its subphases"""
+
+    def __init__(self, name, parent=None):
+        self.name = name
+        self.parent = parent
+        self.time = 0
+        self.calls = 0
+        self.bytes = 0
+        self.phases = {}
+        self._started = None
+
+    def __getitem__(self, name):
+        return self.phases[name]
+
+    def __contains__(self, name):
+        return name in self.phases
+
+    def __iter__(self):
+        return iter(self.phases.values())
+
+    def walk(self, depth=0):
+        """iterate over (depth, phase) for the phase and all its subphases"""
+        yield depth, self
+        for subphase in self:
+            yield from subphase.walk(depth+1)
+
+    def __str__(self):
+        lines = ["%-40s %10s %8s %10s" % ("phase", "time [s]", "calls", "bytes")]
+        for depth, aphase in self.walk():
+            lines.append("%-40s %10.4f %8d %10s" % ("  "*depth + aphase.name, aphase.time, aphase.calls, aphase.bytes or ""))
+        return "\n".join(lines)
+
+
+def start(name):
+    """start the subphase name of the active phase and return it
+
+    Must only be called when timing is enabled, i.e. active is not None.
+    """
+    global active
+    try:
+        aphase = active.phases[name]
+    except KeyError:
+        aphase = active.phases[name] = phase(name, active)
+    aphase.calls += 1
+    active = aphase
+    aphase._started = time.perf_counter()
+    return aphase
+
+
+def stop(aphase, bytes=0):
+    """stop aphase (as returned by start) adding the number of bytes written"""
+    global active
+    aphase.time += time.perf_counter() - aphase._started
+    aphase.bytes += bytes
+    active = aphase.parent
+
+
+class measure:
+
+    """context manager timing the phase name when timing is enabled"""
+
+    def __init__(self, name):
+        self.name = name
+        self.phase = None
+        self.bytes = 0
+
+    def __enter__(self):
+        if active is not None:
+            self.phase = start(self.name)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.phase is not None:
+            stop(self.phase, self.bytes)
+            self.phase = None
+
+
+def timed(name):
+    """decorator timing the calls of a function as phase name when timing is enabled"""
+    def decorator(function):
+        @functools.wraps(function)
+        def timedfunction(*args, **kwargs):
+            if active is None:
+                return function(*args, **kwargs)
+            aphase = start(name)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                stop(aphase)
+        return timedfunction
+    return decorator
+
+
+def process(method, file, *args):
+    """call the process method of a canvasitem writing to file
+
+    The call is timed as a phase named by the class of the canvasitem. The
+    number of bytes written to file is recorded as well. Must only be called
+    when timing is enabled.
+    """
+    aphase = start(method.__self__.__class__.__name__)
+    pos = file.tell()
+    try:
+        method(file, *args)
+    finally:
+        stop(aphase, file.tell() - pos)
+
+
+class report(phase):
+
+    """root phase, which enables timing while used as a context manager"""
+
+    def __init__(self, name="report"):
+        phase.__init__(self, name)
+
+    def __enter__(self):
+        global active
+        if self._started is not None:
+            raise RuntimeError("timing report is already active")
+        self.parent = active
+        self.calls += 1
+        active = self
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        stop(self)
+        self.parent = None
+        self._started = None
@@ -0,0 +1,264 @@
+#!/usr/bin/env python
+"""benchmark suite for the rendering pipeline
+
+Each workload is run in a separate process. The wall time, the peak resident
+set size and the size of the output are recorded and compared to a baseline
+stored by a previous run with --save. Workloads requiring TeX are skipped
+when TeX is not available.
+
+usage: benchmark.py [--quick] [--save] [--tolerance=0.2] [workload ...]
+"""
+
+import sys
+if sys.path[0] != "../..":
+    sys.path.insert(0, "../..")
+
+import json, math, os, random, shutil, subprocess, time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+outputdir = "output"
+
+workloads = {}
+
+def workload(function):
+    workloads[function.__name__] = function
+    return function
+
+
+def _scale(n):
+    # the number of points, reduced by the --quick option
+    if "--quick" in sys.argv:
+        return max(n // 100, 10)
+    return n
+
+def _output(name):
+    return os.path.join(outputdir, name)
+
+def _graph(**kwargs):
+    # a graph without axis labels (i.e. not requiring TeX)
+    from pyx import graph
+    return graph.graphxy(width=12, x=graph.axis.lin(painter=None), y=graph.axis.lin(painter=None), **kwargs)
+
+def _randomwalk(n):
+    random.seed(4711)
+    y = 0
+    ys = []
+    for i in range(n):
+        y += random.uniform(-1, 1)
+        ys.append(y)
+    return list(range(n)), ys
+
+
+@workload
+def line():
+    from pyx import graph
+    xs, ys = _randomwalk(_scale(10**6))
+    g = _graph()
+    g.plot(graph.data.values(x=xs, y=ys), [graph.style.line()])
+    g.writePDFfile(_output("line"))
+    return [_output("line.pdf")]
+
+@workload
+def scatter():
+    from pyx import graph
+    random.seed(4711)
+    n = _scale(10**6)
+    g = _graph()
+    g.plot(graph.data.values(x=[random.gauss(0, 1) for i in range(n)],
+                             y=[random.gauss(0, 1) for i in range(n)]),
+           [graph.style.symbol(size=0.02)])
+    g.writePDFfile(_output("scatter"))
+    return [_output("scatter.pdf")]
+
+def _grid(n):
+    xs, ys, zs = [], [], []
+    for i in range(n):
+        for j in range(n):
+            x = 4*i/(n-1) - 2
+            y = 4*j/(n-1) - 2
+            xs.append(x)
+            ys.append(y)
+            zs.append(math.exp(-x*x-y*y) * math.cos(3*x))
+    return xs, ys, zs
+
+@workload
+def density():
+    from pyx import graph
+    xs, ys, zs = _grid(int(math.sqrt(_scale(250000))))
+    g = _graph()
+    g.plot(graph.data.values(x=xs, y=ys, color=zs),
+           [graph.style.density(keygraph=None, coloraxis=graph.axis.lin(painter=None))])
+    g.writePDFfile(_output("density"))
+    return [_output("density.pdf")]
+
+@workload
+def surface():
+    from pyx import graph
+    xs, ys, zs = _grid(int(math.sqrt(_scale(10000))))
+    g = graph.graphxyz(size=5, x=graph.axis.lin(painter=None), y=graph.axis.lin(painter=None), z=graph.axis.lin(painter=None))
+    g.plot(graph.data.values(x=xs, y=ys, z=zs, color=zs),
+           [graph.style.surface(keygraph=None, coloraxis=graph.axis.lin(painter=None))])
+    g.writePDFfile(_output("surface"))
+    return [_output("surface.pdf")]
+
+def _wigglepath(n):
+    from pyx import path
+    random.seed(4711)
+    items = [path.moveto(0, 0)]
+    for i in range(n):
+        items.append(path.curveto(i+0.3, random.uniform(-1, 1), i+0.7, random.uniform(-1, 1), i+1, random.uniform(-1, 1)))
+    return path.path(*items)
+
+@workload
+def intersect():
+    from pyx import canvas, path, trafo
+    n = _scale(2000) // 10 or 1
+    p1 = _wigglepath(n).normpath()
+    p2 = _wigglepath(n).transformed(trafo.translate(0, 0.3)).normpath()
+    params1, params2 = p1.intersect(p2)
+    c = canvas.canvas()
+    c.stroke(p1)
+    c.stroke(p2)
+    for param in params1:
+        x, y = p1.at(param)
+        c.fill(path.circle(x, y, 0.05))
+    c.writePDFfile(_output("intersect"))
+    return [_output("intersect.pdf")]
+
+def _polyline(n):
+    from pyx import path
+    xs, ys = _randomwalk(n)
+    return path.path(path.moveto(0, 0), *[path.lineto(x/10, y/10) for x, y in zip(xs, ys)])
+
+@workload
+def parallel():
+    from pyx import canvas, deformer
+    p = _polyline(_scale(10**4))
+    c = canvas.canvas()
+    c.stroke(p)
+    c.stroke(p, [deformer.parallel(0.2)])
+    c.stroke(p, [deformer.parallel(-0.2)])
+    c.writePDFfile(_output("parallel"))
+    return [_output("parallel.pdf")]
+
+@workload
+def bitmap():
+    from pyx import bitmap, canvas
+    n = int(math.sqrt(_scale(10**6)))
+    random.seed(4711)
+    data = bytes(random.getrandbits(8) if i % 7 else i % 256 for i in range(3*n*n))
+    image = bitmap.image(n, n, "RGB", data)
+    c = canvas.canvas()
+    c.insert(bitmap.bitmap(0, 0, image, width=10))
+    c.writePDFfile(_output("bitmap"))
+    c.writeEPSfile(_output("bitmap"))
+    return [_output("bitmap.pdf"), _output("bitmap.eps")]
+
+@workload
+def pages():
+    from pyx import canvas, color, document, path
+    pages = []
+    for i in range(_scale(10000) // 100 or 1):
+        c = canvas.canvas()
+        p = _wigglepath(20)
+        for j in range(10):
+            c.stroke(p, [color.hsb(j/10, 1, 1)])
+            c.fill(path.circle(j, 5, 0.3), [color.rgb.blue])
+        pages.append(document.page(c, paperformat=document.paperformat.A4, fittosize=1))
+    d = document.document(pages)
+    d.writePDFfile(_output("pages"))
+    d.writePSfile(_output("pages"))
+    outputs = [_output("pages.pdf"), _output("pages.ps")]
+    # SVG supports single pages only
+    for i, page in enumerate(pages):
+        document.document([page]).writeSVGfile(_output("pages%d" % i))
+        outputs.append(_output("pages%d.svg" % i))
+    return outputs
+
+@workload
+def text():
+    from pyx import canvas
+    if shutil.which("tex") is None:
+        return None
+    c = canvas.canvas()
+    for i in range(_scale(20000) // 100 or 1):
+        c.text(i % 10, i // 10, r"$x_{%d}^2$" % i)
+    c.writePDFfile(_output("text"))
+    return [_output("text.pdf")]
+
+
+def run(name):
+    """runs the workload name and returns its measures (or None when skipped)"""
+    os.makedirs(outputdir, exist_ok=True)
+    start = time.perf_counter()
+    outputs = workloads[name]()
+    duration = time.perf_counter() - start
+    if outputs is None:
+        return None
+    maxrss = None
+    if resource is not None:
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform != "darwin":
+            maxrss *= 1024 # kilobytes on Linux
+    return {"time": duration, "maxrss": maxrss, "size": sum(os.path.getsize(output) for output in outputs)}
+
+
+def main(args):
+    if "--run" in args:
+        # run a single workload (in a subprocess)
+        print(json.dumps(run(args[args.index("--run")+1])))
+        return 0
+    tolerance = 0.2
+    for arg in args:
+        if arg.startswith("--tolerance="):
+            tolerance = float(arg[12:])
+    names = [arg for arg in args if not arg.startswith("--")] or sorted(workloads)
+    if "--quick" in args:
+        baselinefilename = "baseline-quick.json"
+    else:
+        baselinefilename = "baseline.json"
+    try:
+        with open(baselinefilename) as f:
+            baseline = json.load(f)
+    except IOError:
+        baseline = {}
+    options = [arg for arg in args if arg == "--quick"]
+    results = {}
+    regressions = 0
+    for name in names:
+        try:
+            output = subprocess.check_output([sys.executable, sys.argv[0], "--run", name] + options)
+        except subprocess.CalledProcessError:
+            print("%-10s failed" % name)
+            regressions += 1
+            continue
+        result = json.loads(output.decode("ascii").splitlines()[-1])
+        if result is None:
+            print("%-10s skipped" % name)
+            continue
+        results[name] = result
+        line = "%-10s %8.2f s %8.1f MB %10d bytes" % (name, result["time"], (result["maxrss"] or 0)/2**20, result["size"])
+        if name in baseline:
+            ratios = []
+            for key in ["time", "maxrss", "size"]:
+                if result[key] is not None and baseline[name][key]:
+                    ratio = result[key] / baseline[name][key]
+                    ratios.append("%s %+.0f%%" % (key, 100*(ratio-1)))
+                    if ratio > 1 + tolerance:
+                        regressions += 1
+                        ratios[-1] += " (regression)"
+            line += "  " + ", ".join(ratios)
+        print(line)
+    if "--save" in args:
+        baseline.update(results)
+        with open(baselinefilename, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+    return regressions and 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
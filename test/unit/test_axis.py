@@ -0,0 +1,93 @@
+import sys
+if sys.path[0] != "../..":
+    sys.path.insert(0, "../..")
+
+import unittest
+
+import datetime
+from pyx import box, trafo
+from pyx.graph.axis import axis, painter, positioner, tick, timeaxis
+
+
+class AxisTestCase(unittest.TestCase):
+
+    def testLinearConvertList(self):
+        for reverse in [0, 1]:
+            a = axis.linear(reverse=reverse)
+            data = axis.axisdata(min=-1, max=3)
+            values = [-1, 0, 2.5, 3, 4]
+            for v, value in zip(a.convertlist(data, values), values):
+                self.assertAlmostEqual(v, a.convert(data, value))
+
+    def testSizedLinearConvertList(self):
+        a = axis.sizedlinear(size=2)
+        data = a.createdata("test")
+        data.min, data.max = 0, 10
+        self.assertEqual(a.convertlist(data, [0, 5, 10]), [0, 0.5, 1])
+
+    def testLogarithmicConvertList(self):
+        for reverse in [0, 1]:
+            a = axis.logarithmic(reverse=reverse)
+            data = axis.axisdata(min=0.1, max=1000)
+            values = [0.1, 1, 50, 1000]
+            for v, value in zip(a.convertlist(data, values), values):
+                self.assertAlmostEqual(v, a.convert(data, value))
+
+    def testInvalidConvertList(self):
+        a = axis.logarithmic()
+        data = axis.axisdata(min=1, max=100)
+        self.assertEqual(a.convertlist(data, [1, None, 0, -1, "x", 100]), [0, None, None, None, None, 1])
+
+    def testTimeConvertList(self):
+        a = timeaxis.timeaxis()
+        data = axis.axisdata(min=datetime.datetime(2000, 1, 1), max=datetime.datetime(2000, 1, 3))
+        values = [datetime.datetime(2000, 1, 1), datetime.datetime(2000, 1, 2, 12), None]
+        self.assertEqual(a.convertlist(data, values), [0, 0.75, None])
+
+    def testVRangeMask(self):
+        self.assertEqual(axis.vrangemask([-0.5, -1e-12, 0.5, None, 1, 1.5]),
+                         [False, True, True, False, True, False])
+
+    def testLabelMetric(self):
+        metric = painter.labelmetric({"0": 1, "1": 1, "2": 1, ".": 0.5})
+        self.assertEqual(metric.units("10"), (2, True))
+        self.assertEqual(metric.units("$-1.2$"), (2.5, False))
+        self.assertEqual(metric.units(r"\pi"), None)
+        self.assertEqual(metric.units("."), None)
+
+        # calibrate by a label "10" of width 10 centered at the tick
+        t = tick.tick((1, 1), labellevel=0, label="10")
+        t.temp_x_pt, t.temp_y_pt = 50, 0
+        t.temp_labelbox = box.rect_pt(45, -10, 10, 7)
+        calibration = metric.calibrate([t])
+        self.assertEqual(calibration, {0: (5, 0.5, -10, -3)})
+
+        xaxis = positioner.lineaxispos_pt(0, 0, 100, 0, (0, 1), None)
+        ticks = [tick.tick((i, 1), labellevel=0, label=label) for i, label in enumerate(["0", "1.2", "$-2$"])]
+        self.assertTrue(metric.crosses(calibration, ticks, xaxis, [0, 0.05, 0.2]))
+        self.assertFalse(metric.crosses(calibration, ticks, xaxis, [0, 0.1, 0.2]))
+        self.assertFalse(metric.crosses({1: (5, 0.5, -10, -3)}, ticks, xaxis, [0, 0.05, 0.2]))
+        yaxis = positioner.lineaxispos_pt(0, 0, 0, 100, (1, 0), None)
+        self.assertTrue(metric.crosses(calibration, ticks, yaxis, [0, 0.05, 0.2]))
+        self.assertFalse(metric.crosses(calibration, ticks, yaxis, [0, 0.1, 0.2]))
+
+    def testLabelMetricRotated(self):
+        metric = painter.labelmetric({"0": 1, "1": 1, "2": 1, ".": 0.5})
+        self.assertIs(painter.regular(labelmetric=metric).getlabelmetric(), metric)
+        self.assertIsNone(painter.regular().getlabelmetric())
+        self.assertIsNone(painter.regular(labelmetric=metric, labelattrs=None).getlabelmetric())
+        self.assertIsNone(painter.regular(labelmetric=metric, labeldirection=painter.rotatetext.parallel).getlabelmetric())
+        self.assertIsNone(painter.regular(labelmetric=metric, labelattrs=[trafo.rotate(90)]).getlabelmetric())
+
+        # ticks with rotated labels are neither used for the calibration nor estimated
+        t = tick.tick((1, 1), labellevel=0, label="10", labelattrs=[trafo.rotate(90)])
+        t.temp_x_pt, t.temp_y_pt = 50, 0
+        t.temp_labelbox = box.rect_pt(45, -10, 10, 7)
+        self.assertEqual(metric.calibrate([t]), {})
+        xaxis = positioner.lineaxispos_pt(0, 0, 100, 0, (0, 1), None)
+        ticks = [tick.tick((i, 1), labellevel=0, label=label, labelattrs=[trafo.rotate(90)]) for i, label in enumerate(["0", "1.2"])]
+        self.assertFalse(metric.crosses({0: (5, 0.5, -10, -3)}, ticks, xaxis, [0, 0.05]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import sys
+if sys.path[0] != "../..":
+    sys.path.insert(0, "../..")
+
+import io, unittest
+
+from pyx import *
+
+
+class CanvasTestCase(unittest.TestCase):
+
+    def symbol(self):
+        c = canvas.canvas()
+        c.stroke(path.circle(0, 0, 1), [color.rgb.red])
+        c.fill(path.rect(-0.5, -0.5, 1, 1))
+        return c
+
+    def testShared(self):
+        s = self.symbol()
+        c = canvas.canvas()
+        c.insert(s)
+        self.assertFalse(s.shared)
+        c.insert(s, [trafo.translate(3, 0)])
+        self.assertTrue(s.shared)
+        self.assertFalse(c.shared)
+
+    def testPDF(self):
+        s = self.symbol()
+        c = canvas.canvas()
+        for i in range(10):
+            c.insert(s, [trafo.translate(i, 0)])
+        f = io.BytesIO()
+        c.writePDFfile(f, write_compress=False)
+        self.assertEqual(f.getvalue().count(b"/Subtype /Form"), 1)
+        self.assertEqual(f.getvalue().count(b" Do\n"), 10)
+        self.assertEqual(f.getvalue().count(b"\nf\n"), 1)
+
+        # the bounding box equals the one of the unshared canvas
+        u = canvas.canvas()
+        for i in range(10):
+            u.insert(self.symbol(), [trafo.translate(i, 0)])
+        g = io.BytesIO()
+        u.writePDFfile(g, write_compress=False)
+        self.assertEqual(g.getvalue().count(b"/Subtype /Form"), 0)
+        self.assertEqual(g.getvalue().count(b"\nf\n"), 10)
+        mediabox = lambda data: data[data.index(b"/MediaBox"):].split(b"\n")[0]
+        self.assertEqual(mediabox(f.getvalue()), mediabox(g.getvalue()))
+
+    def testEqualContent(self):
+        c = canvas.canvas()
+        for i in range(2):
+            s = self.symbol()
+            c.insert(s)
+            c.insert(s, [trafo.translate(3, 0)])
+        f = io.BytesIO()
+        c.writePDFfile(f, write_compress=False)
+        self.assertEqual(f.getvalue().count(b"/Subtype /Form"), 1)
+        self.assertEqual(f.getvalue().count(b" Do\n"), 4)
+
+    def testFormBBox(self):
+        # the miter join sticks out of the PyX bbox of the stroked path
+        s = canvas.canvas()
+        s.stroke(path.path(path.moveto(-0.204, 1), path.lineto(0, 0), path.lineto(0.204, 1)),
+                 [style.linewidth(0.5), style.linejoin.miter, style.miterlimit(10)])
+        self.assertGreater(s.bbox().bottom_pt(), -unit.topt(1.25))
+        c = canvas.canvas()
+        for i in range(2):
+            c.insert(s, [trafo.translate(i, 0)])
+        f = io.BytesIO()
+        c.writePDFfile(f, write_compress=False)
+        data = f.getvalue()
+        self.assertEqual(data.count(b"/Subtype /Form"), 1)
+        llx, lly, urx, ury = map(int, data[data.index(b"/BBox [")+7:].split(b"]")[0].split())
+        self.assertLess(lly, -unit.topt(1.25))
+        self.assertLess(llx, s.bbox().left_pt())
+        self.assertGreater(urx, s.bbox().right_pt())
+        self.assertGreater(ury, s.bbox().top_pt())
+
+    def testPS(self):
+        s = self.symbol()
+        c = canvas.canvas()
+        for i in range(10):
+            c.insert(s, [trafo.translate(i, 0)])
+        f = io.BytesIO()
+        c.writeEPSfile(f)
+        self.assertEqual(f.getvalue().count(b"rectfill\n") + f.getvalue().count(b"fill\n"), 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import sys
+if sys.path[0] != "../..":
+    sys.path.insert(0, "../..")
+
+import unittest
+
+from pyx import color
+
+
+class GradientTestCase(unittest.TestCase):
+
+    def testLUT(self):
+        lut = color.gradient.Gray.getlut(3)
+        self.assertEqual(lut, [b"\xff", b"\x7f", b"\x00"])
+        self.assertTrue(color.gradient.Gray.getlut(3) is lut)
+        self.assertRaises(ValueError, color.gradient.Gray.getlut, 1)
+
+    def testColorBytesExact(self):
+        params = [0, 0.1, 0.5, 0.77, 1]
+        self.assertEqual(color.gradient.Jet.getcolorbytes(params),
+                         b"".join([color.gradient.Jet.getcolor(param).to8bitbytes() for param in params]))
+
+    def testColorBytesLUT(self):
+        params = [-1, 0, 0.2, 0.5, 1, 2]
+        self.assertEqual(color.gradient.RedBlue.getcolorbytes(params, lutsize=3),
+                         b"\xff\x00\x00"*3 + b"\x7f\x00\x7f" + b"\x00\x00\xff"*2)
+        params = [i/1000 for i in range(1001)]
+        exact = color.cmykgradient.Jet.getcolorbytes(params)
+        approx = color.cmykgradient.Jet.getcolorbytes(params, lutsize=4096)
+        self.assertEqual(len(exact), len(approx))
+        self.assertTrue(max(abs(a-b) for a, b in zip(exact, approx)) <= 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
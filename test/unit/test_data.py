@@ -4,7 +4,7 @@ if sys.path[0] != "../..":
 
 import unittest
 
-import io
+import io, os, struct, tempfile, zipfile
 from pyx.graph import data
 
 class DataTestCase(unittest.TestCase):
@@ -79,6 +79,88 @@ class DataTestCase(unittest.TestCase):
         mydata = data.file(testfile, title="title", skiphead=3, skiptail=2, every=2, row=0)
         self.assertEqual(mydata.columns["row"], [4, 6, 8])
         self.assertEqual(mydata.title, "title")
+        testfile = io.StringIO("""#a b
+1 2
+3 4 5
+6""")
+        class chunkedfile(data.file):
+            chunksize = 1
+        mydata = chunkedfile(testfile, a="a", b="b", c=3)
+        self.assertEqual(mydata.columns["a"], [1, 3, 6])
+        self.assertEqual(mydata.columns["b"], [2, 4, None])
+        self.assertEqual(mydata.columns["c"], [None, 5, None])
+
+    def testFileCache(self):
+        fd, filename = tempfile.mkstemp()
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write("#a\n1\n2\n")
+            mydata1 = data.file(filename, a="a")
+            mydata2 = data.file(filename, a="a")
+            self.assertIs(mydata1.orgdata, mydata2.orgdata)
+            with open(filename, "w") as f:
+                f.write("#a\n1\n2\n3\n")
+            mydata3 = data.file(filename, a="a")
+            self.assertEqual(mydata3.columns["a"], [1, 2, 3])
+            self.assertLessEqual(len(data.filecache), data.filecachesize)
+        finally:
+            os.unlink(filename)
+
+    def npy(self, descr, shape, payload):
+        header = "{'descr': %r, 'fortran_order': False, 'shape': %r, }" % (descr, shape)
+        header += " "*(63 - (len(header)+10) % 64) + "\n"
+        return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(header)) + header.encode("ascii") + payload
+
+    def testBinaryFile(self):
+        tempdir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tempdir, "test.npy")
+            with open(filename, "wb") as f:
+                f.write(self.npy("<f8", (5, 2), struct.pack("<10d", *range(10))))
+            mydata = data.binaryfile(filename, columnnames=["a"], a="a", b=2, row=0)
+            self.assertIsInstance(mydata.columns["a"], memoryview)
+            self.assertEqual(list(mydata.columns["a"]), [0, 2, 4, 6, 8])
+            self.assertEqual(list(mydata.columns["b"]), [1, 3, 5, 7, 9])
+            self.assertEqual(list(mydata.columns["row"]), [1, 2, 3, 4, 5])
+            mydata = data.binaryfile(filename, skiphead=1, skiptail=1, every=2, a=1, c="$2*2")
+            self.assertEqual(list(mydata.columns["a"]), [2, 6])
+            self.assertEqual(mydata.columns["c"], [6, 14])
+
+            filename = os.path.join(tempdir, "test2.npy")
+            with open(filename, "wb") as f:
+                f.write(self.npy([("x", ">f4"), ("", "|V4"), ("y", "<i8")], (2,), struct.pack(">f4x", 1) + struct.pack("<q", 2) + struct.pack(">f4x", 3) + struct.pack("<q", 4)))
+            mydata = data.binaryfile(filename, a="x", b="y")
+            self.assertEqual(list(mydata.columns["a"]), [1, 3])
+            self.assertEqual(list(mydata.columns["b"]), [2, 4])
+
+            filename = os.path.join(tempdir, "test.npz")
+            with zipfile.ZipFile(filename, "w") as f:
+                f.writestr("x.npy", self.npy("<f8", (3,), struct.pack("<3d", 1, 2, 3)))
+                f.writestr("y.npy", self.npy("<f8", (3,), struct.pack("<3d", 4, 5, 6)), compress_type=zipfile.ZIP_DEFLATED)
+            mydata = data.binaryfile(filename, a="x", b="y")
+            self.assertEqual(list(mydata.columns["a"]), [1, 2, 3])
+            self.assertEqual(list(mydata.columns["b"]), [4, 5, 6])
+
+            filename = os.path.join(tempdir, "test.raw")
+            with open(filename, "wb") as f:
+                f.write(b"head" + struct.pack("<6f", *range(6)))
+            mydata = data.binaryfile(filename, dtype="<f4", offset=4, columnnames=["a", "b", "c"], a="a", c="c")
+            self.assertEqual(list(mydata.columns["a"]), [0, 3])
+            self.assertEqual(list(mydata.columns["c"]), [2, 5])
+            self.assertRaises(ValueError, data.binaryfile, filename, a=1)
+
+            values = {"f": [0.5, -1.5, 2], "i": [-1, 0, 7], "u": [0, 1, 7], "b": [False, True, True]}
+            for descr, format in sorted(data._binaryformats.items()):
+                for byteorder in "<>":
+                    filename = os.path.join(tempdir, "test_%s_%s.npy" % ({"<": "le", ">": "be"}[byteorder], descr))
+                    with open(filename, "wb") as f:
+                        f.write(self.npy(byteorder + descr, (3,), struct.pack(byteorder + "3" + format, *values[descr[0]])))
+                    mydata = data.binaryfile(filename, a=1)
+                    self.assertEqual(list(mydata.columns["a"]), values[descr[0]], descr)
+        finally:
+            for filename in os.listdir(tempdir):
+                os.unlink(os.path.join(tempdir, filename))
+            os.rmdir(tempdir)
 
     def testSec(self):
         testfile = io.StringIO("""[sec1]
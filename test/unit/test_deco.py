@@ -2,10 +2,34 @@ import sys
 if sys.path[0] != "../..":
     sys.path.insert(0, "../..")
 
-import unittest
+import math, unittest
 
 from pyx import *
 from pyx.deco import *
+from pyx.deco import _hatchsegments_pt
+from pyx.text import textextbox_pt
+
+
+class _fakeengine:
+
+    # typesets each character as a box of 2pt width
+
+    def __init__(self, texipc=False):
+        self.texipc = texipc
+        self.finished = 0
+
+    def text(self, x, y, expr, textattrs=[], singlecharmode=False):
+        def do_finish():
+            self.finished += 1
+            box._dvicanvas = dvicanvas
+        dvicanvas = canvas.canvas()
+        for i, c in enumerate(expr):
+            dvicanvas.fill(path.rect_pt(2*i-len(expr), 0, 2, 3))
+        box = textextbox_pt(0, 0, len(expr), len(expr), 3, 0, do_finish, None, singlecharmode, [])
+        if self.texipc:
+            box._dvicanvas = dvicanvas
+        return box
+
 
 class DecoTestCase(unittest.TestCase):
 
@@ -71,6 +95,67 @@ class DecoTestCase(unittest.TestCase):
         self.assertAlmostEqual(d.nostrokeranges[0][0], 0.05)
         self.assertAlmostEqual(d.nostrokeranges[0][1], 0.65)
 
+    def testHatchSegments(self):
+        segments = _hatchsegments_pt(path.circle_pt(0, 0, 10).normpath(), -12, 1, 25)
+        for i, isegments in enumerate(segments):
+            x = i - 12
+            if abs(x) < 10:
+                self.assertEqual(len(isegments), 1)
+                self.assertAlmostEqual(isegments[0][0], -math.sqrt(100-x*x), 3)
+                self.assertAlmostEqual(isegments[0][1], math.sqrt(100-x*x), 3)
+            elif abs(x) > 10:
+                self.assertEqual(isegments, [])
+        # nonzero winding rule
+        annulus = (path.circle_pt(0, 0, 10) + path.circle_pt(0, 0, 5).reversed()).normpath()
+        (segment1, segment2), = _hatchsegments_pt(annulus, 0, 1, 1)
+        self.assertAlmostEqual(segment1[0], -10, 3)
+        self.assertAlmostEqual(segment1[1], -5, 3)
+        self.assertAlmostEqual(segment2[0], 5, 3)
+        self.assertAlmostEqual(segment2[1], 10, 3)
+        disc = (path.circle_pt(0, 0, 10) + path.circle_pt(0, 0, 5)).normpath()
+        (segment1,), = _hatchsegments_pt(disc, 0, 1, 1)
+        self.assertAlmostEqual(segment1[0], -10, 3)
+        self.assertAlmostEqual(segment1[1], 10, 3)
+        # open path and line ends on the lines
+        triangle = path.path(path.moveto_pt(0, 0), path.lineto_pt(10, 0), path.lineto_pt(10, 10)).normpath()
+        self.assertEqual(_hatchsegments_pt(triangle, 0, 2.5, 5), [[(0, 0)], [(0, 2.5)], [(0, 5)], [(0, 7.5)], []])
+
+    def testLineHatched(self):
+        c = canvas.canvas()
+        c.fill(path.rect(0, 0, 1, 1), [linehatched(0.1, 45, cross=1)])
+        dp, = c.items
+        self.assertEqual(len(dp.ornaments.items), 2)
+        for hatch in dp.ornaments.items:
+            self.assertIsNotNone(hatch.clip)
+            stroke, = hatch.items
+            self.assertEqual(len(stroke.path.normpath()), 15)
+
+    def testCurvedText(self):
+        for texipc in [False, True]:
+            engine = _fakeengine(texipc)
+            c = canvas.canvas()
+            c.stroke(path.line(0, 0, 0, 1), [curvedtext("abc", texrunner=engine, exclude=0)])
+            dp, = c.items
+            self.assertEqual(engine.finished, 0)
+            self.assertEqual(len(dp.deferred), 0 if texipc else 1)
+            self.assertAlmostEqual(c.bbox().lly_pt, 0)
+            self.assertEqual(len(dp.deferred), 0)
+            self.assertEqual(engine.finished, 0 if texipc else 1)
+            # the glyphs are rotated by 90 degrees and centered at the path
+            glyphs = dp.ornaments.items[0]
+            if not texipc:
+                glyphs = glyphs.items[0]
+            glyphs = [glyph.bbox() for glyph in glyphs.items]
+            self.assertEqual(len(glyphs), 3)
+            middle = 0.5*unit.topt(path.line(0, 0, 0, 1).arclen())
+            for i, bbox in enumerate(glyphs):
+                self.assertAlmostEqual(bbox.llx_pt, -3)
+                self.assertAlmostEqual(bbox.urx_pt, 0)
+                self.assertAlmostEqual(bbox.lly_pt, middle + 2*i - 3)
+                self.assertAlmostEqual(bbox.ury_pt, middle + 2*i - 1)
+            self.assertAlmostEqual(unit.topt(dp.nostrokeranges[0][0]), middle - 3)
+            self.assertAlmostEqual(unit.topt(dp.nostrokeranges[0][1]), middle + 3)
+
 
 if __name__ == "__main__":
     unittest.main()
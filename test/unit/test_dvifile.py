@@ -2,11 +2,41 @@ import sys
 if sys.path[0] != "../..":
     sys.path.insert(0, "../..")
 
-import io, os, re, unittest
+import io, os, re, struct, tempfile, unittest
 
+from pyx import baseclasses, bbox
 from pyx.dvi import dvifile
 
 
+class _fakeitem(baseclasses.canvasitem):
+
+    def __init__(self, x_pt, y_pt, charcodes):
+        self.x_pt = x_pt
+        self.y_pt = y_pt
+        self.charcodes = charcodes
+
+    def bbox(self):
+        return bbox.empty()
+
+
+class _fakefont:
+
+    def __init__(self, name):
+        self.name = name
+
+    def getwidth_dvi(self, charcode):
+        return 1000*charcode
+
+    def text_pt(self, x_pt, y_pt, charcodes, fontmap=None):
+        return _fakeitem(x_pt, y_pt, list(charcodes))
+
+
+class _fakefontDVIfile(dvifile.DVIfile):
+
+    def definefont(self, cmdnr, num, c, q, d, fontname):
+        self.fonts[num] = _fakefont(fontname)
+
+
 class DvifileTestCase(unittest.TestCase):
 
     def dvitypetester(self, advifile):
@@ -75,6 +105,79 @@ class DvifileTestCase(unittest.TestCase):
         self.dvitypetester("bigscale.dvi")
         os.system("rm bigscale.*")
 
+    def testSyntheticDVI(self):
+        dvi = bytes([247, 2]) + struct.pack(">LLLB", 25400000, 473628672, 1000, 0)
+        bop = len(dvi)
+        dvi += bytes([139]) + struct.pack(">10Ll", *([1]+[0]*9), -1)
+        dvi += bytes([243, 0]) + struct.pack(">lllBB", 0, 655360, 655360, 0, 4) + b"fake"
+        dvi += bytes([171]) + b"Hello" + bytes([138, 143, 5]) + b"World" + bytes([128, 200, 140])
+        post = len(dvi)
+        dvi += bytes([248]) + struct.pack(">lLLLLLHH", bop, 25400000, 473628672, 1000, 0, 0, 10, 1)
+        dvi += bytes([249]) + struct.pack(">lB", post, 2) + bytes([223])*4
+        with tempfile.NamedTemporaryFile(suffix=".dvi", delete=False) as f:
+            f.write(dvi)
+        try:
+            df = _fakefontDVIfile(f.name)
+            page = df.readpage([1]+[0]*9)
+            self.assertEqual([item.charcodes for item in page.items], [list(b"Hello"), list(b"World") + [200]])
+            self.assertAlmostEqual(page.items[1].x_pt, (sum(b"Hello")*1000 + 5)*df.pyxconv)
+            self.assertEqual(df.readpage(), None)
+        finally:
+            os.unlink(f.name)
+
+    def testPageIndex(self):
+        dvi = bytes([247, 2]) + struct.pack(">LLLB", 25400000, 473628672, 1000, 0)
+        fntdef = bytes([243, 0]) + struct.pack(">lllBB", 0, 655360, 655360, 0, 4) + b"fake"
+        bop = -1
+        for page, text in enumerate([b"A", b"BB", b"CCC"]):
+            lastbop, bop = bop, len(dvi)
+            dvi += bytes([139]) + struct.pack(">10Ll", *([page+1]+[0]*9), lastbop)
+            dvi += fntdef + bytes([171]) + text + bytes([140])
+        post = len(dvi)
+        dvi += bytes([248]) + struct.pack(">lLLLLLHH", bop, 25400000, 473628672, 1000, 0, 0, 10, 3)
+        dvi += fntdef + bytes([249]) + struct.pack(">lB", post, 2) + bytes([223])*4
+        with tempfile.NamedTemporaryFile(suffix=".dvi", delete=False) as f:
+            f.write(dvi)
+        try:
+            df = _fakefontDVIfile(f.name)
+            df.readpageindex()
+            self.assertEqual(sorted(pageid[0] for pageid in df.pageindex), [1, 2, 3])
+            for page, text in [(3, b"CCC"), (1, b"A"), (2, b"BB")]:
+                df.seekpage([page]+[0]*9)
+                self.assertEqual(df.readpage([page]+[0]*9).items[0].charcodes, list(text))
+            self.assertRaises(dvifile.DVIError, df.seekpage, [4]+[0]*9)
+        finally:
+            os.unlink(f.name)
+
+    def testGrowingDVI(self):
+        pre = bytes([247, 2]) + struct.pack(">LLLB", 25400000, 473628672, 1000, 0)
+        page = bytes([139]) + struct.pack(">10Ll", *([1]+[0]*9), -1)
+        page += bytes([243, 0]) + struct.pack(">lllBB", 0, 655360, 655360, 0, 4) + b"fake"
+        page += bytes([171]) + b"Hi" + bytes([140])
+        post = bytes([248]) + struct.pack(">lLLLLLHH", len(pre), 25400000, 473628672, 1000, 0, 0, 10, 1)
+        post += bytes([249]) + struct.pack(">lB", len(pre+page), 2) + bytes([223])*4
+        with tempfile.NamedTemporaryFile(suffix=".dvi", delete=False) as f:
+            f.write(pre)
+        try:
+            # the file is closed after reading it at once
+            df = _fakefontDVIfile(f.name)
+            self.assertIsNone(df.file)
+            # a growing file is kept open to fetch the data appended later
+            df = _fakefontDVIfile(f.name, growing=True)
+            with open(f.name, "ab") as af:
+                af.write(page)
+            self.assertEqual(df.readpage([1]+[0]*9).items[0].charcodes, list(b"Hi"))
+            self.assertIsNotNone(df.file)
+            with open(f.name, "ab") as af:
+                af.write(post)
+            self.assertEqual(df.readpage(), None)
+            self.assertIsNone(df.file)
+            df = _fakefontDVIfile(f.name, growing=True)
+            df.close()
+            self.assertIsNone(df.file)
+        finally:
+            os.unlink(f.name)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,66 @@
+import sys
+if sys.path[0] != "../..":
+    sys.path.insert(0, "../..")
+
+import unittest
+
+import io, os, tempfile
+from pyx import *
+
+
+class EPSfileTestCase(unittest.TestCase):
+
+    def writeeps(self, filename, body):
+        with open(filename, "wb") as f:
+            f.write(b"%!PS-Adobe-3.0 EPSF-3.0\n%%BoundingBox: 0 0 10 20\n%%EndComments\n" + body)
+
+    def testCache(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, "test.eps")
+            self.writeeps(filename, b"0 0 moveto 10 20 lineto stroke\n")
+            e1 = epsfile.epsfile(0, 0, filename)
+            self.assertEqual(e1.mybbox.highrestuple_pt(), (0, 0, 10, 20))
+            e2 = epsfile.epsfile(1, 1, filename)
+            self.assertIs(e1.data(), e2.data())
+
+            data = e1.data()
+            self.writeeps(filename, b"0 0 moveto 5 5 lineto stroke\n")
+            os.utime(filename, ns=(10**9, 10**9))
+            self.assertIsNot(e1.data(), data)
+            self.assertIs(e1.data(), e2.data())
+            c = canvas.canvas()
+            c.insert(e2)
+            f = io.BytesIO()
+            c.writeEPSfile(f)
+            self.assertIn(b"5 5 lineto", f.getvalue())
+
+    def testCacheBytes(self):
+        epsfilecachebytes = epsfile.epsfilecachebytes
+        with tempfile.TemporaryDirectory() as tmpdir:
+            try:
+                epsfile.clearcaches()
+                filenames = [os.path.join(tmpdir, "test%d.eps" % i) for i in range(3)]
+                for filename in filenames:
+                    self.writeeps(filename, b"%" + b"x"*100 + b"\n")
+                # each file has 165 bytes
+                epsfile.epsfilecachebytes = 400
+                for filename in filenames:
+                    epsfile.epsfile(0, 0, filename)
+                self.assertEqual(len(epsfile._epsfilecache), 2)
+                self.assertLessEqual(epsfile._epsfilecache.bytes, 400)
+                # a file larger than the limit is not cached
+                self.writeeps(filenames[0], b"%" + b"x"*400 + b"\n")
+                os.utime(filenames[0], ns=(10**9, 10**9))
+                e = epsfile.epsfile(0, 0, filenames[0])
+                self.assertIsNot(e.data(), e.data())
+                self.assertEqual(len(epsfile._epsfilecache), 2)
+                self.assertLessEqual(epsfile._epsfilecache.bytes, 400)
+                epsfile.clearcaches()
+                self.assertEqual(len(epsfile._epsfilecache), 0)
+                self.assertEqual(epsfile._epsfilecache.bytes, 0)
+            finally:
+                epsfile.epsfilecachebytes = epsfilecachebytes
+
+
+if __name__ == "__main__":
+    unittest.main()
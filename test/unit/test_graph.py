@@ -0,0 +1,155 @@
+import sys
+if sys.path[0] != "../..":
+    sys.path.insert(0, "../..")
+
+import io, unittest
+
+from pyx import *
+from pyx.graph import axis
+
+
+class GraphTestCase(unittest.TestCase):
+
+    def creategraph(self, ys, **kwargs):
+        g = graph.graphxy(width=8, x=axis.lin(min=0, max=10, painter=None), y=axis.lin(painter=None, **kwargs))
+        plotitem = g.plot(graph.data.values(x=list(range(5)), y=ys), [graph.style.line()])
+        g.plot(graph.data.values(x=list(range(5)), y=[1]*5), [graph.style.symbol()])
+        return g, plotitem
+
+    def output(self, g):
+        c = canvas.canvas()
+        c.insert(g)
+        f = io.BytesIO()
+        c.writeEPSfile(f)
+        return [line for line in f.getvalue().splitlines() if not line.startswith(b"%%CreationDate")]
+
+    def testReplaceData(self):
+        g, plotitem = self.creategraph([0, 1, 2, 3, 9.5])
+        g.finish()
+        ycanvas = g.axes["y"].canvas
+        self.assertTrue(g.replacedata(plotitem, graph.data.values(x=list(range(5)), y=[0, 2, 1, 3, 9.6])))
+        self.assertIs(g.axes["y"].canvas, ycanvas)
+        self.assertEqual(self.output(g), self.output(self.creategraph([0, 2, 1, 3, 9.6])[0]))
+        self.assertFalse(g.replacedata(plotitem, graph.data.values(x=list(range(5)), y=[0, 2, 1, 3, 19])))
+        self.assertEqual(self.output(g), self.output(self.creategraph([0, 2, 1, 3, 9.6])[0]))
+        self.assertRaises(ValueError, g.replacedata, plotitem, graph.data.values(x=list(range(5))))
+
+        g, plotitem = self.creategraph([0, 1, 2, 3, 4], min=0, max=10)
+        self.assertTrue(g.replacedata(plotitem, graph.data.values(x=list(range(5)), y=[0, 2, 1, 3, 19])))
+        self.assertEqual(self.output(g), self.output(self.creategraph([0, 2, 1, 3, 19], min=0, max=10)[0]))
+
+    def testReplaceDataPartition(self):
+        class countingpainter(axis.painter.regular):
+            paintcount = 0
+            def paint(self, *args, **kwargs):
+                countingpainter.paintcount += 1
+                axis.painter.regular.paint(self, *args, **kwargs)
+
+        def creategraph(ys):
+            g = graph.graphxy(width=8, x=axis.lin(min=0, max=10, painter=None),
+                              y=axis.lin(painter=countingpainter(labelattrs=None)))
+            return g, g.plot(graph.data.values(x=list(range(5)), y=ys), [graph.style.line()])
+
+        g, plotitem = creategraph([0, 1, 2, 3, 9.5])
+        g.finish()
+        paintcount = countingpainter.paintcount
+        # the axis range changes, but the partition does not
+        self.assertTrue(g.replacedata(plotitem, graph.data.values(x=list(range(5)), y=[0, 2, 1, 3, 10])))
+        self.assertFalse(g.replacedata(plotitem, graph.data.values(x=list(range(5)), y=[0, 2, 1, 3, 19])))
+        self.assertEqual(countingpainter.paintcount, paintcount)
+        self.assertEqual(self.output(g), self.output(creategraph([0, 2, 1, 3, 10])[0]))
+
+    def testUpdateData(self):
+        xs = list(range(40))
+        ys = [(x % 7)/3 - 1 for x in xs]
+        ys[10] = ys[25] = None
+        for maxlength in [None, 8, 9]:
+            data = graph.data.stream(maxlength=maxlength, x=xs[:3], y=ys[:3])
+            g = graph.graphxy(width=8, x=axis.lin(min=0, max=40, painter=None), y=axis.lin(min=-0.8, max=0.8, painter=None))
+            plotitem = g.plot(data, [graph.style.line(), graph.style.symbol()])
+            g.finish()
+            symbolcanvas = plotitem.symbolcanvas
+            for i in range(3, 40, 3):
+                data.extend(x=xs[i:i+3], y=ys[i:i+3])
+                self.assertTrue(g.updatedata(plotitem))
+                xs2, ys2 = xs[:i+3], ys[:i+3]
+                if maxlength is not None:
+                    xs2, ys2 = xs2[-maxlength:], ys2[-maxlength:]
+                ref = graph.graphxy(width=8, x=axis.lin(min=0, max=40, painter=None), y=axis.lin(min=-0.8, max=0.8, painter=None))
+                ref.plot(graph.data.values(x=xs2, y=ys2), [graph.style.line(), graph.style.symbol()])
+                self.assertEqual(self.output(g), self.output(ref))
+            # the points were drawn without drawing the plotitem again
+            self.assertIs(plotitem.symbolcanvas, symbolcanvas)
+            self.assertEqual(data.count, 40)
+            if maxlength is not None:
+                self.assertEqual(len(data.columns["x"]), maxlength)
+
+    def testUpdateDataRange(self):
+        def creategraph(xs, ys):
+            g = graph.graphxy(width=8, x=axis.lin(min=0, max=2, painter=None),
+                              y=axis.lin(painter=None, parter=axis.parter.linear(["0.5"])))
+            return g, g.plot(graph.data.stream(x=xs, y=ys), [graph.style.symbol()])
+
+        g, plotitem = creategraph([0, 1, 2], [0.1, 0.9, 0.5])
+        g.finish()
+        symbolcanvas = plotitem.symbolcanvas
+        # the axes ranges are kept
+        plotitem.data.append(x=1.5, y=0.2)
+        self.assertTrue(g.updatedata(plotitem))
+        self.assertIs(plotitem.symbolcanvas, symbolcanvas)
+        # the axes ranges change, but the partitions do not
+        plotitem.data.append(x=1.6, y=0.95)
+        self.assertTrue(g.updatedata(plotitem))
+        self.assertIsNot(plotitem.symbolcanvas, symbolcanvas)
+        self.assertEqual(self.output(g), self.output(creategraph([0, 1, 2, 1.5, 1.6], [0.1, 0.9, 0.5, 0.2, 0.95])[0]))
+        # the axes ranges are kept again
+        symbolcanvas = plotitem.symbolcanvas
+        plotitem.data.append(x=0.5, y=0.92)
+        self.assertTrue(g.updatedata(plotitem))
+        self.assertIs(plotitem.symbolcanvas, symbolcanvas)
+        # the axes would change
+        plotitem.data.append(x=1, y=1.2)
+        self.assertFalse(g.updatedata(plotitem))
+
+    def densityimage(self, xs, ys, colors, **kwargs):
+        g = graph.graphxy(width=8, x=axis.lin(painter=None), y=axis.lin(painter=None))
+        g.plot(graph.data.values(x=xs, y=ys, color=colors),
+               [graph.style.density(keygraph=None, coloraxis=axis.lin(min=0, max=1, painter=None), **kwargs)])
+        g.finish()
+        bitmaps = [item for item in g.layer("filldata").items[0].items if isinstance(item, bitmap.bitmap_trafo)]
+        self.assertEqual(len(bitmaps), 1)
+        return bitmaps[0].image
+
+    def testDensity(self):
+        n1, n2 = 7, 5
+        points = [(i1, i2, ((3*i1+5*i2) % 11)/10) for i1 in range(n1) for i2 in range(n2)]
+        xs, ys, colors = zip(*points)
+        image = self.densityimage(xs, ys, colors, gradient=color.gradient.Jet)
+        self.assertEqual(image.size, (n1, n2))
+        self.assertEqual(image.mode, "RGB")
+
+        # the order of the points does not matter
+        for order in [sorted(points, key=lambda p: (p[1], p[0])), sorted(points, key=lambda p: (-p[0], p[1]))]:
+            xs, ys, colors = zip(*order)
+            self.assertEqual(self.densityimage(xs, ys, colors, gradient=color.gradient.Jet).data, image.data)
+
+        # the lookup table results in the same colors up to rounding
+        lutimage = self.densityimage(xs, ys, colors, gradient=color.gradient.Jet, lutsize=4096)
+        self.assertEqual(len(lutimage.data), len(image.data))
+        self.assertLessEqual(max(abs(a-b) for a, b in zip(lutimage.data, image.data)), 1)
+
+        # missing points and color values of an invalid type result in empty pixels
+        xs, ys, colors = zip(*points[1:])
+        image = self.densityimage(xs, ys, colors[:-1] + (None,))
+        self.assertEqual(image.mode, "LA")
+        self.assertEqual(image.data[:2], b"\0\0")
+        self.assertEqual(image.data[-2:], b"\0\0")
+        self.assertEqual(image.data[3:-2:2], b"\xff"*(n1*n2-2))
+
+        # other conversion errors are raised
+        xs, ys, colors = zip(*points)
+        self.assertRaises(ValueError, self.densityimage, xs, ys, colors[:-1] + ("invalid",))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import sys
+if sys.path[0] != "../..":
+    sys.path.insert(0, "../..")
+
+import unittest
+
+from pyx import color, mesh
+
+
+class MeshTestCase(unittest.TestCase):
+
+    def testCoordsList(self):
+        coords_pt = [0, 0.3, 1.7, 2]
+        self.assertEqual(mesh.coordslist24bit_pt(coords_pt, 0, 2),
+                         [mesh.coords24bit_pt(c, 0, 2) for c in coords_pt])
+
+    def testIndexedMesh(self):
+        red, green, blue = color.rgb.red, color.rgb.green, color.rgb.blue
+        m1 = mesh.mesh([mesh.element((mesh.node_pt((0, 0), red), mesh.node_pt((1, 0), green), mesh.node_pt((0, 2), blue))),
+                        mesh.element((mesh.node_pt((1, 0), green), mesh.node_pt((0, 2), blue), mesh.node_pt((1, 2), red)))])
+        m2 = mesh.indexedmesh_pt([0, 1, 0, 1], [0, 0, 2, 2],
+                                 b"".join([c.to8bitbytes() for c in [red, green, blue, red]]), "RGB",
+                                 [0, 1, 2, 1, 2, 3])
+        bbox1 = m1.bbox()
+        bbox2 = m2.bbox()
+        self.assertEqual((bbox1.llx_pt, bbox1.lly_pt, bbox1.urx_pt, bbox1.ury_pt),
+                         (bbox2.llx_pt, bbox2.lly_pt, bbox2.urx_pt, bbox2.ury_pt))
+        self.assertEqual(m1.data(bbox1), m2.data(bbox2))
+        self.assertEqual(m1.shadinginfo(), m2.shadinginfo())
+
+    def testLatticeMesh(self):
+        m = mesh.latticemesh_pt([0, 1, 0, 1], [0, 0, 1, 1], b"\x00\x40\x80\xff", "L", 2)
+        self.assertEqual(m.data(m.bbox()), b"\x00\x00\x00\x00\x00\x00\x00"
+                                           b"\xff\xff\xff\x00\x00\x00\x40"
+                                           b"\x00\x00\x00\xff\xff\xff\x80"
+                                           b"\xff\xff\xff\xff\xff\xff\xff")
+        self.assertEqual(m.shadinginfo(), (5, "/DeviceGray", 1, "/VerticesPerRow 2"))
+        self.assertRaises(ValueError, mesh.latticemesh_pt, [0, 1, 0], [0, 0, 1], b"\x00\x40\x80", "L", 2)
+        self.assertRaises(ValueError, mesh.latticemesh_pt, [0, 1], [0, 0], b"\x00", "L", 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
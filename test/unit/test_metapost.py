@@ -0,0 +1,55 @@
+import sys
+if sys.path[0] != "../..":
+    sys.path.insert(0, "../..")
+
+import math, unittest
+
+from pyx.metapost import path as mppath
+
+
+class MetapostTestCase(unittest.TestCase):
+
+    def knotpath(self, x_pt, y_pt, closed, tension, lcurl, rcurl, langle, rangle):
+        if closed:
+            knots = [mppath.smoothknot_pt(x_pt[0], y_pt[0])]
+        else:
+            knots = [mppath.beginknot_pt(x_pt[0], y_pt[0], curl=lcurl, angle=langle)]
+        for x, y in zip(x_pt[1:-1], y_pt[1:-1]):
+            knots.append(mppath.tensioncurve(tension))
+            knots.append(mppath.smoothknot_pt(x, y))
+        knots.append(mppath.tensioncurve(tension))
+        if closed:
+            knots.append(mppath.smoothknot_pt(x_pt[-1], y_pt[-1]))
+            knots.append(mppath.tensioncurve(tension))
+        else:
+            knots.append(mppath.endknot_pt(x_pt[-1], y_pt[-1], curl=rcurl, angle=rangle))
+        return mppath.path(knots).normpath()[0]
+
+    def check(self, x_pt, y_pt, closed=False, tension=1, lcurl=1, rcurl=1, langle=None, rangle=None):
+        nsp1 = self.knotpath(x_pt, y_pt, closed, tension, lcurl, rcurl, langle, rangle)
+        nsp2 = mppath.smoothnormsubpath_pt(x_pt, y_pt, closed, tension, lcurl=lcurl, rcurl=rcurl, langle=langle, rangle=rangle)
+        self.assertEqual(nsp1.closed, nsp2.closed)
+        self.assertEqual(str(nsp1), str(nsp2))
+
+    def testSmoothNormsubpath(self):
+        x_pt = [0, 10, 20, 30, 40, 50]
+        y_pt = [0, 15, -5, 20, 0, 10]
+        self.check(x_pt, y_pt)
+        self.check(x_pt, y_pt, tension=2)
+        self.check(x_pt, y_pt, lcurl=0, rcurl=2)
+        self.check(x_pt, y_pt, langle=0.5, rangle=-1)
+        self.check(x_pt, y_pt, closed=True)
+        self.check(x_pt[:2], y_pt[:2])
+        self.check(x_pt[:2], y_pt[:2], langle=0.5, rangle=-0.5)
+        # equal consecutive points are joined explicitly
+        self.check([0, 10, 10, 20, 30], [0, 10, 10, 0, 5])
+        self.check([0, 10, 10, 20, 30], [0, 10, 10, 0, 5], closed=True)
+
+    def testTensions(self):
+        nsp = mppath.smoothnormsubpath_pt([0, 10, 20], [0, 10, 0], tension=[1, 2])
+        self.assertEqual(len(nsp), 2)
+        self.assertRaises(ValueError, mppath.smoothnormsubpath_pt, [0, 10, 20], [0, 10, 0], tension=[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
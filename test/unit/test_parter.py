@@ -5,8 +5,9 @@ if sys.path[0] != "../..":
 import unittest
 
 from pyx import *
-from pyx.graph.axis.tick import tick, rational
+from pyx.graph.axis.tick import tick, rational, mergeticklists
 from pyx.graph.axis.parter import lin, log, preexp
+from pyx.graph.axis import parter
 
 
 class ParterTestCase(unittest.TestCase):
@@ -83,6 +84,26 @@ class ParterTestCase(unittest.TestCase):
         self.PartEqual(log(tickpreexps=[log.pre1exp, log.pre1to9exp]).partfunctions(1, 10, 1, 1)[0](),
                        [tick((1, 1), 0, 0), tick((2, 1), 1, None), tick((3, 1), 1, None), tick((4, 1), 1, None), tick((5, 1), 1, None), tick((6, 1), 1, None), tick((7, 1), 1, None), tick((8, 1), 1, None), tick((9, 1), 1, None), tick((10, 1), 0, 0)])
 
+    def testPartitionCache(self):
+        part1 = lin(tickdists=["1", "0.5"], labeldists=["1"]).partfunctions(0, 1.3, 1, 1)[0]()
+        part1[0].label = "changed"
+        self.assertTrue(any(key[1:3] == (0, 1.3) for key in parter._partitioncache))
+        part2 = lin(tickdists=["1", "0.5"], labeldists=["1"]).partfunctions(0, 1.3, 1, 1)[0]()
+        self.assertIsNot(part1[0], part2[0])
+        self.PartEqual(part2, [tick((0, 1), 0, 0), tick((1, 2), 1, None), tick((1, 1), 0, 0), tick((3, 2), 1, None), tick((2, 1), 0, 0)])
+        self.PartEqual(lin(tickdists=["1", "0.25"], labeldists=["1"]).partfunctions(0, 1.3, 1, 1)[0](),
+                       [tick((0, 1), 0, 0), tick((1, 4), 1, None), tick((1, 2), 1, None), tick((3, 4), 1, None), tick((1, 1), 0, 0),
+                        tick((5, 4), 1, None), tick((3, 2), 1, None), tick((7, 4), 1, None), tick((2, 1), 0, 0)])
+
+    def testMergeTickLists(self):
+        list1 = [tick((0, 1), 0, None), tick((1, 1), 0, None)]
+        list2 = [tick((-1, 1), None, 0), tick((0, 1), None, 0), tick((1, 2), None, 0), tick((3, 1), None, 0)]
+        self.PartEqual(mergeticklists(list1, list2, mergeequal=0),
+                       [tick((-1, 1), None, 0), tick((0, 1), 0, None), tick((1, 2), None, 0), tick((1, 1), 0, None), tick((3, 1), None, 0)])
+        self.PartEqual(mergeticklists(list1, list2),
+                       [tick((-1, 1), None, 0), tick((0, 1), 0, 0), tick((1, 2), None, 0), tick((1, 1), 0, None), tick((3, 1), None, 0)])
+        self.assertEqual(len(list1), 2)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -135,6 +135,31 @@ class NormpathTestCase(unittest.TestCase):
         for arclen, arclen2 in zip(arclens, p.paramtoarclen(p.arclentoparam(arclens))):
             self.assertAlmostEqual(unit.tom(arclen), unit.tom(arclen2), 4)
 
+    def testsample(self):
+        p = ( normpath([normsubpath([normline_pt(0, 0, 3, 0),
+                                     normcurve_pt(3, 0, 3, 2, 3, 4, 3, 6),
+                                     normcurve_pt(3, 6, 4, 8, 0, 9, 0, 6)])]) +
+              circle_pt(0, 0, 10) +
+              line_pt(0, 0, 2, 0))
+        arclens_pt = [-2, 0, 1.5, 4.5, 9, 10, 12, 30, 100, 1000]
+        positions_pt, tangents, curvatures_pt = p.sample_pt(arclens_pt)
+        for position_pt, position2_pt in zip(positions_pt, p.at_pt(arclens_pt)):
+            self.assertAlmostEqual(position_pt[0], position2_pt[0])
+            self.assertAlmostEqual(position_pt[1], position2_pt[1])
+        for (tx, ty), rotation in zip(tangents, p.rotation_pt(arclens_pt)):
+            self.assertAlmostEqual(tx, rotation.matrix[0][0])
+            self.assertAlmostEqual(ty, rotation.matrix[1][0])
+        for curvature_pt, curvature2_pt in zip(curvatures_pt, p.curvature_pt(arclens_pt)):
+            self.assertAlmostEqual(curvature_pt, curvature2_pt)
+        self.assertAlmostEqual(curvatures_pt[7], 0.1, 3)
+
+        # vanishing speed at the begin of the curve
+        positions_pt, tangents, curvatures_pt = normpath([normsubpath([normcurve_pt(0, 0, 0, 0, 1, 1, 2, 0)])]).sample_pt([0])
+        self.assertAlmostEqual(tangents[0][0], math.sqrt(0.5))
+        self.assertAlmostEqual(tangents[0][1], math.sqrt(0.5))
+
+        self.assertRaises(NormpathException, normpath().sample_pt, [0])
+
     def testsplit(self):
         p = normline_pt(0, 0, 10, 0)
         self.assertRaises(ValueError, p.segments, [])
@@ -378,6 +403,63 @@ class NormpathTestCase(unittest.TestCase):
         self.assertAlmostEqual(intersect[0][2], 2.9)
         self.assertAlmostEqual(intersect[0][3], 3.5)
 
+    def testnormpathcache(self):
+        def p():
+            return path(moveto_pt(0, 0), lineto_pt(3, 0), lineto_pt(3, 2))
+        p1 = p()
+        np1 = p1.normpath()
+        np2 = p().normpath()
+        self.assertIsNot(np1, np2)
+        self.assertIs(np1, p1.normpath())
+        self.assertIs(np1[0], np2[0])
+        self.assertTrue(np1[0].shared)
+        self.assertIsNot(np1[0], p().normpath(epsilon=None)[0])
+        self.assertIsNot(np1[0], line_pt(0, 0, 3, 0).normpath()[0])
+
+        # copy on write
+        np2.append(lineto_pt(5, 5))
+        self.assertIsNot(np1[0], np2[0])
+        self.assertFalse(np2[0].shared)
+        self.assertEqual(len(np1[0]), 2)
+        self.assertEqual(len(p().normpath()[0]), 2)
+        np3 = p().normpath()
+        np3.join(line_pt(3, 3, 4, 4))
+        self.assertEqual(len(np3[0]), 4)
+        self.assertAlmostEqualNormpath(np1, p().normpath())
+        self.assertRaises(NormpathException, np1[0].append, normline_pt(3, 2, 1, 1))
+        self.assertRaises(NormpathException, np1[0].close)
+        np4 = np1.copy()
+        np4[0].close()
+        self.assertFalse(np1[0].closed)
+
+    def testnormpathcachesize(self):
+        from pyx import path as pathmodule
+        oldsize = pathmodule.normpathcachesize
+        try:
+            pathmodule.normpathcachesize = 10
+            np1 = line_pt(0, 0, 1, 1).normpath()
+            for i in range(1, 7):
+                line_pt(i, 0, 1, 1).normpath()
+            self.assertLessEqual(pathmodule._normpathcacheitems, 10)
+            self.assertTrue(np1[0].shared)
+            self.assertIsNot(np1[0], line_pt(0, 0, 1, 1).normpath()[0])
+        finally:
+            pathmodule.normpathcachesize = oldsize
+
+    def testnormpathcachemulti(self):
+        from pyx import path as pathmodule
+        def p(n):
+            return path(moveto_pt(0, 0), multilineto_pt([(i, i % 2) for i in range(1, n+1)]))
+        items = pathmodule._normpathcacheitems
+        np1 = p(10).normpath()
+        self.assertEqual(pathmodule._normpathcacheitems, items + 11)
+        self.assertIs(np1[0], p(10).normpath()[0])
+        # paths having too many points are not cached
+        n = pathmodule.normpathcachepathsize
+        np2 = p(n).normpath()
+        self.assertFalse(np2[0].shared)
+        self.assertIsNot(np2[0], p(n).normpath()[0])
+        self.assertEqual(pathmodule._normpathcacheitems, items + 11)
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,60 @@
+import sys
+if sys.path[0] != "../..":
+    sys.path.insert(0, "../..")
+
+import io, unittest
+
+from pyx import *
+from pyx import pattern
+
+
+class PatternTestCase(unittest.TestCase):
+
+    def canvas(self):
+        c = canvas.canvas()
+        for i in range(10):
+            c.fill(path.rect(i, 0, 1, 1), [pattern.hatched45.normal])
+            c.fill(path.rect(i, 1, 1, 1), [pattern.hatched(0.1, 45)])
+            c.fill(path.rect(i, 2, 1, 1), [pattern.crosshatched0.normal])
+        return c
+
+    def testRenderOnce(self):
+        p = pattern.hatched(0.1, 0)
+        calls = []
+        render = p._renderPDF
+        p._renderPDF = lambda writer: calls.append(writer) or render(writer)
+        c = canvas.canvas()
+        for i in range(10):
+            c.fill(path.rect(i, 0, 1, 1), [p])
+        c.writePDFfile(io.BytesIO())
+        self.assertEqual(len(calls), 1)
+        c.writePDFfile(io.BytesIO())
+        self.assertEqual(len(calls), 2)
+
+    def testPDF(self):
+        f = io.BytesIO()
+        self.canvas().writePDFfile(f, write_compress=False)
+        self.assertEqual(f.getvalue().count(b"/Type /Pattern"), 2)
+
+    def testPS(self):
+        f = io.BytesIO()
+        self.canvas().writeEPSfile(f)
+        self.assertEqual(f.getvalue().count(b"%%BeginResource: pattern"), 2)
+
+    def testContent(self):
+        f1 = io.BytesIO()
+        f2 = io.BytesIO()
+        c1 = canvas.canvas()
+        c1.fill(path.rect(0, 0, 1, 1), [pattern.hatched(0.1, 0)])
+        c1.writePDFfile(f1, write_compress=False)
+        c2 = canvas.canvas()
+        c2.fill(path.rect(0, 0, 1, 1), [pattern.hatched(0.2, 0)])
+        c2.writePDFfile(f2, write_compress=False)
+        id1 = f1.getvalue().split(b" scn")[0].split(b"/")[-1]
+        id2 = f2.getvalue().split(b" scn")[0].split(b"/")[-1]
+        self.assertTrue(id1.startswith(b"pattern"))
+        self.assertNotEqual(id1, id2)
+
+
+if __name__ == "__main__":
+    unittest.main()
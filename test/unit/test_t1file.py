@@ -0,0 +1,121 @@
+import sys
+if sys.path[0] != "../..":
+    sys.path.insert(0, "../..")
+
+import os, shutil, tempfile, unittest
+
+from pyx.font import t1file
+
+
+def charstring(code):
+    return t1file.encoder(code, t1file.T1File.charstringr, b"PyX!")
+
+def glyph(name, code):
+    code = charstring(code)
+    return b"/" + name + b" %d RD " % len(code) + code + b" ND\n"
+
+def minimalfont():
+    # a minimal type1 font with the glyphs A and B, where B calls subr 1
+    data1 = ("%!PS-AdobeFont-1.0: PyXTest 001.000\n"
+             "/FontName /PyXTest def\n"
+             "/FontMatrix [0.001 0 0 0.001 0 0] readonly def\n"
+             "/Encoding 256 array\n"
+             "0 1 255 {1 index exch /.notdef put} for\n"
+             "dup 65 /A put\n"
+             "dup 66 /B put\n"
+             "readonly def\n"
+             "currentfile eexec\n")
+    subr0 = charstring(bytes([11]))
+    subr1 = charstring(bytes([139, 11]))
+    data2 = (b"dup /Private 8 dict dup begin\n"
+             b"/UniqueID 4711 def\n"
+             b"/Subrs 2 array\n"
+             b"dup 0 %d RD " % len(subr0) + subr0 + b" NP\n"
+             b"dup 1 %d RD " % len(subr1) + subr1 + b" NP\n"
+             b"2 index /CharStrings 3 dict dup begin\n" +
+             glyph(b".notdef", bytes([139, 139, 13, 14])) +
+             glyph(b"A", bytes([139, 139, 13, 14])) +
+             glyph(b"B", bytes([139, 139, 13, 140, 10, 14])) +
+             b"end\nend\n")
+    data3 = "0"*512 + "cleartomark\n"
+    return t1file.T1File(data1, t1file.encoder(data2, t1file.T1File.eexecr, b"PyX!"), data3)
+
+
+class StrippedFontCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.cachedir = t1file.strippedfontcachedir
+        t1file._strippedfontcache.clear()
+
+    def tearDown(self):
+        t1file.strippedfontcachedir = self.cachedir
+        t1file._strippedfontcache.clear()
+
+    def testStrip(self):
+        glyphs = {"B"}
+        stripped = minimalfont().getstrippedfont(glyphs, {65})
+        self.assertEqual(glyphs, {".notdef", "A", "B"})
+        self.assertEqual(stripped.name, "PyXTest")
+        self.assertNotIn("UniqueID", stripped.data1)
+        stripped._data2decode()
+        self.assertEqual(stripped.glyphlist, [".notdef", "A", "B"])
+        self.assertEqual(stripped.subrs[0], stripped.emptysubr)
+        self.assertNotEqual(stripped.subrs[1], stripped.emptysubr)
+
+    def testMemoryCache(self):
+        font = minimalfont()
+        stripped1 = font.getstrippedfont({"A"}, set())
+        self.assertEqual(len(t1file._strippedfontcache), 1)
+        # same font content (but a different instance) and glyphs
+        glyphs = {"A"}
+        stripped2 = minimalfont().getstrippedfont(glyphs, set())
+        self.assertEqual(len(t1file._strippedfontcache), 1)
+        self.assertEqual(glyphs, {".notdef", "A"})
+        self.assertEqual(stripped1.data1, stripped2.data1)
+        self.assertEqual(stripped1.getdata2eexec(), stripped2.getdata2eexec())
+        # different glyphs
+        font.getstrippedfont({"B"}, set())
+        self.assertEqual(len(t1file._strippedfontcache), 2)
+        # modified fonts are not cached
+        font.setglyphcmds("A", font.getglyphcmds("B"))
+        font.getstrippedfont({"A"}, set())
+        self.assertEqual(len(t1file._strippedfontcache), 2)
+
+    def testMemoryCacheSize(self):
+        strippedfontcachesize = t1file.strippedfontcachesize
+        t1file.strippedfontcachesize = 2
+        try:
+            font = minimalfont()
+            for glyphs in [{"A"}, {"B"}, {"A"}, {"A", "B"}]:
+                font.getstrippedfont(glyphs, set())
+            # the least recently used glyph set {"B"} has been removed
+            self.assertEqual([stripped[0] for stripped in t1file._strippedfontcache.values()],
+                             [{".notdef", "A"}, {".notdef", "A", "B"}])
+        finally:
+            t1file.strippedfontcachesize = strippedfontcachesize
+
+    def testDiskCache(self):
+        tmpdir = tempfile.mkdtemp()
+        strippedfontcachedirsize = t1file.strippedfontcachedirsize
+        try:
+            t1file.strippedfontcachedir = os.path.join(tmpdir, "fonts")
+            t1file.strippedfontcachedirsize = 2
+            stripped1 = minimalfont().getstrippedfont({"B"}, set())
+            self.assertEqual(len(os.listdir(t1file.strippedfontcachedir)), 1)
+            t1file._strippedfontcache.clear()
+            glyphs = {"B"}
+            stripped2 = minimalfont().getstrippedfont(glyphs, set())
+            self.assertEqual(glyphs, {".notdef", "B"})
+            self.assertEqual(stripped1.data1, stripped2.data1)
+            self.assertEqual(stripped1.getdata2eexec(), stripped2.getdata2eexec())
+            self.assertEqual(stripped1.data3, stripped2.data3)
+            for glyphs in [{"A"}, {"A", "B"}]:
+                minimalfont().getstrippedfont(glyphs, set())
+            self.assertEqual(len(os.listdir(t1file.strippedfontcachedir)), 2)
+        finally:
+            t1file.strippedfontcachedirsize = strippedfontcachedirsize
+            shutil.rmtree(tmpdir)
+
+
+if __name__ == "__main__":
+    unittest.main()
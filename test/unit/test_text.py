@@ -0,0 +1,57 @@
+import sys
+if sys.path[0] != "../..":
+    sys.path.insert(0, "../..")
+
+import unittest
+
+from pyx import *
+
+
+class _fakeengine:
+
+    def __init__(self):
+        self.preambles = []
+        self.typeset = []
+
+    def cachekey(self):
+        return "fake", tuple(self.preambles)
+
+    def text_pt(self, x_pt, y_pt, expr, textattrs=[]):
+        self.typeset.append(expr)
+        def do_finish():
+            for box in boxes:
+                box._dvicanvas = canvas.canvas([box.texttrafo])
+        box = text.textextbox_pt(x_pt, y_pt, 1, 2, 3, 1, do_finish, None, False, [])
+        boxes = [box]
+        return box
+
+
+class TextCacheTestCase(unittest.TestCase):
+
+    def testCachedText(self):
+        engine = _fakeengine()
+        t1 = text.cachedtext_pt(engine, 10, 20, "a", [text.halign.center])
+        t2 = text.cachedtext_pt(engine, 30, 40, "a", [text.halign.center])
+        self.assertEqual(len(engine.typeset), 1)
+        self.assertAlmostEqual(t1.bbox().llx_pt, 9)
+        self.assertAlmostEqual(t2.bbox().llx_pt, 29)
+        self.assertAlmostEqual(t2.bbox().lly_pt, 39)
+        self.assertEqual(t2.dvicanvas.trafo.apply_pt(0, 0), (30, 40))
+        self.assertEqual(t1.dvicanvas.trafo.apply_pt(0, 0), (10, 20))
+        t3 = text.cachedtext_pt(engine, 0, 0, "a", [trafo.rotate(90)])
+        self.assertEqual(len(engine.typeset), 2)
+        t4 = text.cachedtext_pt(engine, 0, 0, "a", [text.halign.center, trafo.rotate(90)])
+        self.assertEqual(len(engine.typeset), 2)
+        self.assertAlmostEqual(t4.bbox().width_pt(), 4)
+        self.assertAlmostEqual(t4.bbox().height_pt(), 3)
+        t4.transform(trafo.translate_pt(5, 0))
+        self.assertAlmostEqual(t4.dvicanvas.trafo.apply_pt(0, 0)[0], 5)
+        engine.preambles.append("b")
+        text.cachedtext_pt(engine, 0, 0, "a", [text.halign.center])
+        self.assertEqual(len(engine.typeset), 3)
+        text.cachedtext_pt(engine, 0, 0, "a", [color.rgb.red])
+        self.assertEqual(len(engine.typeset), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import sys
+if sys.path[0] != "../..":
+    sys.path.insert(0, "../..")
+
+import io, unittest
+
+from pyx import *
+from pyx import timing
+
+
+class TimingTestCase(unittest.TestCase):
+
+    def canvas(self):
+        g = graph.graphxy(width=8, x=graph.axis.lin(painter=None), y=graph.axis.lin(painter=None))
+        g.plot(graph.data.values(x=[1, 2, 3], y=[1, 4, 9]), [graph.style.line()])
+        c = canvas.canvas()
+        c.insert(g)
+        c.stroke(path.line(0, 0, 1, 1))
+        return c
+
+    def testDisabled(self):
+        self.assertIsNone(timing.active)
+        self.canvas().writePDFfile(io.BytesIO())
+        self.assertIsNone(timing.active)
+
+    def testReport(self):
+        c = self.canvas()
+        f = io.BytesIO()
+        r = timing.report()
+        c.writePDFfile(f, write_timing=r)
+        self.assertIsNone(timing.active)
+        self.assertEqual(r.calls, 1)
+        self.assertEqual(r["output"].bytes, len(f.getvalue()))
+        page = r["page"]
+        self.assertIn("doaxes", page)
+        self.assertIn("doranges", page["doaxes"])
+        self.assertEqual(page["graphxy"].calls, 1)
+        self.assertEqual(page["decoratedpath"].calls, 1)
+        self.assertGreater(page["graphxy"].bytes, 0)
+        self.assertLessEqual(page["graphxy"].bytes, page.bytes)
+        self.assertGreaterEqual(r.time, page.time)
+        self.assertIn("graphxy", str(r))
+
+    def testContextManager(self):
+        c = self.canvas()
+        with timing.report() as r:
+            c.writeEPSfile(io.BytesIO())
+            c.writePSfile(io.BytesIO())
+            with self.assertRaises(RuntimeError):
+                with r:
+                    pass
+        self.assertIsNone(timing.active)
+        self.assertEqual(r["page"].calls, 2)
+        self.assertEqual(r["prolog"].calls, 2)
+
+    def testException(self):
+        r = timing.report()
+        with self.assertRaises(ValueError):
+            document.document([]).writeEPSfile(io.BytesIO(), timing=r)
+        self.assertIsNone(timing.active)
+
+
+if __name__ == "__main__":
+    unittest.main()